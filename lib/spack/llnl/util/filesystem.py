@@ -20,7 +20,7 @@
 import tempfile
 from contextlib import contextmanager
 from itertools import accumulate
-from typing import Callable, Iterable, List, Match, Optional, Tuple, Union
+from typing import Callable, Dict, Iterable, List, Match, Optional, Tuple, Union
 
 import llnl.util.symlink
 from llnl.util import tty
@@ -32,6 +32,7 @@
 from ..path import path_to_os_path, system_path_filter
 
 if sys.platform != "win32":
+    import fcntl
     import grp
     import pwd
 else:
@@ -47,6 +48,7 @@
     "can_access",
     "change_sed_delimiter",
     "copy_mode",
+    "copyfile",
     "filter_file",
     "find",
     "find_headers",
@@ -84,6 +86,7 @@
     "working_dir",
     "keep_modification_time",
     "BaseDirectoryVisitor",
+    "visit_directory_listing",
     "visit_directory_tree",
 ]
 
@@ -659,6 +662,80 @@ def unset_executable_mode(path):
     os.chmod(path, mode)
 
 
+#: ``ioctl`` request of Linux making a file share the data blocks of another one (reflink)
+_FICLONE = 0x40049409
+
+#: Errors of ``FICLONE`` and ``copy_file_range`` meaning that they can't be used for a file
+_NO_FAST_COPY_ERRNOS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EPERM,
+    errno.EXDEV,
+}
+
+
+def _copy_file_in_kernel(src_fd: int, dst_fd: int, size: int) -> bool:
+    """Copy ``size`` bytes from ``src_fd`` to the empty file ``dst_fd`` without reading them
+    in user space: either with a reflink, which shares the data blocks until either file
+    is modified, or with ``copy_file_range``. Return False if neither is supported, in
+    which case nothing was written.
+    """
+    try:
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno not in _NO_FAST_COPY_ERRNOS:
+            raise
+
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    copied = 0
+    while copied < size:
+        try:
+            n = os.copy_file_range(src_fd, dst_fd, size - copied)  # novermin
+        except OSError as e:
+            if copied == 0 and e.errno in _NO_FAST_COPY_ERRNOS:
+                return False
+            raise
+        if n == 0:
+            # Some filesystems report no data for files they generate on the fly
+            break
+        copied += n
+    return copied > 0
+
+
+def copyfile(src: str, dst: str) -> None:
+    """Copy the contents of the file ``src`` to ``dst``, like :py:func:`shutil.copyfile`.
+
+    On Linux, the copy is a reflink on filesystems that support it (btrfs, XFS), so that no
+    data is copied at all, or is done by the kernel with ``copy_file_range``. Other cases
+    fall back to :py:func:`shutil.copyfile`.
+
+    Raises:
+        shutil.SameFileError: if ``src`` and ``dst`` are the same file
+    """
+    if sys.platform == "linux":
+        with open(src, "rb") as fsrc:
+            src_stat = os.fstat(fsrc.fileno())
+            try:
+                dst_stat = os.stat(dst)
+            except OSError:
+                pass
+            else:
+                if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+                    raise shutil.SameFileError(f"{src} and {dst} are the same file")
+            if stat.S_ISREG(src_stat.st_mode) and src_stat.st_size > 0:
+                with open(dst, "wb") as fdst:
+                    if _copy_file_in_kernel(fsrc.fileno(), fdst.fileno(), src_stat.st_size):
+                        return
+
+    shutil.copyfile(src, dst)
+
+
 @system_path_filter
 def copy(src, dest, _permissions=False):
     """Copy the file(s) *src* to the file or directory *dest*.
@@ -697,7 +774,8 @@ def copy(src, dest, _permissions=False):
         if os.path.isdir(dest):
             dst = join_path(dest, os.path.basename(src))
 
-        shutil.copy(src, dst)
+        copyfile(src, dst)
+        shutil.copymode(src, dst)
 
         if _permissions:
             set_install_permissions(dst)
@@ -822,12 +900,13 @@ def escaped_path(path):
                 elif os.path.isdir(link_target):
                     mkdirp(d)
                 else:
-                    shutil.copyfile(s, d)
+                    copyfile(s, d)
             else:
                 if os.path.isdir(s):
                     mkdirp(d)
                 else:
-                    shutil.copy2(s, d)
+                    copyfile(s, d)
+                    shutil.copystat(s, d)
 
             if _permissions:
                 set_install_permissions(d)
@@ -1476,6 +1555,45 @@ def visit_directory_tree(
             visitor.after_visit_symlinked_dir(root, rel_child, depth)
 
 
+def visit_directory_listing(
+    root: str,
+    listing: Dict[str, List[Tuple[str, str]]],
+    visitor: BaseDirectoryVisitor,
+    rel_path: str = "",
+    depth: int = 0,
+):
+    """Like :py:func:`visit_directory_tree`, but takes the entries of the directories from a
+    listing made beforehand, instead of reading them from the filesystem. Directories missing
+    from the listing, and symlinked directories, are read from the filesystem.
+
+    Parameters:
+        root: path of directory to recurse into
+        listing: maps the path of a directory to its entries, which are ``(name, kind)``
+            pairs sorted by name, with ``kind`` one of ``"dir"``, ``"symlink"`` or ``"file"``
+        visitor: what visitor to use
+        rel_path: current relative path from the root
+        depth: current depth from the root
+    """
+    entries = listing.get(os.path.join(root, rel_path) if rel_path else root)
+    if entries is None:
+        visit_directory_tree(root, visitor, rel_path, depth)
+        return
+
+    for name, kind in entries:
+        rel_child = os.path.join(rel_path, name)
+        if kind == "file":
+            visitor.visit_file(root, rel_child, depth)
+        elif kind == "dir":
+            if visitor.before_visit_dir(root, rel_child, depth):
+                visit_directory_listing(root, listing, visitor, rel_child, depth + 1)
+                visitor.after_visit_dir(root, rel_child, depth)
+        elif not os.path.isdir(os.path.join(root, rel_child)):
+            visitor.visit_symlinked_file(root, rel_child, depth)
+        elif visitor.before_visit_symlinked_dir(root, rel_child, depth):
+            visit_directory_tree(root, visitor, rel_child, depth + 1)
+            visitor.after_visit_symlinked_dir(root, rel_child, depth)
+
+
 @system_path_filter
 def set_executable(path):
     mode = os.stat(path).st_mode
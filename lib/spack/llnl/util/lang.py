@@ -772,6 +772,21 @@ def __repr__(self):
         return repr(self.instance)
 
 
+def lazy_import(module_name: str) -> Singleton:
+    """Return a proxy for a module, which is only imported the first time one of its attributes
+    is accessed.
+
+    Modules that are slow to import, and needed only by some code paths, can be bound this
+    way at the top of a module, so that importing it stays fast.
+
+    Args:
+        module_name: absolute name of the module, e.g. ``foo.bar``
+    """
+    import importlib
+
+    return Singleton(functools.partial(importlib.import_module, module_name))
+
+
 def get_entry_points(*, group: str):
     """Wrapper for ``importlib.metadata.entry_points``
 
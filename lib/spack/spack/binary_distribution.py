@@ -9,6 +9,8 @@
 import io
 import itertools
 import json
+import multiprocessing
+import multiprocessing.pool
 import os
 import pathlib
 import re
@@ -29,7 +31,12 @@
 import llnl.util.filesystem as fsys
 import llnl.util.lang
 import llnl.util.tty as tty
-from llnl.util.filesystem import BaseDirectoryVisitor, mkdirp, visit_directory_tree
+from llnl.util.filesystem import (
+    BaseDirectoryVisitor,
+    mkdirp,
+    visit_directory_listing,
+    visit_directory_tree,
+)
 
 import spack.caches
 import spack.cmd
@@ -50,17 +57,25 @@
 import spack.traverse as traverse
 import spack.util.archive
 import spack.util.crypto
+import spack.util.elf
 import spack.util.file_cache as file_cache
 import spack.util.gpg
+import spack.util.parallel
 import spack.util.path
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.util.timer as timer
 import spack.util.url as url_util
 import spack.util.web as web_util
+import spack.verify
 from spack.caches import misc_cache_location
 from spack.package_prefs import get_package_dir_permissions, get_package_group
-from spack.relocate_text import utf8_paths_to_single_binary_regex
+from spack.relocate_text import (
+    BinaryFilePrefixReplacer,
+    BinaryTextReplaceError,
+    TextFilePrefixReplacer,
+    utf8_paths_to_single_binary_regex,
+)
 from spack.spec import Spec
 from spack.stage import Stage
 from spack.util.executable import which
@@ -722,7 +737,11 @@ def get_buildfile_manifest(spec):
     # to worry about hardlinks of symlinked dirs and what not.
     visitor = BuildManifestVisitor()
     root = spec.prefix
-    visit_directory_tree(root, visitor)
+    listing = spack.verify.prefix_listing(spec)
+    if listing is None:
+        visit_directory_tree(root, visitor)
+    else:
+        visit_directory_listing(root, listing, visitor)
 
     # Collect a list of prefixes for this package and it's dependencies, Spack will
     # look for them to decide if text file needs to be relocated or not
@@ -783,9 +802,30 @@ def hashes_to_prefixes(spec):
     }
 
 
+def binary_prefix_offsets(root, binaries, prefixes) -> Dict[str, List[int]]:
+    """Return the offsets where any of the prefixes starts in each binary, so that binaries
+    can be relocated without being scanned when they are installed from a build cache.
+
+    Args:
+        root: directory the binaries are relative to
+        binaries: relative paths of the binaries
+        prefixes: prefixes that may be relocated
+    """
+    # A lookahead finds all the occurrences, even when prefixes overlap
+    regex = re.compile(b"(?=%s)" % b"|".join(re.escape(p.encode("utf-8")) for p in prefixes))
+    offsets = {}
+    for rel_path in binaries:
+        with open(os.path.join(root, rel_path), "rb") as f:
+            offsets[rel_path] = [m.start() for m in regex.finditer(f.read())]
+    return offsets
+
+
 def get_buildinfo_dict(spec):
     """Create metadata for a tarball"""
     manifest = get_buildfile_manifest(spec)
+    hash_to_prefix = hashes_to_prefixes(spec)
+    prefixes = set(hash_to_prefix.values())
+    prefixes.add(spack.store.STORE.layout.root)
 
     return {
         "sbang_install_path": spack.hooks.sbang.sbang_install_path(),
@@ -796,7 +836,10 @@ def get_buildinfo_dict(spec):
         "relocate_binaries": manifest["binary_to_relocate"],
         "relocate_links": manifest["link_to_relocate"],
         "hardlinks_deduped": manifest["hardlinks_deduped"],
-        "hash_to_prefix": hashes_to_prefixes(spec),
+        "hash_to_prefix": hash_to_prefix,
+        "binary_prefix_offsets": binary_prefix_offsets(
+            spec.prefix, manifest["binary_to_relocate"], sorted(prefixes)
+        ),
     }
 
 
@@ -1164,10 +1207,8 @@ def _do_create_tarball(tarfile_path: str, binaries_dir: str, buildinfo: dict):
         inner_checksum,
         outer_checksum,
     ):
-        # Tarball the install prefix
-        tarfile_of_spec_prefix(tar, binaries_dir)
-
-        # Serialize buildinfo for the tarball
+        # Serialize buildinfo for the tarball. It comes first, so that files can be relocated
+        # while they are extracted.
         bstring = syaml.dump(buildinfo, default_flow_style=True).encode("utf-8")
         tarinfo = tarfile.TarInfo(
             name=spack.util.archive.default_path_to_name(buildinfo_file_name(binaries_dir))
@@ -1177,6 +1218,9 @@ def _do_create_tarball(tarfile_path: str, binaries_dir: str, buildinfo: dict):
         tarinfo.mode = 0o644
         tar.addfile(tarinfo, io.BytesIO(bstring))
 
+        # Tarball the install prefix
+        tarfile_of_spec_prefix(tar, binaries_dir)
+
     return inner_checksum.hexdigest(), outer_checksum.hexdigest()
 
 
@@ -1708,16 +1752,18 @@ def dedupe_hardlinks_if_necessary(root, buildinfo):
         buildinfo[key] = new_list
 
 
-def relocate_package(spec):
-    """
-    Relocate the given package
+def _old_prefix(buildinfo) -> str:
+    """Install prefix of a binary package on the machine where it was built"""
+    return os.path.join(str(buildinfo["buildpath"]), buildinfo.get("relative_prefix"))
+
+
+def _relocation_prefix_maps(spec, buildinfo):
+    """Return the ordered prefix to prefix maps used to relocate the text files and the
+    binaries of a package installed from a binary cache.
     """
-    workdir = str(spec.prefix)
-    buildinfo = read_buildinfo_file(workdir)
     new_layout_root = str(spack.store.STORE.layout.root)
     new_prefix = str(spec.prefix)
     new_rel_prefix = str(os.path.relpath(new_prefix, new_layout_root))
-    new_spack_prefix = str(spack.paths.prefix)
 
     old_sbang_install_path = None
     if "sbang_install_path" in buildinfo:
@@ -1725,8 +1771,7 @@ def relocate_package(spec):
     old_layout_root = str(buildinfo["buildpath"])
     old_spack_prefix = str(buildinfo.get("spackprefix"))
     old_rel_prefix = buildinfo.get("relative_prefix")
-    old_prefix = os.path.join(old_layout_root, old_rel_prefix)
-    rel = buildinfo.get("relative_rpaths", False)
+    old_prefix = _old_prefix(buildinfo)
 
     # In the past prefix_to_hash was the default and externals were not dropped, so prefixes
     # were not unique.
@@ -1776,6 +1821,26 @@ def relocate_package(spec):
     new_sbang = spack.hooks.sbang.sbang_shebang_line()
     prefix_to_prefix_text[orig_sbang] = new_sbang
 
+    return prefix_to_prefix_text, prefix_to_prefix_bin
+
+
+def relocate_package(spec):
+    """
+    Relocate the given package
+    """
+    workdir = str(spec.prefix)
+    buildinfo = read_buildinfo_file(workdir)
+    new_layout_root = str(spack.store.STORE.layout.root)
+    new_prefix = str(spec.prefix)
+    new_spack_prefix = str(spack.paths.prefix)
+
+    old_layout_root = str(buildinfo["buildpath"])
+    old_spack_prefix = str(buildinfo.get("spackprefix"))
+    old_prefix = _old_prefix(buildinfo)
+    rel = buildinfo.get("relative_rpaths", False)
+
+    prefix_to_prefix_text, prefix_to_prefix_bin = _relocation_prefix_maps(spec, buildinfo)
+
     tty.debug("Relocating package from", "%s to %s." % (old_layout_root, new_layout_root))
 
     # Old archives maybe have hardlinks repeated.
@@ -1800,6 +1865,9 @@ def is_backup_file(file):
         # If the buildcache was not created with relativized rpaths
         # do the relocation of path in binaries
         platform = spack.platforms.by_name(spec.platform)
+        # Offsets of prefixes recorded in the buildinfo are only valid in binaries whose layout
+        # has not been changed by install_name_tool or patchelf
+        offsets = {}
         if "macho" in platform.binary_formats:
             relocate.relocate_macho_binaries(
                 files_to_relocate,
@@ -1813,7 +1881,13 @@ def is_backup_file(file):
         elif "elf" in platform.binary_formats and not rel:
             # The new ELF dynamic section relocation logic only handles absolute to
             # absolute relocation.
-            relocate.new_relocate_elf_binaries(files_to_relocate, prefix_to_prefix_bin)
+            patched = relocate.new_relocate_elf_binaries(files_to_relocate, prefix_to_prefix_bin)
+            offsets = {
+                os.path.join(workdir, filename): x
+                for filename, x in buildinfo.get("binary_prefix_offsets", {}).items()
+            }
+            for path in patched:
+                offsets.pop(path, None)
         elif "elf" in platform.binary_formats and rel:
             relocate.relocate_elf_binaries(
                 files_to_relocate,
@@ -1834,7 +1908,9 @@ def is_backup_file(file):
         relocate.relocate_text(text_names, prefix_to_prefix_text)
 
         # relocate the install prefixes in binary files including dependencies
-        changed_files = relocate.relocate_text_bin(files_to_relocate, prefix_to_prefix_bin)
+        changed_files = relocate.relocate_text_bin(
+            files_to_relocate, prefix_to_prefix_bin, offsets
+        )
 
         # Add ad-hoc signatures to patched macho files when on macOS.
         if "macho" in platform.binary_formats and sys.platform == "darwin":
@@ -1851,6 +1927,221 @@ def is_backup_file(file):
             relocate.relocate_text(text_names, prefix_to_prefix_text)
 
 
+class RelocateWhileExtracting:
+    """Relocates the text files and ELF binaries of a binary package while they are extracted
+    from its tarball: each file is relocated in place right after it is written, while it is
+    still in the page cache, instead of being read and written again by
+    :func:`relocate_package` once the whole tarball is extracted.
+
+    Symbolic links, and ELF binaries whose RPATH or interpreter can't be updated in place, are
+    relocated after extraction by :meth:`finish`.
+
+    Args:
+        spec: spec being installed
+        buildinfo: contents of the buildinfo file of the binary package
+    """
+
+    def __init__(self, spec, buildinfo):
+        self.prefix = str(spec.prefix)
+        prefix_to_prefix_text, prefix_to_prefix_bin = _relocation_prefix_maps(spec, buildinfo)
+
+        # Backup files generated by filter_file during install are not relocated
+        self.text_files = set(
+            x for x in buildinfo.get("relocate_textfiles", []) if not x.endswith("~")
+        )
+        self.binaries: Set[str] = set()
+        self.links: List[str] = []
+
+        #: Offsets of the prefixes in binaries, recorded when they were pushed
+        self.binary_offsets: Dict[str, List[int]] = {}
+
+        if _old_prefix(buildinfo) != self.prefix:
+            self.binaries.update(buildinfo.get("relocate_binaries", []))
+            self.binary_offsets.update(buildinfo.get("binary_prefix_offsets", {}))
+            self.links.extend(buildinfo.get("relocate_links", []))
+        elif str(buildinfo.get("spackprefix")) == str(spack.paths.prefix):
+            # Nothing to relocate if the package is installed back to the same location
+            self.text_files.clear()
+
+        self.prefix_to_prefix_bin = prefix_to_prefix_bin
+        self.text_replacer = TextFilePrefixReplacer.from_strings_or_bytes(prefix_to_prefix_text)
+        self.binary_replacer = BinaryFilePrefixReplacer.from_strings_or_bytes(prefix_to_prefix_bin)
+        self.elf_substitutions = collections.OrderedDict(
+            (k.encode("utf-8"), v.encode("utf-8")) for k, v in prefix_to_prefix_bin.items()
+        )
+
+        #: ELF binaries to be updated with patchelf after extraction
+        self.elf_updates: List[Tuple[str, spack.util.elf.ElfCStringUpdatesFailed]] = []
+
+        self._pool: Optional[multiprocessing.pool.Pool] = None
+        #: Files being relocated by the pool, in the order they were extracted
+        self._pending: "collections.OrderedDict[str, tuple]" = collections.OrderedDict()
+
+    @staticmethod
+    def from_tarball(
+        spec, tar: tarfile.TarFile, prefix: str
+    ) -> Optional["RelocateWhileExtracting"]:
+        """Return an object relocating the files of a binary package while they are extracted,
+        or None if the package has to be relocated after extraction instead. This is the case
+        for Mach-O binaries, and for binaries with relative RPATHs.
+
+        Args:
+            spec: spec being installed
+            tar: tarball of the binary package
+            prefix: prefix of the package files in the tarball
+        """
+        # Tarballs created by recent versions of Spack store the buildinfo file first, so
+        # that it's cheap to read it before the other files
+        with closing(tar.extractfile(f"{prefix}/.spack/binary_distribution")) as f:
+            buildinfo = syaml.load(f)
+
+        binary_formats = spack.platforms.by_name(spec.platform).binary_formats
+        needs_binary_relocation = _old_prefix(buildinfo) != str(spec.prefix)
+        if needs_binary_relocation and (
+            "elf" not in binary_formats or buildinfo.get("relative_rpaths", False)
+        ):
+            return None
+        return RelocateWhileExtracting(spec, buildinfo)
+
+    def members(
+        self, tar: tarfile.TarFile, members: Iterable[tarfile.TarInfo]
+    ) -> Iterable[tarfile.TarInfo]:
+        """Extract and relocate the files that need relocation, and yield the other members,
+        which are extracted as they are by ``TarFile.extractall``.
+
+        Files are relocated by a pool of ``config:relocation_jobs`` processes, while the
+        tarball is decompressed in this process.
+        """
+        members = list(members)
+
+        # Hardlinks are extracted as links to the first occurrence of a file, which must be
+        # relocated if any of its names is in the buildinfo
+        for m in members:
+            if m.islnk():
+                if m.name in self.text_files:
+                    self.text_files.add(m.linkname)
+                if m.name in self.binaries:
+                    self.binaries.add(m.linkname)
+                if m.name in self.binary_offsets:
+                    self.binary_offsets[m.linkname] = self.binary_offsets[m.name]
+
+        jobs = relocate.relocation_jobs(m.size for m in members if self._needs_relocation(m))
+        if jobs > 1 and sys.platform not in ("darwin", "win32"):
+            self._pool = multiprocessing.Pool(jobs)
+
+        try:
+            for m in members:
+                if self._needs_relocation(m):
+                    self._extract(tar, m)
+                    continue
+                # The target of a hardlink must be relocated before its attributes are set
+                if m.islnk() and m.linkname in self._pending:
+                    self._finish_member(*self._pending.pop(m.linkname))
+                yield m
+            while self._pending:
+                self._finish_member(*self._pending.popitem(last=False)[1])
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+
+    def _needs_relocation(self, member: tarfile.TarInfo) -> bool:
+        return member.isreg() and (member.name in self.text_files or member.name in self.binaries)
+
+    def _extract(self, tar: tarfile.TarFile, member: tarfile.TarInfo) -> None:
+        # Files are streamed to disk and relocated in place, so that their contents are never
+        # held in memory as a whole, nor sent to the processes of the pool
+        path = os.path.join(self.prefix, member.name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(tar.extractfile(member)) as src, open(path, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        args = (
+            path,
+            self.text_replacer if member.name in self.text_files else None,
+            self.binary_replacer if member.name in self.binaries else None,
+            self.elf_substitutions if member.name in self.binaries else None,
+            self.binary_offsets.get(member.name),
+        )
+
+        if self._pool is None:
+            self._finish_member(tar, member, _relocate_file(*args))
+            return
+
+        result = self._pool.apply_async(spack.util.parallel.Task(_relocate_file_in_worker), args)
+        self._pending[member.name] = (tar, member, result)
+
+    def _finish_member(self, tar: tarfile.TarFile, member: tarfile.TarInfo, result) -> None:
+        """Record the ELF updates of a relocated file, and set its attributes"""
+        if isinstance(result, multiprocessing.pool.AsyncResult):
+            result = result.get()
+            if isinstance(result, BinaryTextReplaceError):
+                raise result
+            if isinstance(result, spack.util.parallel.ErrorFromWorker):
+                raise RuntimeError(str(result))
+
+        path = os.path.join(self.prefix, member.name)
+        if result is not None:
+            self.elf_updates.append((path, spack.util.elf.ElfCStringUpdatesFailed(*result)))
+        tar.chown(member, path, numeric_owner=False)
+        tar.chmod(member, path)
+        tar.utime(member, path)
+
+    def finish(self) -> None:
+        """Relocate what could not be relocated during extraction"""
+        for path, updates in self.elf_updates:
+            # The RPATH must be updated before other strings, since the new prefix may be
+            # longer than the old one, which is only possible with patchelf
+            relocate.apply_elf_updates_with_patchelf(path, updates)
+            if not self.binary_replacer.is_noop:
+                with open(path, "rb+") as f:
+                    self.binary_replacer.apply_to_file(f)
+        links = [os.path.join(self.prefix, x) for x in self.links]
+        relocate.relocate_links(links, self.prefix_to_prefix_bin)
+
+
+def _relocate_file(
+    path: str,
+    text_replacer: Optional[TextFilePrefixReplacer],
+    binary_replacer: Optional[BinaryFilePrefixReplacer],
+    elf_substitutions: Optional[Dict[bytes, bytes]],
+    binary_offsets: Optional[List[int]] = None,
+) -> Optional[Tuple[Optional[bytes], Optional[bytes]]]:
+    """Relocate a file in place, and return the ELF updates that could not be done in place,
+    as a ``(rpath, pt_interp)`` tuple, or None. Binaries are only relocated at
+    ``binary_offsets``, when they are known.
+
+    When ELF updates are returned, the other prefixes in the binary are not relocated either,
+    since that has to be done after ``patchelf`` updated the RPATH and interpreter."""
+    elf_updates = None
+    with open(path, "rb+") as f:
+        if elf_substitutions:
+            try:
+                spack.util.elf.substitute_rpath_and_pt_interp_in_file_or_raise(
+                    f, elf_substitutions
+                )
+            except spack.util.elf.ElfCStringUpdatesFailed as e:
+                elf_updates = (e.rpath, e.pt_interp)
+        if text_replacer is not None:
+            f.seek(0)
+            text_replacer.apply_to_file(f)
+        if binary_replacer is not None and elf_updates is None:
+            if binary_offsets is not None:
+                binary_replacer.apply_at_offsets(f, binary_offsets)
+            else:
+                f.seek(0)
+                binary_replacer.apply_to_file(f)
+    return elf_updates
+
+
+def _relocate_file_in_worker(*args):
+    """Same as ``_relocate_file``, but return relocation errors instead of raising them, so
+    that they reach the parent process with their type."""
+    try:
+        return _relocate_file(*args)
+    except BinaryTextReplaceError as e:
+        return e
+
+
 def _extract_inner_tarball(spec, filename, extract_to, signature_required: bool, remote_checksum):
     stagepath = os.path.dirname(filename)
     spackfile_name = tarball_name(spec, ".spack")
@@ -1991,13 +2282,16 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
             raise NoChecksumException(
                 tarfile_path, size, contents, "sha256", expected, local_checksum
             )
+    relocator = None
     try:
         with closing(tarfile.open(tarfile_path, "r")) as tar:
             # Remove install prefix from tarfil to extract directly into spec.prefix
-            tar.extractall(
-                path=spec.prefix,
-                members=_tar_strip_component(tar, prefix=_ensure_common_prefix(tar)),
-            )
+            prefix = _ensure_common_prefix(tar)
+            members = _tar_strip_component(tar, prefix=prefix)
+            relocator = RelocateWhileExtracting.from_tarball(spec, tar, prefix)
+            if relocator is not None:
+                members = relocator.members(tar, members)
+            tar.extractall(path=spec.prefix, members=members)
     except Exception:
         shutil.rmtree(spec.prefix, ignore_errors=True)
         _delete_staged_downloads(download_result)
@@ -2009,7 +2303,10 @@ def extract_tarball(spec, download_result, force=False, timer=timer.NULL_TIMER):
 
     timer.start("relocate")
     try:
-        relocate_package(spec)
+        if relocator is not None:
+            relocator.finish()
+        else:
+            relocate_package(spec)
     except Exception as e:
         shutil.rmtree(spec.prefix, ignore_errors=True)
         raise e
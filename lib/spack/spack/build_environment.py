@@ -69,6 +69,7 @@
 import spack.store
 import spack.subprocess_context
 import spack.user_environment
+import spack.util.jobserver
 import spack.util.path
 import spack.util.pattern
 from spack import traverse
@@ -168,6 +169,15 @@ def __call__(self, *args, **kwargs):
         jobs = get_effective_jobs(
             self.jobs, parallel=parallel, supports_jobserver=self.supports_jobserver
         )
+
+        # Tools that can't use the jobserver of Spack's installer get the job slots
+        # that are free when they start
+        tokens = 0
+        client = spack.util.jobserver.CLIENT
+        if jobs is not None and jobs > 1 and client is not None:
+            tokens = client.acquire(jobs - 1)
+            jobs = tokens + 1
+
         if jobs is not None:
             args = ("-j{0}".format(jobs),) + args
 
@@ -180,7 +190,11 @@ def __call__(self, *args, **kwargs):
             if jobs_env_jobs is not None:
                 kwargs["extra_env"] = {jobs_env: str(jobs_env_jobs)}
 
-        return super().__call__(*args, **kwargs)
+        try:
+            return super().__call__(*args, **kwargs)
+        finally:
+            if client is not None:
+                client.release(tokens)
 
 
 def _on_cray():
@@ -1091,6 +1105,17 @@ def get_cmake_prefix_path(pkg):
     return filter_system_paths(cmake_prefix_path_entries)
 
 
+def _set_build_jobs(jobs: int) -> None:
+    """Set the number of parallel jobs used by builds in the current process, overriding the
+    value given on the command line, if any.
+    """
+    if "command_line" in spack.config.CONFIG.scopes:
+        spack.config.set("config:build_jobs", jobs, scope="command_line")
+    else:
+        scope = spack.config.InternalConfigScope("command_line", {"config": {"build_jobs": jobs}})
+        spack.config.CONFIG.push_scope(scope)
+
+
 def _setup_pkg_and_run(
     serialized_pkg, function, kwargs, write_pipe, input_multiprocess_fd, jsfd1, jsfd2
 ):
@@ -1107,6 +1132,13 @@ def _setup_pkg_and_run(
 
         pkg = serialized_pkg.restore()
 
+        # Builds running concurrently with others either share the parallel jobs through
+        # the jobserver of the installer, or get a fixed share of them
+        if kwargs.get("build_jobs") is not None:
+            _set_build_jobs(kwargs["build_jobs"])
+        if kwargs.get("jobserver") is not None:
+            spack.util.jobserver.connect(kwargs["jobserver"], kwargs["build_jobs"])
+
         if not kwargs.get("fake", False):
             kwargs["unmodified_env"] = os.environ.copy()
             kwargs["env_modifications"] = setup_package(
@@ -1175,8 +1207,133 @@ def _setup_pkg_and_run(
             input_multiprocess_fd.close()
 
 
+class BuildProcess:
+    """Child process doing part of a Spack build, started as soon as the object is created.
+
+    The parent can wait for several build processes at the same time on their
+    :attr:`connection`, and must call :meth:`complete` to collect the result of each one.
+
+    Args:
+        pkg (spack.package_base.PackageBase): package whose environment we should set up the
+            child process for.
+        function (typing.Callable): function to run in the child process, with the package
+            and ``kwargs`` as arguments.
+        kwargs (dict): keyword arguments for the function.
+        forward_stdin (bool): whether the child can read from the standard input of the
+            parent, e.g. to toggle verbosity. Only one child at a time should read from it.
+    """
+
+    def __init__(self, pkg, function, kwargs, forward_stdin=True):
+        self.pkg = pkg
+        read_pipe, write_pipe = multiprocessing.Pipe(duplex=False)
+        input_multiprocess_fd = None
+        jobserver_fd1 = None
+        jobserver_fd2 = None
+
+        serialized_pkg = spack.subprocess_context.PackageInstallContext(pkg)
+
+        try:
+            # Forward sys.stdin when appropriate, to allow toggling verbosity
+            if (
+                forward_stdin
+                and sys.platform != "win32"
+                and sys.stdin.isatty()
+                and hasattr(sys.stdin, "fileno")
+            ):
+                input_fd = os.dup(sys.stdin.fileno())
+                input_multiprocess_fd = MultiProcessFd(input_fd)
+            mflags = os.environ.get("MAKEFLAGS", False)
+            if mflags:
+                m = re.search(r"--jobserver-[^=]*=(\d+),(\d+)", mflags)
+                if m:
+                    jobserver_fd1 = MultiProcessFd(int(m.group(1)))
+                    jobserver_fd2 = MultiProcessFd(int(m.group(2)))
+
+            p = multiprocessing.Process(
+                target=_setup_pkg_and_run,
+                args=(
+                    serialized_pkg,
+                    function,
+                    kwargs,
+                    write_pipe,
+                    input_multiprocess_fd,
+                    jobserver_fd1,
+                    jobserver_fd2,
+                ),
+            )
+
+            p.start()
+
+            # We close the writable end of the pipe now to be sure that p is the
+            # only process which owns a handle for it. This ensures that when p
+            # closes its handle for the writable end, read_pipe.recv() will
+            # promptly report the readable end as being ready.
+            write_pipe.close()
+
+        except InstallError as e:
+            e.pkg = pkg
+            raise
+
+        finally:
+            # Close the input stream in the parent process
+            if input_multiprocess_fd is not None:
+                input_multiprocess_fd.close()
+
+        self.process = p
+        #: Readable end of the pipe the child sends its result on. It's ready when the child
+        #: is done, and can be passed to ``multiprocessing.connection.wait``.
+        self.connection = read_pipe
+
+    def _exitcode_msg(self):
+        typ = "exit" if self.process.exitcode >= 0 else "signal"
+        return f"{typ} {abs(self.process.exitcode)}"
+
+    def complete(self):
+        """Wait for the child process to finish, and return the value returned by the
+        function it ran. Errors in the child are raised again in the parent.
+        """
+        p, pkg = self.process, self.pkg
+        try:
+            child_result = self.connection.recv()
+        except EOFError:
+            p.join()
+            raise InstallError(f"The process has stopped unexpectedly ({self._exitcode_msg()})")
+
+        p.join()
+
+        # If returns a StopPhase, raise it
+        if isinstance(child_result, StopPhase):
+            # do not print
+            raise child_result
+
+        # let the caller know which package went wrong.
+        if isinstance(child_result, InstallError):
+            child_result.pkg = pkg
+
+        if isinstance(child_result, ChildError):
+            # If the child process raised an error, print its output here rather
+            # than waiting until the call to SpackError.die() in main(). This
+            # allows exception handling output to be logged from within Spack.
+            # see spack.main.SpackCommand.
+            child_result.print_context()
+            raise child_result
+
+        # Fallback. Usually caught beforehand in EOFError above.
+        if p.exitcode != 0:
+            raise InstallError(f"The process failed unexpectedly ({self._exitcode_msg()})")
+
+        return child_result
+
+    def terminate(self):
+        """Stop the child process, without collecting its result."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
 def start_build_process(pkg, function, kwargs):
-    """Create a child process to do part of a spack build.
+    """Create a child process to do part of a spack build, and wait for it to finish.
 
     Args:
 
@@ -1214,89 +1371,7 @@ def child_fun():
     For more information on `multiprocessing` child process creation
     mechanisms, see https://docs.python.org/3/library/multiprocessing.html#contexts-and-start-methods
     """
-    read_pipe, write_pipe = multiprocessing.Pipe(duplex=False)
-    input_multiprocess_fd = None
-    jobserver_fd1 = None
-    jobserver_fd2 = None
-
-    serialized_pkg = spack.subprocess_context.PackageInstallContext(pkg)
-
-    try:
-        # Forward sys.stdin when appropriate, to allow toggling verbosity
-        if sys.platform != "win32" and sys.stdin.isatty() and hasattr(sys.stdin, "fileno"):
-            input_fd = os.dup(sys.stdin.fileno())
-            input_multiprocess_fd = MultiProcessFd(input_fd)
-        mflags = os.environ.get("MAKEFLAGS", False)
-        if mflags:
-            m = re.search(r"--jobserver-[^=]*=(\d),(\d)", mflags)
-            if m:
-                jobserver_fd1 = MultiProcessFd(int(m.group(1)))
-                jobserver_fd2 = MultiProcessFd(int(m.group(2)))
-
-        p = multiprocessing.Process(
-            target=_setup_pkg_and_run,
-            args=(
-                serialized_pkg,
-                function,
-                kwargs,
-                write_pipe,
-                input_multiprocess_fd,
-                jobserver_fd1,
-                jobserver_fd2,
-            ),
-        )
-
-        p.start()
-
-        # We close the writable end of the pipe now to be sure that p is the
-        # only process which owns a handle for it. This ensures that when p
-        # closes its handle for the writable end, read_pipe.recv() will
-        # promptly report the readable end as being ready.
-        write_pipe.close()
-
-    except InstallError as e:
-        e.pkg = pkg
-        raise
-
-    finally:
-        # Close the input stream in the parent process
-        if input_multiprocess_fd is not None:
-            input_multiprocess_fd.close()
-
-    def exitcode_msg(p):
-        typ = "exit" if p.exitcode >= 0 else "signal"
-        return f"{typ} {abs(p.exitcode)}"
-
-    try:
-        child_result = read_pipe.recv()
-    except EOFError:
-        p.join()
-        raise InstallError(f"The process has stopped unexpectedly ({exitcode_msg(p)})")
-
-    p.join()
-
-    # If returns a StopPhase, raise it
-    if isinstance(child_result, StopPhase):
-        # do not print
-        raise child_result
-
-    # let the caller know which package went wrong.
-    if isinstance(child_result, InstallError):
-        child_result.pkg = pkg
-
-    if isinstance(child_result, ChildError):
-        # If the child process raised an error, print its output here rather
-        # than waiting until the call to SpackError.die() in main(). This
-        # allows exception handling output to be logged from within Spack.
-        # see spack.main.SpackCommand.
-        child_result.print_context()
-        raise child_result
-
-    # Fallback. Usually caught beforehand in EOFError above.
-    if p.exitcode != 0:
-        raise InstallError(f"The process failed unexpectedly ({exitcode_msg(p)})")
-
-    return child_result
+    return BuildProcess(pkg, function, kwargs).complete()
 
 
 CONTEXT_BASES = (spack.package_base.PackageBase, spack.build_systems._checks.BaseBuilder)
@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import argparse
+import importlib
 import os
 import re
 import sys
@@ -12,12 +13,11 @@
 import llnl.string
 import llnl.util.tty as tty
 from llnl.util.filesystem import join_path
-from llnl.util.lang import attr_setdefault, index_by
+from llnl.util.lang import attr_setdefault, index_by, lazy_import
 from llnl.util.tty.colify import colify
 from llnl.util.tty.color import colorize
 
 import spack.config
-import spack.environment as ev
 import spack.error
 import spack.extensions
 import spack.parser
@@ -25,10 +25,13 @@
 import spack.spec
 import spack.store
 import spack.traverse as traverse
-import spack.user_environment as uenv
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 
+#: Environments are imported only by the commands that need them
+ev = lazy_import("spack.environment")
+uenv = lazy_import("spack.user_environment")
+
 # cmd has a submodule called "list" so preserve the python list module
 python_list = list
 
@@ -38,6 +41,29 @@
 SETUP_PARSER = "setup_parser"
 DESCRIPTION = "description"
 
+#: Commands whose modules are imported before the package machinery. The modules of the
+#: other commands are imported after ``spack.environment``, since the modules that define
+#: packages, builders and the installer import each other, and import correctly only in
+#: that order.
+LIGHTWEIGHT_COMMANDS = frozenset(
+    [
+        "arch",
+        "cd",
+        "commands",
+        "compiler",
+        "compilers",
+        "config",
+        "docs",
+        "help",
+        "list",
+        "location",
+        "maintainers",
+        "repo",
+        "tags",
+        "versions",
+    ]
+)
+
 
 def python_name(cmd_name):
     """Convert ``-`` to ``_`` in command name, to make a valid identifier."""
@@ -112,6 +138,9 @@ def get_module(cmd_name):
     require_cmd_name(cmd_name)
     pname = python_name(cmd_name)
 
+    if cmd_name not in LIGHTWEIGHT_COMMANDS:
+        importlib.import_module("spack.environment")
+
     try:
         # Try to import the command from the built-in directory
         module_name = "%s.%s" % (__name__, pname)
@@ -569,7 +598,8 @@ def find_environment(args):
 
         # if no argument, look for the environment variable
         if not env:
-            env = os.environ.get(ev.spack_env_var)
+            # same as ev.spack_env_var, which would import spack.environment for every command
+            env = os.environ.get("SPACK_ENV")
 
             # nothing was set; there's no active environment
             if not env:
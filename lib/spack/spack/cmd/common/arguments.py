@@ -8,19 +8,19 @@
 import os.path
 import textwrap
 
-from llnl.util.lang import stable_partition
+from llnl.util.lang import lazy_import, stable_partition
 
 import spack.cmd
 import spack.config
 import spack.deptypes as dt
-import spack.environment as ev
 import spack.mirror
-import spack.modules
-import spack.reporters
 import spack.spec
 import spack.store
 from spack.util.pattern import Args
 
+ev = lazy_import("spack.environment")
+reporters = lazy_import("spack.reporters")
+
 __all__ = ["add_common_arguments"]
 
 #: dictionary of argument-generating functions, keyed by name
@@ -174,7 +174,7 @@ def installed_specs(args):
                         packages.append(s.format())
             return packages
 
-        configuration = spack.reporters.CDashConfiguration(
+        configuration = reporters.CDashConfiguration(
             upload_url=namespace.cdash_upload_url,
             packages=installed_specs(namespace),
             build=namespace.cdash_build,
@@ -182,7 +182,7 @@ def installed_specs(args):
             buildstamp=namespace.cdash_buildstamp,
             track=namespace.cdash_track,
         )
-        return spack.reporters.CDash(configuration=configuration)
+        return reporters.CDash(configuration=configuration)
 
     return _factory
 
@@ -193,7 +193,7 @@ class CreateReporter(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         setattr(namespace, self.dest, values)
         if values == "junit":
-            setattr(namespace, "reporter", spack.reporters.JUnit)
+            setattr(namespace, "reporter", reporters.JUnit)
         elif values == "cdash":
             setattr(namespace, "reporter", _cdash_reporter(namespace))
 
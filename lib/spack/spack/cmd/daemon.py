@@ -0,0 +1,118 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import datetime
+import os
+import sys
+import time
+
+import llnl.util.tty as tty
+
+import spack.daemon
+import spack.paths
+
+description = "keep spack in memory to run read-only commands faster"
+section = "developer"
+level = "long"
+
+
+def setup_parser(subparser):
+    sp = subparser.add_subparsers(metavar="SUBCOMMAND", dest="daemon_command")
+
+    start_parser = sp.add_parser("start", help=daemon_start.__doc__)
+    start_parser.add_argument(
+        "-f", "--foreground", action="store_true", help="do not detach from the terminal"
+    )
+    start_parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="exit after this many seconds without requests",
+    )
+
+    sp.add_parser("stop", help=daemon_stop.__doc__)
+    sp.add_parser("status", help=daemon_status.__doc__)
+
+
+def _detach(log_path):
+    """Fork twice, and return False in the original process, and True in a process that is
+    detached from the terminal, with its output in a log file.
+    """
+    if os.fork() != 0:
+        return False
+
+    os.setsid()
+    if os.fork() != 0:
+        os._exit(0)
+
+    with open(os.devnull, "r") as devnull, open(log_path, "a") as log:
+        os.dup2(devnull.fileno(), sys.stdin.fileno())
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+    return True
+
+
+def daemon_start(args):
+    """start a daemon for this spack instance"""
+    path = spack.daemon.socket_path()
+    if spack.daemon.request({"status": True}, path) is not None:
+        tty.die(f"a spack daemon is already running on {path}")
+    if os.path.exists(path):
+        os.unlink(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    restart_argv = [sys.executable, spack.paths.spack_script, "daemon", "start", "--foreground"]
+    if args.idle_timeout:
+        restart_argv.extend(["--idle-timeout", str(args.idle_timeout)])
+
+    if not args.foreground:
+        log_path = os.path.splitext(path)[0] + ".log"
+        if not _detach(log_path):
+            # wait for the daemon to load spack before returning
+            for _ in range(600):
+                status = spack.daemon.request({"status": True}, path)
+                if status:
+                    tty.msg(f"Started spack daemon {status['pid']} on {path}")
+                    return
+                time.sleep(0.1)
+            tty.die(f"the spack daemon did not start, see {log_path}")
+
+    daemon = spack.daemon.Daemon(path, restart_argv, idle_timeout=args.idle_timeout)
+    daemon.load()
+    tty.msg(f"Spack daemon {os.getpid()} listening on {path}")
+    daemon.serve()
+    if not args.foreground:
+        os._exit(0)
+
+
+def daemon_stop(args):
+    """stop the daemon of this spack instance"""
+    if spack.daemon.request({"stop": True}) is None:
+        tty.die("no spack daemon is running")
+    tty.msg("Stopped spack daemon")
+
+
+def daemon_status(args):
+    """show whether a daemon is running, and its statistics"""
+    status = spack.daemon.request({"status": True})
+    if status is None:
+        tty.msg("No spack daemon is running")
+        return 1
+
+    started = datetime.datetime.fromtimestamp(status["started"]).isoformat(" ", "seconds")
+    print(f"pid:       {status['pid']}")
+    print(f"socket:    {status['socket']}")
+    print(f"started:   {started}")
+    print(f"requests:  {status['requests']}")
+    print(f"running:   {status['running']}")
+
+
+def daemon(parser, args):
+    if sys.platform == "win32":
+        tty.die("spack daemon is not supported on Windows")
+
+    action = {"start": daemon_start, "stop": daemon_stop, "status": daemon_status}
+    return action[args.daemon_command](args)
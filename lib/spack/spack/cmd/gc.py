@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import llnl.util.tty as tty
+from llnl.string import plural
 
 import spack.cmd.common.arguments
 import spack.cmd.common.confirmation
@@ -100,9 +101,14 @@ def gc(parser, args):
         specs = spack.store.STORE.db.unused_specs(root_hashes=root_hashes, deptype=deptype)
         if not specs:
             tty.msg("There are no unused specs. Spack's store is clean.")
-            return
+        else:
+            if not args.yes_to_all:
+                spack.cmd.common.confirmation.confirm_action(specs, "uninstalled", "uninstall")
 
-        if not args.yes_to_all:
-            spack.cmd.common.confirmation.confirm_action(specs, "uninstalled", "uninstall")
+            spack.cmd.uninstall.do_uninstall(specs, force=False)
 
-        spack.cmd.uninstall.do_uninstall(specs, force=False)
+    # Shared files that were only used by uninstalled specs are removed
+    if spack.store.STORE.blobs is not None:
+        files, size = spack.store.STORE.blobs.prune()
+        if files:
+            tty.msg(f"Removed {plural(files, 'unused shared file')} ({size} bytes)")
@@ -49,6 +49,8 @@ def install_kwargs_from_args(args):
 
     return {
         "fail_fast": args.fail_fast,
+        "concurrent_fetches": args.concurrent_fetches,
+        "concurrent_packages": args.concurrent_packages,
         "keep_prefix": args.keep_prefix,
         "keep_stage": args.keep_stage,
         "restage": not args.dont_restage,
@@ -88,6 +90,14 @@ def setup_parser(subparser):
         help="phase to stop after when installing (default None)",
     )
     arguments.add_common_arguments(subparser, ["jobs"])
+    subparser.add_argument(
+        "-p",
+        "--concurrent-packages",
+        type=int,
+        default=1,
+        metavar="N",
+        help="build up to N packages at the same time, sharing the parallel jobs among them",
+    )
     subparser.add_argument(
         "--overwrite",
         action="store_true",
@@ -149,6 +159,14 @@ def setup_parser(subparser):
         "- `never` behaves like --no-cache",
     )
 
+    subparser.add_argument(
+        "--concurrent-fetches",
+        type=int,
+        default=1,
+        metavar="N",
+        help="download up to N binary packages at the same time, ahead of their installation",
+    )
+
     subparser.add_argument(
         "--include-build-deps",
         action="store_true",
@@ -117,9 +117,9 @@ def match(p, f):
                 if f.match(p):
                     return True
 
-                pkg_cls = spack.repo.PATH.get_pkg_class(p)
-                if pkg_cls.__doc__:
-                    return f.match(pkg_cls.__doc__)
+                doc = spack.repo.PATH.metadata_index[p]["doc"]
+                if doc:
+                    return f.match(doc)
                 return False
 
         else:
@@ -6,15 +6,16 @@
 import os
 
 import llnl.util.tty as tty
+from llnl.util.lang import lazy_import
 
-import spack.builder
 import spack.cmd
-import spack.environment as ev
 import spack.paths
 import spack.repo
 import spack.stage
 from spack.cmd.common import arguments
 
+ev = lazy_import("spack.environment")
+
 description = "print out locations of packages and spack directories"
 section = "basic"
 level = "long"
@@ -141,7 +142,9 @@ def location(parser, args):
     # Either concretize or filter from already concretized environment
     spec = spack.cmd.matching_spec_from_env(spec)
     pkg = spec.package
-    builder = spack.builder.create(pkg)
+    from spack.builder import create  # after spec.package, to avoid circular imports
+
+    builder = create(pkg)
 
     if args.stage_dir:
         print(pkg.stage.path)
@@ -8,6 +8,8 @@
 
 import spack.environment as ev
 import spack.store
+import spack.util.cpus
+import spack.util.spack_json as sjson
 import spack.verify
 
 description = "check that all spack packages are on disk as installed"
@@ -25,6 +27,20 @@ def setup_parser(subparser):
         "-j", "--json", action="store_true", help="ouptut json-formatted errors"
     )
     subparser.add_argument("-a", "--all", action="store_true", help="verify all packages")
+    subparser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of processes hashing files (default: number of build jobs)",
+    )
+    subparser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="do not hash files whose size, mtime and inode are unchanged since installation",
+    )
+    subparser.add_argument(
+        "--report", metavar="FILE", help="write a json report of all the verified entries to FILE"
+    )
     subparser.add_argument(
         "specs_or_files", nargs=argparse.REMAINDER, help="specs or files to verify"
     )
@@ -50,6 +66,11 @@ def setup_parser(subparser):
     )
 
 
+def _write_report(filename, report):
+    with open(filename, "w") as f:
+        sjson.dump(report, f)
+
+
 def verify(parser, args):
     local = args.local
 
@@ -58,14 +79,19 @@ def verify(parser, args):
             setup_parser.parser.print_help()
             return 1
 
+        report = {}
         for file in args.specs_or_files:
             results = spack.verify.check_file_manifest(file)
+            report[file] = results.errors.get(file, [])
             if results.has_errors():
                 if args.json:
                     print(results.json_string())
                 else:
                     print(results)
 
+        if args.report:
+            _write_report(args.report, {"files": report})
+
         return 0
     else:
         spec_args = spack.cmd.parse_specs(args.specs_or_files)
@@ -90,15 +116,32 @@ def verify(parser, args):
         setup_parser.parser.print_help()
         return 1
 
-    for spec in specs:
-        tty.debug("Verifying package %s")
-        results = spack.verify.check_spec_manifest(spec)
+    jobs = args.jobs or spack.util.cpus.determine_number_of_jobs(parallel=True)
+    tty.debug(f"Verifying {len(specs)} packages with {jobs} processes")
+    all_results = spack.verify.check_spec_manifests(specs, incremental=args.incremental, jobs=jobs)
+
+    if args.report:
+        report = [
+            {
+                "name": spec.name,
+                "hash": spec.dag_hash(),
+                "prefix": str(spec.prefix),
+                "errors": results.errors,
+            }
+            for spec, results in zip(specs, all_results)
+        ]
+        _write_report(args.report, {"incremental": args.incremental, "specs": report})
+
+    failed = False
+    for spec, results in zip(specs, all_results):
         if results.has_errors():
+            failed = True
             if args.json:
                 print(results.json_string())
             else:
                 tty.msg("In package %s" % spec.format("{name}/{hash:7}"))
                 print(results)
-            return 1
         else:
             tty.debug(results)
+
+    return 1 if failed else 0
@@ -0,0 +1,458 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Resident Spack process, which keeps the configuration, the package repositories and the
+database of installed packages in memory, and runs read-only commands for the ``spack``
+front-end.
+
+The daemon listens on a Unix socket. The front-end sends it the command line, the working
+directory and the environment of a command, together with its standard streams as file
+descriptors. The daemon forks a child, which runs the command on those streams and sends
+back its exit code. Commands start from the state of the daemon, but can't modify it.
+
+Before forking, the daemon checks the modification times of the configuration files, of the
+package repositories and of all their package files, and restarts if any of them changed,
+since the indexes of the repositories would be stale otherwise. It reads the database again
+if it changed.
+
+The front-end imports this module before any other Spack module, so only the standard
+library is imported at the top level.
+"""
+import array
+import concurrent.futures
+import hashlib
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+#: Commands that the front-end forwards to the daemon, mapped to the subcommands that are
+#: forwarded, or to None if all of them are
+COMMANDS: Dict[str, Optional[Set[str]]] = {
+    "arch": None,
+    "commands": None,
+    "compilers": None,
+    "config": {"blame", "get", "list"},
+    "dependencies": None,
+    "dependents": None,
+    "env": {"activate", "deactivate", "list", "ls", "st", "status"},
+    "extensions": None,
+    "find": None,
+    "info": None,
+    "list": None,
+    "load": None,
+    "location": None,
+    "mirror": {"list"},
+    "providers": None,
+    "repo": {"list"},
+    "resource": {"list"},
+    "tags": None,
+    "unload": None,
+}
+
+#: Options that make forwarded subcommands modify the state of Spack, e.g. by creating an
+#: environment, so that they are not forwarded
+REJECTED_OPTIONS: Dict[Tuple[str, str], Set[str]] = {
+    ("env", "activate"): {"--create", "--envfile", "--keep-relative", "--temp"}
+}
+
+#: Environment variables that determine the configuration. The daemon runs only the commands
+#: of clients that have the same values as the daemon.
+CONFIGURATION_VARIABLES = (
+    "HOME",
+    "SPACK_DISABLE_LOCAL_CONFIG",
+    "SPACK_SYSTEM_CONFIG_PATH",
+    "SPACK_USER_CACHE_PATH",
+    "SPACK_USER_CONFIG_PATH",
+)
+
+#: Length of the messages exchanged on the socket, which are json objects
+_HEADER = struct.Struct("!I")
+
+
+def socket_path() -> str:
+    """Path of the socket of the daemon of this Spack instance.
+
+    It can be set with ``SPACK_DAEMON_SOCKET``, otherwise it is in the user cache path
+    (see ``spack.paths``, which is too slow to import here).
+    """
+    path = os.environ.get("SPACK_DAEMON_SOCKET")
+    if path:
+        return path
+    prefix = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+    digest = hashlib.sha1(os.path.abspath(prefix).encode("utf-8")).hexdigest()[:8]
+    cache_path = os.path.expanduser(os.getenv("SPACK_USER_CACHE_PATH") or "~%s.spack" % os.sep)
+    return os.path.join(cache_path, f"daemon-{digest}.sock")
+
+
+def forwardable(argv: Sequence[str]) -> bool:
+    """Whether the daemon can run a command line, i.e. whether it is one of the read-only
+    ``COMMANDS``, or ``--print-shell-vars``, optionally preceded by ``--color``, and has
+    none of the ``REJECTED_OPTIONS`` of its subcommand.
+    """
+    args = list(argv)
+    while args and args[0].startswith("--color"):
+        args = args[2:] if args[0] == "--color" else args[1:]
+
+    if len(args) == 2 and args[0] == "--print-shell-vars":
+        return True
+    if not args or args[0] not in COMMANDS:
+        return False
+    subcommands = COMMANDS[args[0]]
+    if subcommands is not None and (len(args) < 2 or args[1] not in subcommands):
+        return False
+
+    # argparse accepts unambiguous prefixes of long options
+    rejected = REJECTED_OPTIONS.get(tuple(args[:2]), set())
+    for arg in args[2:]:
+        option = arg.split("=", 1)[0]
+        if option.startswith("--") and any(r.startswith(option) for r in rejected):
+            return False
+    return True
+
+
+def _send(sock: socket.socket, message: dict, fds: Sequence[int] = ()) -> None:
+    data = json.dumps(message).encode("utf-8")
+    data = _HEADER.pack(len(data)) + data
+    ancillary = []
+    if fds:
+        ancillary.append((socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds)))
+    sent = sock.sendmsg([data], ancillary)
+    if sent < len(data):
+        sock.sendall(data[sent:])
+
+
+def _receive(sock: socket.socket, maxfds: int = 0) -> Tuple[dict, List[int]]:
+    fds = array.array("i")
+    data, ancillary, _, _ = sock.recvmsg(65536, socket.CMSG_SPACE(maxfds * fds.itemsize))
+    for level, kind, fd_data in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fds.frombytes(fd_data[: len(fd_data) - len(fd_data) % fds.itemsize])
+
+    while len(data) < _HEADER.size or len(data) < _HEADER.size + _HEADER.unpack_from(data)[0]:
+        chunk = sock.recv(65536)
+        if not chunk:
+            for fd in fds:
+                os.close(fd)
+            raise ConnectionError("connection closed by the daemon or its client")
+        data += chunk
+
+    (size,) = _HEADER.unpack_from(data)
+    return json.loads(data[_HEADER.size : _HEADER.size + size]), list(fds)
+
+
+def _connect(path: str) -> Optional[socket.socket]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(message: dict, path: Optional[str] = None) -> Optional[dict]:
+    """Send a control message to the daemon, and return its reply, or None if no daemon
+    is running.
+    """
+    sock = _connect(path or socket_path())
+    if sock is None:
+        return None
+    with sock:
+        _send(sock, message)
+        return _receive(sock)[0]
+
+
+def forward(argv: Sequence[str]) -> Optional[int]:
+    """Run a command line in the daemon, if one is running and the command is read-only.
+
+    Return the exit code of the command, or None if it must run in this process. Setting
+    ``SPACK_DAEMON=0`` disables forwarding.
+    """
+    if sys.platform == "win32" or os.environ.get("SPACK_DAEMON") == "0":
+        return None
+    if not forwardable(argv):
+        return None
+
+    sock = _connect(socket_path())
+    if sock is None:
+        return None
+
+    with sock:
+        try:
+            message = {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+            _send(sock, {"run": message}, fds=(0, 1, 2))
+            reply, _ = _receive(sock)
+        except (OSError, ValueError):
+            return None
+        if not reply.get("accepted"):
+            return None
+
+        # From now on the command is running in the daemon, on our standard streams
+        while True:
+            try:
+                reply, _ = _receive(sock)
+                return reply["returncode"]
+            except KeyboardInterrupt:
+                os.kill(reply["pid"], signal.SIGINT)
+            except (OSError, ValueError, KeyError) as e:
+                sys.stderr.write(f"==> Error: lost connection with the spack daemon: {e}\n")
+                return 1
+
+
+class Daemon:
+    """Serves the commands forwarded by the front-end on a Unix socket.
+
+    Args:
+        path: path of the socket
+        restart_argv: command line that starts the daemon again, in the foreground
+        idle_timeout: number of seconds without requests after which the daemon exits, or
+            None to never exit
+    """
+
+    def __init__(
+        self, path: str, restart_argv: List[str], idle_timeout: Optional[float] = None
+    ) -> None:
+        self.path = path
+        self.restart_argv = restart_argv
+        self.idle_timeout = idle_timeout
+        self.started = time.time()
+        self.last_request = self.started
+        self.requests = 0
+        self.stopped = False
+        self.children: Set[int] = set()
+        self._config_snapshot: Dict[str, Optional[int]] = {}
+        self._database_snapshot: Dict[str, Optional[int]] = {}
+        self._stat_threads = 1
+
+    def load(self) -> None:
+        """Read the configuration, the package repositories and the database, import the
+        modules of the forwarded commands, and the packages that are installed.
+        """
+        import spack.cmd
+        import spack.config
+        import spack.repo
+        import spack.store
+
+        for section in spack.config.SECTION_SCHEMAS:
+            spack.config.CONFIG.get_config(section)
+
+        spack.repo.PATH.all_package_names()
+        spack.repo.PATH.provider_index.providers
+        with spack.store.STORE.db.read_transaction():
+            installed = spack.store.STORE.db.query()
+        for name in sorted(set(spec.name for spec in installed)):
+            if spack.repo.PATH.exists(name):
+                spack.repo.PATH.get_pkg_class(name)
+
+        for command in COMMANDS:
+            spack.cmd.get_module(command)
+
+        # the package files are checked on every request, with as many threads as they are
+        # when the repositories are indexed
+        self._stat_threads = spack.config.get("config:repo_stat_threads", 1)
+        self._config_snapshot = self._snapshot(self._config_paths(), self._stat_threads)
+        self._database_snapshot = self._snapshot(self._database_paths())
+
+    def _config_paths(self) -> List[str]:
+        """Configuration files, package repositories and their package files"""
+        import spack.config
+        import spack.repo
+
+        paths = []
+        for scope in spack.config.CONFIG.scopes.values():
+            path = getattr(scope, "path", None)
+            if not path:
+                continue
+            # the files of directory scopes, not the directories, which may hold other files
+            if os.path.isdir(path):
+                paths.extend(os.path.join(path, f"{s}.yaml") for s in spack.config.SECTION_SCHEMAS)
+            else:
+                paths.append(path)
+
+        # all the package files, since any of them may change the provider, tag and metadata
+        # indexes of the repository, not only those that are imported
+        for repo in spack.repo.PATH.repos:
+            paths.extend((repo.config_file, repo.packages_path))
+            paths.extend(
+                repo.package_path(name) for name in repo.all_package_names(include_virtuals=True)
+            )
+        return paths
+
+    def _database_paths(self) -> List[str]:
+        import spack.store
+
+        db = spack.store.STORE.db
+        return [db._index_path, db._sqlite_index_path, db._journal_path, db._verifier_path]
+
+    @staticmethod
+    def _snapshot(paths: List[str], threads: int = 1) -> Dict[str, Optional[int]]:
+        def _mtimes(chunk: List[str]) -> Dict[str, Optional[int]]:
+            result: Dict[str, Optional[int]] = {}
+            for path in chunk:
+                try:
+                    result[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    result[path] = None
+            return result
+
+        threads = min(threads, len(paths))
+        if threads <= 1:
+            return _mtimes(paths)
+        snapshot: Dict[str, Optional[int]] = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            for mtimes in executor.map(_mtimes, [paths[i::threads] for i in range(threads)]):
+                snapshot.update(mtimes)
+        return snapshot
+
+    def up_to_date(self) -> bool:
+        """Read the database again if it changed, and return False if the configuration or
+        the packages changed, in which case the daemon must restart.
+        """
+        import spack.store
+
+        config_snapshot = self._snapshot(list(self._config_snapshot), self._stat_threads)
+        if config_snapshot != self._config_snapshot:
+            return False
+
+        database_snapshot = self._snapshot(list(self._database_snapshot))
+        if database_snapshot != self._database_snapshot:
+            with spack.store.STORE.db.read_transaction():
+                pass
+            self._database_snapshot = database_snapshot
+        return True
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "started": self.started,
+            "requests": self.requests,
+            "running": len(self.children),
+        }
+
+    def serve(self) -> None:
+        """Accept requests until the daemon is stopped, or restarted."""
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(16)
+        listener.settimeout(1.0)
+
+        restart = False
+        try:
+            while not self.stopped and not restart:
+                self._reap()
+                try:
+                    connection, _ = listener.accept()
+                except socket.timeout:
+                    if self.idle_timeout and time.time() - self.last_request > self.idle_timeout:
+                        break
+                    continue
+
+                with connection:
+                    connection.settimeout(None)
+                    self.last_request = time.time()
+                    restart = not self._handle(connection, listener)
+        finally:
+            listener.close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+        if restart:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execv(self.restart_argv[0], self.restart_argv)
+
+    def _reap(self) -> None:
+        for pid in list(self.children):
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done = pid
+            if done:
+                self.children.discard(pid)
+
+    def _handle(self, connection: socket.socket, listener: socket.socket) -> bool:
+        """Handle a request, and return False if the daemon must restart"""
+        try:
+            message, fds = _receive(connection, maxfds=3)
+        except (OSError, ValueError):
+            return True
+
+        try:
+            if "status" in message:
+                _send(connection, self.status())
+            elif "stop" in message:
+                self.stopped = True
+                _send(connection, {"stopped": True})
+            elif "run" in message:
+                run = message["run"]
+                env = run["env"]
+                if len(fds) != 3 or any(
+                    env.get(var) != os.environ.get(var) for var in CONFIGURATION_VARIABLES
+                ):
+                    _send(connection, {"accepted": False})
+                elif not self.up_to_date():
+                    _send(connection, {"accepted": False})
+                    return False
+                else:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    pid = os.fork()
+                    if pid == 0:
+                        self._run(connection, listener, run, fds)
+                    self.children.add(pid)
+                    self.requests += 1
+        except OSError:
+            pass
+        finally:
+            for fd in fds:
+                os.close(fd)
+        return True
+
+    def _run(
+        self, connection: socket.socket, listener: socket.socket, run: dict, fds: List[int]
+    ) -> None:
+        """Run a command in a child of the daemon, on the standard streams of the client"""
+        import spack.main
+        import spack.paths
+
+        returncode = 1
+        try:
+            listener.close()
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+            _send(connection, {"accepted": True, "pid": os.getpid()})
+
+            os.chdir(run["cwd"])
+            os.environ.clear()
+            os.environ.update(run["env"])
+            sys.argv = [spack.paths.spack_script] + run["argv"]
+            returncode = spack.main.main(run["argv"]) or 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                returncode = e.code or 0
+            else:
+                sys.stderr.write(f"{e.code}\n")
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                _send(connection, {"returncode": returncode})
+            except BaseException:
+                pass
+            os._exit(returncode)
@@ -18,8 +18,10 @@
 provides a cache and a sanity checking mechanism for what is in the
 filesystem.
 """
+import collections.abc
 import contextlib
 import datetime
+import hashlib
 import os
 import pathlib
 import socket
@@ -31,7 +33,10 @@
     Container,
     Dict,
     Generator,
+    Iterable,
+    Iterator,
     List,
+    MutableMapping,
     NamedTuple,
     Optional,
     Set,
@@ -48,13 +53,22 @@
     _use_uuid = False
     pass
 
+try:
+    import sqlite3
+
+    _use_sqlite = True
+except ImportError:
+    _use_sqlite = False
+
 import llnl.util.filesystem as fs
 import llnl.util.tty as tty
 
 import spack.deptypes as dt
 import spack.hash_types as ht
+import spack.repo
 import spack.spec
 import spack.traverse as tr
+import spack.util.file_cache
 import spack.util.lock as lk
 import spack.util.spack_json as sjson
 import spack.version as vn
@@ -68,6 +82,16 @@
 #: DB goes in this directory underneath the root
 _DB_DIRNAME = ".spack-db"
 
+#: Formats of the on-disk database index. The "sqlite" format writes an indexed copy of the
+#: records next to ``index.json``, from which specs are reconstructed only when accessed.
+DB_FORMATS = ("json", "sqlite")
+
+#: Prefix of the keys of upstream database snapshots in the misc cache
+_SNAPSHOT_PREFIX = "db-snapshots"
+
+#: Version of the format of upstream database snapshots
+_SNAPSHOT_FORMAT = 1
+
 #: DB version.  This is stuck in the DB file to track changes in format.
 #: Increment by one when the database format changes.
 #: Versions before 5 were not integers.
@@ -174,6 +198,15 @@ def canonicalize(cls, query_arg):
         )
 
 
+def _install_status(installed: bool, deprecated_for: Optional[str]) -> InstallStatus:
+    if installed:
+        return InstallStatuses.INSTALLED
+    elif deprecated_for:
+        return InstallStatuses.DEPRECATED
+    else:
+        return InstallStatuses.MISSING
+
+
 class InstallRecord:
     """A record represents one installation in the DB.
 
@@ -221,14 +254,13 @@ def __init__(
         self.in_buildcache = in_buildcache
         self.origin = origin
 
+    @property
+    def install_status(self) -> InstallStatus:
+        return _install_status(self.installed, self.deprecated_for)
+
     def install_type_matches(self, installed):
         installed = InstallStatuses.canonicalize(installed)
-        if self.installed:
-            return InstallStatuses.INSTALLED in installed
-        elif self.deprecated_for:
-            return InstallStatuses.DEPRECATED in installed
-        else:
-            return InstallStatuses.MISSING in installed
+        return self.install_status in installed
 
     def to_dict(self, include_fields=DEFAULT_INSTALL_RECORD_FIELDS):
         rec_dict = {}
@@ -273,6 +305,254 @@ def __reduce__(self):
         return ForbiddenLock, tuple()
 
 
+class _RawRecord(NamedTuple):
+    """Serialized install record, as stored in the sqlite index of the database, together
+    with the fields needed to index it.
+    """
+
+    #: name of the package
+    name: str
+    #: namespace of the package
+    namespace: Optional[str]
+    #: installation prefix, if the spec is installed and not external
+    prefix: Optional[str]
+    #: installation status of the record
+    status: str
+    #: whether the spec was installed explicitly
+    explicit: bool
+    #: install record, in JSON format
+    text: str
+
+    @staticmethod
+    def from_dict(rec: Dict[str, Any]) -> "_RawRecord":
+        spec = rec["spec"]
+        installed = rec.get("installed") and "external" not in spec
+        status = _install_status(rec.get("installed"), rec.get("deprecated_for"))
+        return _RawRecord(
+            name=spec["name"],
+            namespace=spec.get("namespace"),
+            prefix=rec.get("path") if installed else None,
+            status=str(status),
+            explicit=bool(rec.get("explicit")),
+            text=sjson.dump(rec),
+        )
+
+    @staticmethod
+    def from_record(record: InstallRecord, include_fields=DEFAULT_INSTALL_RECORD_FIELDS):
+        return _RawRecord.from_dict(record.to_dict(include_fields=include_fields))
+
+
+class LazyInstallRecords(collections.abc.MutableMapping):
+    """Mapping from DAG hashes to install records, where the spec of each record is
+    reconstructed from its serialized form only when the record is first accessed.
+
+    Checking whether a hash is in the mapping, or iterating over the hashes, doesn't
+    require reconstructing any spec.
+
+    Args:
+        db: database the records belong to
+        raw: serialized records, keyed by DAG hash
+        spec_reader: reader for the serialized specs
+        path: file the records were read from, used in error messages
+    """
+
+    def __init__(
+        self,
+        db: "Database",
+        raw: Dict[str, _RawRecord],
+        spec_reader: Type["spack.spec.SpecfileReaderBase"],
+        path: str,
+    ) -> None:
+        self._db = db
+        self._raw = raw
+        self._spec_reader = spec_reader
+        self._path = path
+        self._records: Dict[str, InstallRecord] = {}
+        self._keys: Dict[str, None] = dict.fromkeys(raw)
+
+    def raw(self, key: str) -> Optional[_RawRecord]:
+        """Return the serialized form of a record that has not been accessed yet, or None."""
+        return self._raw.get(key)
+
+    def set_raw(self, key: str, raw: _RawRecord) -> None:
+        """Replace a record with a serialized one, to be reconstructed when accessed."""
+        self._records.pop(key, None)
+        self._raw[key] = raw
+        self._keys[key] = None
+
+    def _load(self, key: str) -> InstallRecord:
+        raw = self._raw[key]
+        try:
+            rec = sjson.load(raw.text)
+            installs = {key: rec}
+            spec = self._db._read_spec_from_dict(self._spec_reader, key, installs)
+            # Register the record before its dependencies are connected, so that it
+            # can be retrieved while reconstructing the rest of the DAG
+            self._records[key] = InstallRecord.from_dict(spec, rec)
+            self._db._assign_dependencies(self._spec_reader, key, installs, self)
+        except MissingDependenciesError:
+            self._records.pop(key, None)
+            raise
+        except Exception as e:
+            self._records.pop(key, None)
+            raise CorruptDatabaseError(
+                f"Invalid record in Spack database: hash: {key}, cause: "
+                f"{type(e).__name__}: {e}",
+                self._path,
+            ) from e
+
+        spec._mark_root_concrete()
+        del self._raw[key]
+        return self._records[key]
+
+    def __getitem__(self, key: str) -> InstallRecord:
+        record = self._records.get(key)
+        if record is not None:
+            return record
+        if key not in self._raw:
+            raise KeyError(key)
+        return self._load(key)
+
+    def __setitem__(self, key: str, value: InstallRecord) -> None:
+        self._raw.pop(key, None)
+        self._records[key] = value
+        self._keys[key] = None
+
+    def __delitem__(self, key: str) -> None:
+        del self._keys[key]
+        self._raw.pop(key, None)
+        self._records.pop(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class _QueryIndex:
+    """Secondary indexes on the install records of a database, used to select the records
+    that can match a query without reconstructing and testing every spec.
+
+    Each index maps a value to the DAG hashes of the records having it. Hashes are stored
+    as keys of dictionaries, to keep a deterministic order.
+
+    Args:
+        data: install records to be indexed
+    """
+
+    def __init__(self, data: MutableMapping[str, InstallRecord]) -> None:
+        #: records this index was built for
+        self.data = data
+        self.by_name: Dict[str, Dict[str, None]] = {}
+        self.by_namespace: Dict[Optional[str], Dict[str, None]] = {}
+        self.by_status: Dict[str, Dict[str, None]] = {}
+        self.by_explicit: Dict[bool, Dict[str, None]] = {}
+        self._entries: Dict[str, Tuple[str, Optional[str], str, bool]] = {}
+        for key in data:
+            self.update(key)
+
+    def _entry(self, key: str) -> Tuple[str, Optional[str], str, bool]:
+        raw = self.data.raw(key) if isinstance(self.data, LazyInstallRecords) else None
+        if raw is not None:
+            return raw.name, raw.namespace, raw.status, bool(raw.explicit)
+        rec = self.data[key]
+        return rec.spec.name, rec.spec.namespace, str(rec.install_status), bool(rec.explicit)
+
+    def update(self, key: str) -> None:
+        """Update the indexes after the record of a hash was added, modified or removed."""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            for index, value in zip(self._indexes, old):
+                index[value].pop(key, None)
+
+        if key in self.data:
+            new = self._entries[key] = self._entry(key)
+            for index, value in zip(self._indexes, new):
+                index.setdefault(value, {})[key] = None
+
+    @property
+    def _indexes(self):
+        return self.by_name, self.by_namespace, self.by_status, self.by_explicit
+
+    def with_names(self, names: Iterable[str]) -> Dict[str, None]:
+        result: Dict[str, None] = {}
+        for name in names:
+            result.update(self.by_name.get(name, {}))
+        return result
+
+    def with_namespace(self, namespace: str) -> Dict[str, None]:
+        # Records without a namespace match any namespace
+        return {**self.by_namespace.get(namespace, {}), **self.by_namespace.get(None, {})}
+
+    def with_status(self, installed) -> Optional[Dict[str, None]]:
+        statuses = InstallStatuses.canonicalize(installed)
+        if len(set(statuses)) == 3:
+            return None
+        result: Dict[str, None] = {}
+        for status in statuses:
+            result.update(self.by_status.get(str(status), {}))
+        return result
+
+    def select(self, selections: List[Optional[Dict[str, None]]]) -> Iterable[str]:
+        """Return the hashes that are in all the selections passed as input. A selection
+        that is None doesn't restrict the result.
+        """
+        selections = [x for x in selections if x is not None]
+        if not selections:
+            return list(self.data)
+        smallest = min(selections, key=len)
+        return [key for key in smallest if all(key in x for x in selections)]
+
+
+def _write_sqlite_index(path: str, records: Dict[str, _RawRecord], verifier: str) -> None:
+    """Write the records of a database to a new sqlite file.
+
+    Args:
+        path: path of the file to be written
+        records: serialized records, keyed by DAG hash
+        verifier: verifier of the JSON index the records are consistent with
+    """
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        # The file is written once, and then moved into place
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        with conn:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE installs (hash TEXT PRIMARY KEY, name TEXT NOT NULL, "
+                "namespace TEXT, prefix TEXT, status TEXT NOT NULL, explicit INTEGER NOT NULL, "
+                "record TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX installs_by_name ON installs (name)")
+            conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [("version", str(_DB_VERSION)), ("verifier", verifier)],
+            )
+            conn.executemany(
+                "INSERT INTO installs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((key, *r) for key, r in records.items()),
+            )
+
+
+def _read_sqlite_index(path: str, verifier: str) -> Optional[Dict[str, _RawRecord]]:
+    """Read the serialized records from a sqlite index.
+
+    Returns None if the index is not consistent with the verifier passed as argument, or
+    was written by a different version of the database.
+    """
+    uri = pathlib.Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+    with contextlib.closing(sqlite3.connect(uri, uri=True)) as conn:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("verifier") != verifier or meta.get("version") != str(_DB_VERSION):
+            return None
+        query = "SELECT hash, name, namespace, prefix, status, explicit, record FROM installs"
+        return {key: _RawRecord(*fields) for key, *fields in conn.execute(query)}
+
+
 _QUERY_DOCSTRING = """
 
         Args:
@@ -597,6 +877,9 @@ def __init__(
         upstream_dbs: Optional[List["Database"]] = None,
         is_upstream: bool = False,
         lock_cfg: LockConfiguration = DEFAULT_LOCK_CFG,
+        db_format: str = "json",
+        journal_size: int = 0,
+        snapshot_cache: Optional[spack.util.file_cache.FileCache] = None,
     ) -> None:
         """Database for Spack installations.
 
@@ -610,18 +893,40 @@ def __init__(
         If that does not exist, it will create a database when needed by scanning the entire
         store root for ``spec.json`` files according to Spack's directory layout.
 
+        With the ``sqlite`` format, an ``index.db`` file is written next to ``index.json``
+        after each write transaction. When it is consistent with ``index.json``, it is read
+        instead, and the spec of each record is reconstructed only when first accessed.
+
+        If ``journal_size`` is positive, write transactions append the records they modified
+        to an ``index.journal`` file, instead of rewriting the whole index. The journal is
+        compacted into ``index.json`` once it holds more than ``journal_size`` records.
+        Readers always replay a journal that is consistent with ``index.json``.
+
+        Upstream databases are only read, and can be shared by many users. If a
+        ``snapshot_cache`` is given, the records read from an upstream are stored there,
+        together with the size, modification time and verifier of its index. Later reads
+        load the snapshot while the index is unchanged, and reconstruct specs only when
+        their record is accessed.
+
         Args:
             root: root directory where to create the database directory.
             upstream_dbs: upstream databases for this repository.
             is_upstream: whether this repository is an upstream.
             lock_cfg: configuration for the locks to be used by this repository.
                 Relevant only if the repository is not an upstream.
+            db_format: format of the on-disk index, either "json" or "sqlite"
+            journal_size: maximum number of records in the journal before it is compacted.
+                If zero, each write transaction rewrites the whole index.
+            snapshot_cache: cache for snapshots of the database. Relevant only if the
+                repository is an upstream.
         """
         self.root = root
         self.database_directory = os.path.join(self.root, _DB_DIRNAME)
 
         # Set up layout of database files within the db dir
         self._index_path = os.path.join(self.database_directory, "index.json")
+        self._sqlite_index_path = os.path.join(self.database_directory, "index.db")
+        self._journal_path = os.path.join(self.database_directory, "index.journal")
         self._verifier_path = os.path.join(self.database_directory, "index_verifier")
         self._lock_path = os.path.join(self.database_directory, "lock")
 
@@ -629,7 +934,13 @@ def __init__(
         if not is_upstream and not os.path.exists(self.database_directory):
             fs.mkdirp(self.database_directory)
 
+        if db_format not in DB_FORMATS:
+            raise ValueError(f"invalid database format '{db_format}'")
+        self.db_format = db_format
+        self.journal_size = journal_size
+
         self.is_upstream = is_upstream
+        self.snapshot_cache = snapshot_cache if is_upstream else None
         self.last_seen_verifier = ""
         # Failed write transactions (interrupted by exceptions) will alert
         # _write. When that happens, we set this flag to indicate that
@@ -654,13 +965,28 @@ def __init__(
                 desc="database",
                 enable=lock_cfg.enable,
             )
-        self._data: Dict[str, InstallRecord] = {}
+        self._data: MutableMapping[str, InstallRecord] = {}
 
         # For every installed spec we keep track of its install prefix, so that
         # we can answer the simple query whether a given path is already taken
         # before installing a different spec.
         self._installed_prefixes: Set[str] = set()
 
+        # Keys of the records modified since the index was last read or written, which
+        # are appended to the journal at the end of a write transaction. None if the
+        # modifications are not known, and the whole index needs to be rewritten.
+        self._changed_keys: Optional[Set[str]] = None
+
+        # Secondary indexes used by queries, built on demand, and keys of the records that
+        # were modified since the indexes were last updated
+        self._query_index: Optional[_QueryIndex] = None
+        self._stale_query_keys: Set[str] = set()
+
+        # Position in the journal up to which entries have been replayed (0 if there is
+        # no journal consistent with the index), and number of records replayed so far
+        self._journal_offset = 0
+        self._journal_records = 0
+
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
 
         # whether there was an error at the start of a read transaction
@@ -689,9 +1015,13 @@ def _write_to_file(self, stream):
         This function does not do any locking or transactions.
         """
         # map from per-spec hash code to installation record.
-        installs = dict(
-            (k, v.to_dict(include_fields=self.record_fields)) for k, v in self._data.items()
-        )
+        installs = {}
+        for key in self._data:
+            raw = self._data.raw(key) if isinstance(self._data, LazyInstallRecords) else None
+            if raw is not None:
+                installs[key] = sjson.load(raw.text)
+            else:
+                installs[key] = self._data[key].to_dict(include_fields=self.record_fields)
 
         # database includes installation list and version.
 
@@ -926,6 +1256,9 @@ def _read_suppress_error():
             try:
                 if os.path.isfile(self._index_path):
                     self._read_from_file(self._index_path)
+                    self.last_seen_verifier = self._read_verifier()
+                    self._journal_offset = self._journal_records = 0
+                    self._read_journal()
             except CorruptDatabaseError as e:
                 self._error = e
                 self._data = {}
@@ -981,6 +1314,7 @@ def _construct_from_directory_layout(self, directory_layout, old_data):
             # Initialize data in the reconstructed DB
             self._data = {}
             self._installed_prefixes = set()
+            self._changed_keys = None
 
             # Start inspecting the installed prefixes
             processed_specs = set()
@@ -1075,6 +1409,9 @@ def _write(self, type, value, traceback):
             self._state_is_inconsistent = True
             return
 
+        if self._can_append_to_journal() and self._append_to_journal():
+            return
+
         temp_file = self._index_path + (".%s.%s.temp" % (socket.getfqdn(), os.getpid()))
 
         # Write a temporary database file them move it into place
@@ -1095,23 +1432,316 @@ def _write(self, type, value, traceback):
                 os.remove(temp_file)
             raise
 
+        # The journal and the sqlite index are validated against the verifier of the JSON
+        # index, so they can't be used without one. Stale files are ignored by readers.
+        self._changed_keys = set()
+        self._journal_offset = self._journal_records = 0
+        if self.journal_size > 0 and _use_uuid:
+            self._start_journal(self.last_seen_verifier)
+        elif os.path.exists(self._journal_path):
+            os.remove(self._journal_path)
+
+        if self.db_format == "sqlite" and _use_sqlite and _use_uuid:
+            self._write_sqlite_index(self.last_seen_verifier)
+
+    def _can_append_to_journal(self) -> bool:
+        """Whether the changes of the current write transaction can be appended to the
+        journal, instead of rewriting the whole index.
+        """
+        if self.journal_size <= 0 or self._changed_keys is None or self._journal_offset == 0:
+            return False
+        return self._journal_records + len(self._changed_keys) <= self.journal_size
+
+    def _start_journal(self, verifier: str) -> None:
+        """Write an empty journal, consistent with the index identified by the verifier."""
+        temp_file = self._journal_path + (".%s.%s.temp" % (socket.getfqdn(), os.getpid()))
+        header = (sjson.dump({"verifier": verifier}) + "\n").encode("utf-8")
+        try:
+            with open(temp_file, "wb") as f:
+                f.write(header)
+            fs.rename(temp_file, self._journal_path)
+        except OSError as e:
+            tty.warn(f"Cannot write the journal of the Spack database: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return
+        self._journal_offset = len(header)
+
+    def _append_to_journal(self) -> bool:
+        """Append the records modified in the current write transaction to the journal, as
+        a single entry. Returns False if the journal could not be written.
+        """
+        assert self._changed_keys is not None
+        if not self._changed_keys:
+            return True
+
+        installs, removed = {}, []
+        for key in sorted(self._changed_keys):
+            if key in self._data:
+                installs[key] = self._data[key].to_dict(include_fields=self.record_fields)
+            else:
+                removed.append(key)
+        entry = (sjson.dump({"installs": installs, "removed": removed}) + "\n").encode("utf-8")
+
+        try:
+            with open(self._journal_path, "r+b") as f:
+                # Discard anything left after the last complete entry by an interrupted write
+                f.seek(self._journal_offset)
+                f.truncate()
+                f.write(entry)
+        except OSError as e:
+            tty.debug(f"Cannot append to the journal of the Spack database: {e}")
+            return False
+
+        self._journal_offset += len(entry)
+        self._journal_records += len(self._changed_keys)
+        self._changed_keys = set()
+        return True
+
+    def _read_journal(self) -> None:
+        """Replay the entries of the journal that were appended since it was last read.
+
+        Does not do any locking.
+        """
+        if not self.last_seen_verifier or not os.path.isfile(self._journal_path):
+            return
+
+        with open(self._journal_path, "rb") as f:
+            if self._journal_offset == 0:
+                try:
+                    header = sjson.load(f.readline().decode("utf-8"))
+                except ValueError:
+                    return
+                if not isinstance(header, dict) or header.get("verifier") != (
+                    self.last_seen_verifier
+                ):
+                    return
+                self._journal_offset = f.tell()
+
+            f.seek(self._journal_offset)
+            for line in f:
+                # The last entry may be incomplete, if it's being written
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = sjson.load(line.decode("utf-8"))
+                    self._replay_journal_entry(entry["installs"], entry["removed"])
+                except Exception as e:
+                    raise CorruptDatabaseError(
+                        f"Invalid entry in the journal of the Spack database: "
+                        f"{type(e).__name__}: {e}",
+                        self._journal_path,
+                    ) from e
+                self._journal_offset += len(line)
+                self._journal_records += len(entry["installs"]) + len(entry["removed"])
+
+    def _installed_prefix(self, key: str) -> Optional[str]:
+        """Return the installation prefix of a record, if it's installed and not external"""
+        raw = self._data.raw(key) if isinstance(self._data, LazyInstallRecords) else None
+        if raw is not None:
+            return raw.prefix
+        rec = self._data[key]
+        return rec.path if rec.installed and not rec.spec.external else None
+
+    def _replay_journal_entry(self, installs: Dict[str, Any], removed: List[str]) -> None:
+        """Apply an entry of the journal to the in-memory database."""
+        self._stale_query_keys.update(removed)
+        self._stale_query_keys.update(installs)
+        for key in removed:
+            if key not in self._data:
+                continue
+            self._installed_prefixes.discard(self._installed_prefix(key))
+            if not isinstance(self._data, LazyInstallRecords) or self._data.raw(key) is None:
+                self._data[key].spec.detach(deptype=_TRACKED_DEPENDENCIES)
+            del self._data[key]
+
+        new_keys = []
+        for key, rec in installs.items():
+            raw = _RawRecord.from_dict(rec)
+            if key in self._data:
+                self._installed_prefixes.discard(self._installed_prefix(key))
+            if raw.prefix:
+                self._installed_prefixes.add(raw.prefix)
+
+            if isinstance(self._data, LazyInstallRecords) and (
+                key not in self._data or self._data.raw(key) is not None
+            ):
+                self._data.set_raw(key, raw)
+            elif key in self._data:
+                # Specs are immutable, so only the other fields of the record are updated
+                record = self._data[key]
+                vars(record).update(vars(InstallRecord.from_dict(record.spec, rec)))
+            else:
+                new_keys.append(key)
+
+        # New records are constructed in the same way as when reading the whole index
+        spec_reader = reader(_DB_VERSION)
+        for key in new_keys:
+            spec = self._read_spec_from_dict(spec_reader, key, installs)
+            self._data[key] = InstallRecord.from_dict(spec, installs[key])
+        for key in new_keys:
+            self._assign_dependencies(spec_reader, key, installs, self._data)
+        for key in new_keys:
+            self._data[key].spec._mark_root_concrete()
+
+    def _write_sqlite_index(self, verifier: str) -> None:
+        """Write the sqlite index of the database. Failures are not fatal, since the JSON
+        index has already been written.
+        """
+        records = {key: self._raw_record(key) for key in self._data}
+        temp_file = self._sqlite_index_path + (".%s.%s.temp" % (socket.getfqdn(), os.getpid()))
+        try:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            _write_sqlite_index(temp_file, records, verifier)
+            fs.rename(temp_file, self._sqlite_index_path)
+        except (OSError, sqlite3.Error) as e:
+            tty.warn(f"Cannot write the sqlite index of the Spack database: {e}")
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def _raw_record(self, key: str) -> _RawRecord:
+        """Return the serialized form of a record"""
+        raw = self._data.raw(key) if isinstance(self._data, LazyInstallRecords) else None
+        return raw or _RawRecord.from_record(self._data[key], self.record_fields)
+
+    def _snapshot_key(self) -> str:
+        digest = hashlib.sha256(self.database_directory.encode("utf-8")).hexdigest()
+        return os.path.join(_SNAPSHOT_PREFIX, f"{digest}.json")
+
+    def _snapshot_stamp(self, verifier: str) -> Optional[Dict[str, Any]]:
+        """Return data identifying the current state of the on-disk index, to validate
+        snapshots, or None if there is no index.
+        """
+
+        def _stat(path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+        index = _stat(self._index_path)
+        if index is None:
+            return None
+        return {
+            "version": str(_DB_VERSION),
+            "index": index,
+            "journal": _stat(self._journal_path),
+            "verifier": verifier,
+        }
+
+    def _read_from_snapshot(self, stamp: Dict[str, Any]) -> bool:
+        """Fill database from a snapshot in the snapshot cache, if it was taken from an
+        index in the state identified by the stamp. Specs are reconstructed only when their
+        record is accessed.
+
+        Returns whether the database was read. Does not do any locking.
+        """
+        assert self.snapshot_cache is not None
+        key = self._snapshot_key()
+        try:
+            if not self.snapshot_cache.init_entry(key):
+                return False
+            with self.snapshot_cache.read_transaction(key) as f:
+                data = sjson.load(f)
+            if data.get("format") != _SNAPSHOT_FORMAT or data.get("stamp") != stamp:
+                return False
+            raw = {k: _RawRecord(*fields) for k, fields in data["records"].items()}
+            journal_offset, journal_records = data["journal"]
+        except (OSError, ValueError, KeyError, TypeError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[DATABASE] cannot read the snapshot of {self.root}: {e}")
+            return False
+
+        self._data = LazyInstallRecords(self, raw, reader(_DB_VERSION), path=self._index_path)
+        self._installed_prefixes = set(r.prefix for r in raw.values() if r.prefix)
+        self._journal_offset, self._journal_records = journal_offset, journal_records
+        return True
+
+    def _write_snapshot(self, stamp: Dict[str, Any]) -> None:
+        """Store the records of the database in the snapshot cache. Failures are not fatal."""
+        assert self.snapshot_cache is not None
+        key = self._snapshot_key()
+        data = {
+            "format": _SNAPSHOT_FORMAT,
+            "stamp": stamp,
+            "records": {k: list(self._raw_record(k)) for k in self._data},
+            "journal": [self._journal_offset, self._journal_records],
+        }
+        try:
+            self.snapshot_cache.init_entry(key)
+            with self.snapshot_cache.write_transaction(key) as (_, new):
+                sjson.dump(data, new)
+        except (OSError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[DATABASE] cannot write the snapshot of {self.root}: {e}")
+
+    def _read_from_sqlite(self, verifier: str) -> bool:
+        """Fill database from the sqlite index, if it is consistent with the JSON index.
+        Specs are reconstructed only when their record is accessed.
+
+        Returns whether the database was read. Does not do any locking.
+        """
+        if not _use_sqlite or not verifier or not os.path.isfile(self._sqlite_index_path):
+            return False
+
+        try:
+            raw = _read_sqlite_index(self._sqlite_index_path, verifier)
+        except sqlite3.Error as e:
+            tty.debug(f"Cannot read the sqlite index of the Spack database: {e}")
+            return False
+
+        if raw is None:
+            return False
+
+        self._data = LazyInstallRecords(
+            self, raw, reader(_DB_VERSION), path=self._sqlite_index_path
+        )
+        self._installed_prefixes = set(r.prefix for r in raw.values() if r.prefix)
+        return True
+
+    def _read_index(self, verifier: str) -> None:
+        """Read the database from a snapshot, the sqlite index, or the JSON index, in this
+        order of preference, and then replay the journal.
+        """
+        # Take the stamp before reading, so that changes made meanwhile invalidate the snapshot
+        stamp = self._snapshot_stamp(verifier) if self.snapshot_cache is not None else None
+        if stamp is not None and self._read_from_snapshot(stamp):
+            self._changed_keys = set()
+            return
+
+        if not self._read_from_sqlite(verifier):
+            self._read_from_file(self._index_path)
+        self._journal_offset = self._journal_records = 0
+        self._read_journal()
+        self._changed_keys = set()
+
+        if stamp is not None:
+            self._write_snapshot(stamp)
+
+    def _read_verifier(self) -> str:
+        """Return the verifier of the JSON index, or an empty string if there is none."""
+        current_verifier = ""
+        if _use_uuid:
+            try:
+                with open(self._verifier_path, "r") as f:
+                    current_verifier = f.read()
+            except BaseException:
+                pass
+        return current_verifier
+
     def _read(self):
         """Re-read Database from the data in the set location. This does no locking."""
         if os.path.isfile(self._index_path):
-            current_verifier = ""
-            if _use_uuid:
-                try:
-                    with open(self._verifier_path, "r") as f:
-                        current_verifier = f.read()
-                except BaseException:
-                    pass
+            current_verifier = self._read_verifier()
             if (current_verifier != self.last_seen_verifier) or (current_verifier == ""):
                 self.last_seen_verifier = current_verifier
                 # Read from file if a database exists
-                self._read_from_file(self._index_path)
+                self._read_index(current_verifier)
             elif self._state_is_inconsistent:
-                self._read_from_file(self._index_path)
+                self._read_index(current_verifier)
                 self._state_is_inconsistent = False
+            else:
+                self._read_journal()
             return
         elif self.is_upstream:
             tty.warn("upstream not found: {0}".format(self._index_path))
@@ -1217,6 +1847,7 @@ def _add(
                 new_spec._add_dependency(record.spec, depflag=dep.depflag, virtuals=dep.virtuals)
                 if not upstream:
                     record.ref_count += 1
+                    self._record_changed(dkey)
 
             # Mark concrete once everything is built, and preserve
             # the original hashes of concrete specs.
@@ -1230,6 +1861,25 @@ def _add(
             self._data[key].installation_time = _now()
 
         self._data[key].explicit = explicit
+        self._record_changed(key)
+
+    def _record_changed(self, key: str) -> None:
+        """Record that the install record for a hash was added, modified or removed, so
+        that it is written to the journal at the end of the current write transaction.
+        """
+        if self._changed_keys is not None:
+            self._changed_keys.add(key)
+        self._stale_query_keys.add(key)
+
+    def _get_query_index(self) -> _QueryIndex:
+        """Return the secondary indexes for the current records, updating them if needed."""
+        if self._query_index is None or self._query_index.data is not self._data:
+            self._query_index = _QueryIndex(self._data)
+        else:
+            for key in self._stale_query_keys:
+                self._query_index.update(key)
+        self._stale_query_keys.clear()
+        return self._query_index
 
     @_autospec
     def add(self, spec, directory_layout, explicit=False):
@@ -1270,6 +1920,7 @@ def _decrement_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count -= 1
+        self._record_changed(key)
 
         if rec.ref_count == 0 and not rec.installed:
             del self._data[key]
@@ -1285,11 +1936,13 @@ def _increment_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count += 1
+        self._record_changed(key)
 
     def _remove(self, spec):
         """Non-locking version of remove(); does real work."""
         key = self._get_matching_spec_key(spec)
         rec = self._data[key]
+        self._record_changed(key)
 
         # This install prefix is now free for other specs to use, even if the
         # spec is only marked uninstalled.
@@ -1366,6 +2019,7 @@ def _deprecate(self, spec, deprecator):
         spec_rec.deprecated_for = deprecator_key
         spec_rec.installed = False
         self._data[spec_key] = spec_rec
+        self._record_changed(spec_key)
 
     @_autospec
     def mark(self, spec, key, value):
@@ -1374,8 +2028,9 @@ def mark(self, spec, key, value):
             return self._mark(spec, key, value)
 
     def _mark(self, spec, key, value):
-        record = self._data[self._get_matching_spec_key(spec)]
-        setattr(record, key, value)
+        spec_key = self._get_matching_spec_key(spec)
+        setattr(self._data[spec_key], key, value)
+        self._record_changed(spec_key)
 
     @_autospec
     def deprecate(self, spec, deprecator):
@@ -1443,11 +2098,8 @@ def _get_by_hash_local(self, dag_hash, default=None, installed=any):
 
         # check if hash is a prefix of some installed (or previously
         # installed) spec.
-        matches = [
-            record.spec
-            for h, record in self._data.items()
-            if h.startswith(dag_hash) and record.install_type_matches(installed)
-        ]
+        records = (self._data[h] for h in self._data if h.startswith(dag_hash))
+        matches = [record.spec for record in records if record.install_type_matches(installed)]
         if matches:
             return matches
 
@@ -1546,59 +2198,64 @@ def _query(
                 else:
                     return []
 
-        # Abstract specs require more work -- currently we test
-        # against everything.
-        results = []
+        # Abstract specs require more work -- the secondary indexes are used to select
+        # the records that can match, and only those are tested.
         start_date = start_date or datetime.datetime.min
         end_date = end_date or datetime.datetime.max
 
-        # save specs whose name doesn't match for last, to avoid a virtual check
-        deferred = []
-
-        for key, rec in self._data.items():
-            if hashes is not None and rec.spec.dag_hash() not in hashes:
-                continue
-
-            if origin and not (origin == rec.origin):
-                continue
+        index = self._get_query_index()
+        selections = [index.with_status(installed)]
+        if explicit is not any:
+            selections.append(index.by_explicit.get(explicit, {}))
+        if query_spec is not any and query_spec.namespace:
+            selections.append(index.with_namespace(query_spec.namespace))
+
+        def matching_specs(keys):
+            results = []
+            for key in keys:
+                if hashes is not None and key not in hashes:
+                    continue
 
-            if not rec.install_type_matches(installed):
-                continue
+                rec = self._data[key]
+                if origin and not (origin == rec.origin):
+                    continue
 
-            if in_buildcache is not any and rec.in_buildcache != in_buildcache:
-                continue
+                if not rec.install_type_matches(installed):
+                    continue
 
-            if explicit is not any and rec.explicit != explicit:
-                continue
+                if in_buildcache is not any and rec.in_buildcache != in_buildcache:
+                    continue
 
-            if known is not any and known(rec.spec.name):
-                continue
+                if explicit is not any and rec.explicit != explicit:
+                    continue
 
-            if start_date or end_date:
-                inst_date = datetime.datetime.fromtimestamp(rec.installation_time)
-                if not (start_date < inst_date < end_date):
+                if known is not any and known(rec.spec.name):
                     continue
 
-            if query_spec is any:
-                results.append(rec.spec)
-                continue
+                if start_date or end_date:
+                    inst_date = datetime.datetime.fromtimestamp(rec.installation_time)
+                    if not (start_date < inst_date < end_date):
+                        continue
 
-            # check anon specs and exact name matches first
-            if not query_spec.name or rec.spec.name == query_spec.name:
-                if rec.spec.satisfies(query_spec):
+                if query_spec is any or rec.spec.satisfies(query_spec):
                     results.append(rec.spec)
+            return results
+
+        if query_spec is any or not query_spec.name:
+            return matching_specs(index.select(selections))
 
-            # save potential virtual matches for later, but not if we already found a match
-            elif not results:
-                deferred.append(rec.spec)
+        # check exact name matches first
+        results = matching_specs(index.select(selections + [index.with_names([query_spec.name])]))
 
         # Checking for virtuals is expensive, so we save it for last and only if needed.
         # If we get here, we didn't find anything in the DB that matched by name.
         # If we did fine something, the query spec can't be virtual b/c we matched an actual
         # package installation, so skip the virtual check entirely. If we *didn't* find anything,
-        # check all the deferred specs *if* the query is virtual.
-        if not results and query_spec is not any and deferred and query_spec.virtual:
-            results = [spec for spec in deferred if spec.satisfies(query_spec)]
+        # check the installations of the providers of the virtual *if* the query is virtual.
+        if not results and query_spec.virtual:
+            providers = spack.repo.PATH.provider_index.providers_for(query_spec.name)
+            names = set(p.name for p in providers) - {query_spec.name}
+            results = matching_specs(index.select(selections + [index.with_names(names)]))
 
         return results
 
@@ -1709,7 +2366,11 @@ def update_explicit(self, spec, explicit):
                 message = "{s.name}@{s.version} : marking the package {0}"
                 status = "explicit" if explicit else "implicit"
                 tty.debug(message.format(status, s=spec))
+                # The record may have been replaced when re-reading the database
+                key = rec.spec.dag_hash()
+                rec = self._data.get(key, rec)
                 rec.explicit = explicit
+                self._record_changed(key)
 
 
 class UpstreamDatabaseLockingError(SpackError):
@@ -6,6 +6,7 @@
 import collections.abc
 import contextlib
 import copy
+import itertools
 import os
 import pathlib
 import re
@@ -143,6 +144,9 @@ def default_manifest_yaml():
 #: version of the lockfile format. Must increase monotonically.
 lockfile_format_version = 5
 
+#: number of consecutive root specs grounded together with ``concretizer:ground_once``
+ground_once_batch_size = 16
+
 
 READER_CLS = {
     1: spack.spec.SpecfileV1,
@@ -686,7 +690,8 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
 
         # To ensure there are no conflicts with packages being installed
         # that cannot be resolved or have repos that have been removed
-        # we always regenerate the view from scratch.
+        # we always regenerate the view from scratch (though with incremental views, the
+        # links of unchanged packages are hardlinked from the previous view).
         # We will do this by hashing the view contents and putting the view
         # in a directory by hash, and then having a symlink to the real
         # view in the root. The real root for a view at /dirname/basename
@@ -709,6 +714,7 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
             tty.msg(f"Updating view at {self.root}")
 
         view = self.view(new=new_root)
+        incremental = spack.config.get("config:incremental_views", False)
 
         root_dirname = os.path.dirname(self.root)
         tmp_symlink_name = os.path.join(root_dirname, "._view_link")
@@ -716,7 +722,9 @@ def regenerate(self, concrete_roots: List[Spec]) -> None:
         # Create a new view
         try:
             fs.mkdirp(new_root)
-            view.add_specs(*specs)
+            view.add_specs(*specs, previous_root=old_root if incremental else None)
+            if incremental and specs:
+                view.write_manifest()
 
             # create symlink from tmp_symlink_name to new_root
             if os.path.exists(tmp_symlink_name):
@@ -1433,9 +1441,19 @@ def _concretize_separately(self, tests=False):
         if len(args) == 0:
             return []
 
+        # With ground_once, roots are grounded together in batches that don't depend on the
+        # number of processes, so that the results are the same on any machine
+        ground_once = spack.config.get("concretizer:ground_once", False)
+        if ground_once:
+            size = ground_once_batch_size
+            task_args = [(args[k : k + size], tests) for k in range(0, len(args), size)]
+
         # Solve the environment in parallel on Linux
         start = time.time()
-        num_procs = min(len(args), spack.util.cpus.determine_number_of_jobs(parallel=True))
+        num_procs = min(
+            len(task_args) if ground_once else len(args),
+            spack.util.cpus.determine_number_of_jobs(parallel=True),
+        )
 
         # TODO: support parallel concretization on macOS and Windows
         msg = "Starting concretization"
@@ -1443,16 +1461,27 @@ def _concretize_separately(self, tests=False):
             msg += f" pool with {num_procs} processes"
         tty.msg(msg)
 
-        batch = []
-        for j, (i, concrete, duration) in enumerate(
-            spack.util.parallel.imap_unordered(
+        if ground_once:
+            results = itertools.chain.from_iterable(
+                spack.util.parallel.imap_unordered(
+                    _concretize_batch_task,
+                    task_args,
+                    processes=num_procs,
+                    debug=tty.is_debug(),
+                    maxtaskperchild=1,
+                )
+            )
+        else:
+            results = spack.util.parallel.imap_unordered(
                 _concretize_task,
                 args,
                 processes=num_procs,
                 debug=tty.is_debug(),
                 maxtaskperchild=1,
             )
-        ):
+
+        batch = []
+        for j, (i, concrete, duration) in enumerate(results):
             batch.append((i, concrete))
             percentage = (j + 1) / len(args) * 100
             tty.verbose(
@@ -2245,6 +2274,53 @@ def _concretize_task(packed_arguments) -> Tuple[int, Spec, float]:
         return index, spec, time.time() - start
 
 
+def _concretize_batch_task(packed_arguments) -> List[Tuple[int, Spec, float]]:
+    """Concretize a batch of root specs separately from each other, grounding a single
+    problem for the whole batch.
+
+    Roots that cannot be solved this way are concretized on their own with
+    ``_concretize_task``, so that errors are reported in the same way.
+    """
+    import spack.solver.asp
+
+    batch, tests = packed_arguments
+    roots = []
+    for index, spec_constraints, _ in batch:
+        try:
+            constraints = [Spec(x) for x in spec_constraints]
+            root = next(s for s in constraints if s.name).copy()
+            for c in constraints:
+                root.constrain(c)
+        except (StopIteration, spack.error.SpackError):
+            continue
+        roots.append((index, root))
+
+    solved = {}
+    with tty.SuppressOutput(msg_enabled=False):
+        start = time.time()
+        try:
+            solver = spack.solver.asp.Solver()
+            allow_deprecated = spack.config.get("config:deprecated", False)
+            results = solver.solve_separately(
+                [root for _, root in roots], tests=tests, allow_deprecated=allow_deprecated
+            )
+            for (index, _), result in zip(roots, results):
+                if result.satisfiable and not result.unsolved_specs:
+                    solved[index] = result.specs[0], time.time() - start
+                start = time.time()
+        except spack.error.SpackError as e:
+            tty.debug(f"cannot concretize {len(roots)} specs with a single grounding: {e}")
+
+    concretized = []
+    for args in batch:
+        index = args[0]
+        if index in solved:
+            concretized.append((index, *solved[index]))
+        else:
+            concretized.append(_concretize_task(args))
+    return concretized
+
+
 def make_repo_path(root):
     """Make a RepoPath from the repo subdirectories in an environment."""
     path = spack.repo.RepoPath()
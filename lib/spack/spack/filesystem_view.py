@@ -3,6 +3,8 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import collections
+import concurrent.futures
 import functools as ft
 import itertools
 import os
@@ -10,13 +12,16 @@
 import shutil
 import stat
 import sys
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 from llnl.util import tty
 from llnl.util.filesystem import (
+    BaseDirectoryVisitor,
+    copyfile,
     mkdirp,
     remove_dead_links,
     remove_empty_directories,
+    visit_directory_listing,
     visit_directory_tree,
 )
 from llnl.util.lang import index_by, match_predicate
@@ -67,7 +72,11 @@ def view_copy(src: str, dst: str, view, spec: Optional[spack.spec.Spec] = None):
 
     Use spec and view to generate relocations
     """
-    shutil.copy2(src, dst, follow_symlinks=False)
+    if os.path.islink(src):
+        shutil.copy2(src, dst, follow_symlinks=False)
+    else:
+        copyfile(src, dst)
+        shutil.copystat(src, dst)
 
     # No need to relocate if no metadata or external.
     if not spec or spec.external:
@@ -634,12 +643,101 @@ def unlink_meta_folder(self, spec):
         shutil.rmtree(path)
 
 
+#: Name of the file, in the metadata dir at the root of a view, that records how the specs
+#: were merged into it, so that a later view of the same specs can be created incrementally
+VIEW_MANIFEST = "view_manifest.json"
+
+
+class RecordingMergeVisitor(SourceMergeVisitor):
+    """Merge visitor recording the entries of the prefix being merged, so that the same merge
+    can be replayed later without traversing the prefix again.
+
+    Entries are ``(rel_path, kind)`` pairs, where kind is ``"d"`` for directories, ``"f"`` for
+    files and ``"l"`` for symlinks to files.
+    """
+
+    def __init__(self, ignore=None):
+        super().__init__(ignore=ignore)
+        self.entries: List[Tuple[str, str]] = []
+
+    def before_visit_dir(self, root: str, rel_path: str, depth: int) -> bool:
+        self.entries.append((rel_path, "d"))
+        return super().before_visit_dir(root, rel_path, depth)
+
+    def visit_file(self, root: str, rel_path: str, depth: int, *, symlink: bool = False) -> None:
+        self.entries.append((rel_path, "l" if symlink else "f"))
+        super().visit_file(root, rel_path, depth, symlink=symlink)
+
+    def replay(self, root: str, entries: List[Tuple[str, str]]) -> None:
+        """Merge the entries previously recorded for the prefix ``root``"""
+        for rel_path, kind in entries:
+            if kind == "d":
+                super().before_visit_dir(root, rel_path, 0)
+            else:
+                super().visit_file(root, rel_path, 0, symlink=kind == "l")
+
+
+def _prefix_stamp(prefix: str) -> Optional[List[int]]:
+    """Identify the installation of a prefix, which is not modified after it is installed,
+    but gets a new directory when it is reinstalled."""
+    try:
+        st = os.stat(prefix)
+        metadata_st = os.stat(os.path.join(prefix, spack.store.STORE.layout.metadata_dir))
+    except OSError:
+        return None
+    return [st.st_ino, st.st_mtime_ns, metadata_st.st_mtime_ns]
+
+
+def _unchanged_since(prefix: str, entries: List[Tuple[str, str]], mtime_ns: int) -> bool:
+    """Whether none of the directories recorded for a prefix was modified after ``mtime_ns``.
+    Files added to, or removed from, a directory after installation, e.g. bytecode compiled
+    on first import, change its modification time."""
+    for rel_path, kind in entries:
+        if kind != "d":
+            continue
+        try:
+            if os.stat(os.path.join(prefix, rel_path)).st_mtime_ns > mtime_ns:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def _visit_prefix(
+    prefix: str, visitor: BaseDirectoryVisitor, spec: Optional[spack.spec.Spec] = None
+) -> None:
+    """Traverse a prefix, or a subdirectory of it, listing it from the install manifest of
+    ``spec`` when it is up to date instead of reading the filesystem."""
+    import spack.verify  # depends on spack.package_base, which depends on this module
+
+    listing = spack.verify.prefix_listing(spec) if spec else None
+    if listing is None:
+        visit_directory_tree(prefix, visitor)
+    else:
+        visit_directory_listing(prefix, listing, visitor)
+
+
 class SimpleFilesystemView(FilesystemView):
     """A simple and partial implementation of FilesystemView focused on performance and immutable
     views, where specs cannot be removed after they were added."""
 
     def __init__(self, root, layout, **kwargs):
         super().__init__(root, layout, **kwargs)
+        self._link_func = kwargs.get("link", view_symlink)
+
+        # Files created by self.link, rather than by packages in their own way (e.g. copies
+        # with patched shebangs), which a later view of the same specs can link to
+        self._linked: Set[str] = set()
+        link = self.link
+
+        def link_and_record(src, dst, **kwargs):
+            link(src, dst, **kwargs)
+            self._linked.add(dst)
+
+        self.link = link_and_record
+
+        # How the prefix of each spec was merged, by DAG hash, see write_manifest()
+        self._records: Dict[str, Dict[str, Any]] = {}
 
     def _sanity_check_view_projection(self, specs):
         """A very common issue is that we end up with two specs of the same package, that project
@@ -655,8 +753,14 @@ def _sanity_check_view_projection(self, specs):
                 raise ConflictingSpecsError(current_spec, conflicting_spec)
             seen[metadata_dir] = current_spec
 
-    def add_specs(self, *specs: spack.spec.Spec) -> None:
-        """Link a root-to-leaf topologically ordered list of specs into the view."""
+    def add_specs(self, *specs: spack.spec.Spec, previous_root: Optional[str] = None) -> None:
+        """Link a root-to-leaf topologically ordered list of specs into the view.
+
+        If ``previous_root`` is the root of another view with the same projections and link
+        type, and with a manifest (see :meth:`write_manifest`), the prefixes of the specs it
+        has in common with this view are not traversed again, and the files linked there for
+        them are hard linked from it.
+        """
         assert all((s.concrete for s in specs))
         if len(specs) == 0:
             return
@@ -669,17 +773,47 @@ def add_specs(self, *specs: spack.spec.Spec) -> None:
 
         self._sanity_check_view_projection(specs)
 
+        previous, previous_mtime = self._read_manifest(previous_root) if previous_root else ({}, 0)
+        records: Dict[str, Dict[str, Any]] = {}
+        for spec in specs:
+            prefix = spec.package.view_source()
+            metadata_prefix = os.path.join(prefix, spack.store.STORE.layout.metadata_dir)
+            record = {"prefix": prefix, "stamp": _prefix_stamp(prefix)}
+            old_record = previous.get(spec.dag_hash())
+            if (
+                old_record
+                and record["stamp"] is not None
+                and (old_record["prefix"], old_record["stamp"]) == (prefix, record["stamp"])
+                and _unchanged_since(prefix, old_record["files"], previous_mtime)
+                and _unchanged_since(
+                    metadata_prefix, old_record.get("metadata", []), previous_mtime
+                )
+            ):
+                record["reused"] = old_record
+            records[spec.dag_hash()] = record
+
         # Ignore spack meta data folder.
         def skip_list(file):
             return os.path.basename(file) == spack.store.STORE.layout.metadata_dir
 
-        visitor = SourceMergeVisitor(ignore=skip_list)
+        visitor = RecordingMergeVisitor(ignore=skip_list)
+        traversed = self._traverse_in_parallel(
+            {
+                records[s.dag_hash()]["prefix"]: s
+                for s in specs
+                if "reused" not in records[s.dag_hash()]
+            },
+            skip_list,
+        )
 
         # Gather all the directories to be made and files to be linked
         for spec in specs:
-            src_prefix = spec.package.view_source()
+            record = records[spec.dag_hash()]
             visitor.set_projection(self.get_relative_projection_for_spec(spec))
-            visit_directory_tree(src_prefix, visitor)
+            entries = record["reused"]["files"] if "reused" in record else None
+            record["files"] = self._merge_prefix(
+                visitor, record["prefix"], traversed.get(record["prefix"], entries), spec
+            )
 
         # Check for conflicts in destination dir.
         visit_directory_tree(self._root, DestinationMergeVisitor(visitor))
@@ -701,6 +835,9 @@ def skip_list(file):
         for dst in visitor.directories:
             os.mkdir(os.path.join(self._root, dst))
 
+        owners = {dst: src_root for dst, (src_root, _) in visitor.files.items()}
+        self._link_previous_files(visitor, previous_root, records, lambda record: record["prefix"])
+
         # Link the files using a "merge map": full src => full dst
         merge_map_per_prefix = self._source_merge_visitor_to_merge_map(visitor)
         for spec in specs:
@@ -711,7 +848,123 @@ def skip_list(file):
             spec.package.add_files_to_view(self, merge_map, skip_if_exists=False)
 
         # Finally create the metadata dirs.
-        self.link_metadata(specs)
+        owners.update(self.link_metadata(specs, previous_root, records))
+
+        # Record which spec owns each file linked in the view
+        links_per_root: Dict[str, List[str]] = collections.defaultdict(list)
+        for dst, src_root in owners.items():
+            if os.path.join(self._root, dst) in self._linked:
+                links_per_root[src_root].append(dst)
+        for record in records.values():
+            record.pop("reused", None)
+            metadata_root = os.path.join(record["prefix"], spack.store.STORE.layout.metadata_dir)
+            record["links"] = links_per_root[record["prefix"]] + links_per_root[metadata_root]
+
+        self._records = records
+
+    def _merge_prefix(
+        self,
+        visitor: RecordingMergeVisitor,
+        prefix: str,
+        entries: Optional[List[Tuple[str, str]]] = None,
+        spec: Optional[spack.spec.Spec] = None,
+    ) -> List[Tuple[str, str]]:
+        """Merge a prefix into the view, replaying the entries recorded for it if any, and
+        return them. The prefix is listed from the install manifest of ``spec`` if possible."""
+        if entries is not None:
+            visitor.replay(prefix, entries)
+            return entries
+        visitor.entries = []
+        _visit_prefix(prefix, visitor, spec)
+        return visitor.entries
+
+    def _traverse_in_parallel(
+        self,
+        prefixes: Dict[str, Optional[spack.spec.Spec]],
+        ignore: Optional[Callable[[str], bool]] = None,
+    ) -> Dict[str, List[Tuple[str, str]]]:
+        """Record the entries of the prefixes with a pool of threads, which hides the latency
+        of network filesystems. Return nothing if traversals are serial, in which case each
+        prefix is traversed while it is merged.
+
+        The entries are merged in the order of the specs afterwards, so that the view does not
+        depend on the order in which traversals complete.
+
+        Arguments:
+            prefixes: maps each prefix to the spec whose install manifest lists it, if any
+            ignore: function telling which paths are not merged
+        """
+        threads = min(spack.config.get("config:view_traversal_threads", 1), len(prefixes))
+        if threads <= 1:
+            return {}
+
+        def traverse(prefix):
+            visitor = RecordingMergeVisitor(ignore=ignore)
+            _visit_prefix(prefix, visitor, prefixes[prefix])
+            return visitor.entries
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            return dict(zip(prefixes, executor.map(traverse, prefixes)))
+
+    def _link_previous_files(
+        self,
+        visitor: SourceMergeVisitor,
+        previous_root: Optional[str],
+        records: Dict[str, Dict[str, Any]],
+        source_root: Callable[[Dict[str, Any]], str],
+    ) -> None:
+        """Hard link the files to be linked by the visitor that the same specs linked in the
+        previous view, and drop them from the visitor."""
+        links = {
+            source_root(record): set(record["reused"]["links"])
+            for record in records.values()
+            if "reused" in record
+        }
+        if not previous_root or not links:
+            return
+        for dst, (src_root, _) in list(visitor.files.items()):
+            if dst not in links.get(src_root, ()):
+                continue
+            full_dst = os.path.join(self._root, dst)
+            try:
+                os.link(os.path.join(previous_root, dst), full_dst, follow_symlinks=False)
+            except OSError:
+                continue
+            self._linked.add(full_dst)
+            del visitor.files[dst]
+
+    def _read_manifest(self, root: str) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Return the records of the specs merged in the view at ``root``, if it can be used
+        to create this one incrementally, and the modification time of its manifest."""
+        # Copies are relocated to the root of the view they are in, and can't be shared
+        if self._link_func is view_copy:
+            return {}, 0
+        path = os.path.join(root, spack.store.STORE.layout.metadata_dir, VIEW_MANIFEST)
+        try:
+            with open(path) as f:
+                manifest = s_json.load(f)
+                mtime = os.fstat(f.fileno()).st_mtime_ns
+        except (OSError, ValueError) as e:
+            tty.debug(f"Cannot create the view at {self._root} incrementally: {e}")
+            return {}, 0
+        projections = [list(item) for item in self.projections.items()]
+        link_type = inverse_view_func_parser(self._link_func)
+        if (manifest.get("link_type"), manifest.get("projections")) != (link_type, projections):
+            return {}, 0
+        return manifest["specs"], mtime
+
+    def write_manifest(self) -> None:
+        """Write the records of how the specs were merged into the view, which are needed to
+        create a later view of the same specs incrementally."""
+        metadata_dir = os.path.join(self._root, spack.store.STORE.layout.metadata_dir)
+        mkdirp(metadata_dir)
+        manifest = {
+            "link_type": inverse_view_func_parser(self._link_func),
+            "projections": list(self.projections.items()),
+            "specs": self._records,
+        }
+        with open(os.path.join(metadata_dir, VIEW_MANIFEST), "w") as f:
+            s_json.dump(manifest, f)
 
     def _source_merge_visitor_to_merge_map(self, visitor: SourceMergeVisitor):
         # For compatibility with add_files_to_view, we have to create a
@@ -736,16 +989,34 @@ def relative_metadata_dir_for_spec(self, spec):
             spec.name,
         )
 
-    def link_metadata(self, specs):
-        metadata_visitor = SourceMergeVisitor()
+    def link_metadata(self, specs, previous_root=None, records=None):
+        """Link the metadata dirs of the specs into the view, and return the owner of each
+        file linked, as a map from its path in the view to the metadata dir it comes from."""
+        records = records or {}
+        metadata_visitor = RecordingMergeVisitor()
+
+        def metadata_prefix(spec):
+            return os.path.join(spec.package.view_source(), spack.store.STORE.layout.metadata_dir)
+
+        traversed = self._traverse_in_parallel(
+            {
+                metadata_prefix(s): None
+                for s in specs
+                if "reused" not in records.get(s.dag_hash(), {})
+            }
+        )
 
         for spec in specs:
-            src_prefix = os.path.join(
-                spec.package.view_source(), spack.store.STORE.layout.metadata_dir
-            )
+            src_prefix = metadata_prefix(spec)
             proj = self.relative_metadata_dir_for_spec(spec)
             metadata_visitor.set_projection(proj)
-            visit_directory_tree(src_prefix, metadata_visitor)
+            record = records.get(spec.dag_hash(), {})
+            entries = record["reused"]["metadata"] if "reused" in record else None
+            entries = self._merge_prefix(
+                metadata_visitor, src_prefix, traversed.get(src_prefix, entries)
+            )
+            if record:
+                record["metadata"] = entries
 
         # Check for conflicts in destination dir.
         visit_directory_tree(self._root, DestinationMergeVisitor(metadata_visitor))
@@ -761,9 +1032,19 @@ def link_metadata(self, specs):
         for dst in metadata_visitor.directories:
             os.mkdir(os.path.join(self._root, dst))
 
+        owners = {dst: src_root for dst, (src_root, _) in metadata_visitor.files.items()}
+        self._link_previous_files(
+            metadata_visitor,
+            previous_root,
+            records,
+            lambda record: os.path.join(record["prefix"], spack.store.STORE.layout.metadata_dir),
+        )
+
         for dst_relpath, (src_root, src_relpath) in metadata_visitor.files.items():
             self.link(os.path.join(src_root, src_relpath), os.path.join(self._root, dst_relpath))
 
+        return owners
+
     def get_relative_projection_for_spec(self, spec):
         # Extensions are placed by their extendee, not by their own spec
         if spec.package.extendee_spec:
@@ -0,0 +1,23 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import llnl.util.tty as tty
+from llnl.string import plural
+
+import spack.store
+import spack.verify
+
+
+def post_install(spec, explicit=None):
+    # Only files extracted from build caches are shared, since they are not expected to be
+    # modified after installation
+    blobs = spack.store.STORE.blobs
+    if blobs is None or spec.external or not spec.package.installed_from_binary_cache:
+        return
+
+    files, size = blobs.deduplicate(spec.prefix, exclude=[spack.store.STORE.layout.metadata_dir])
+    tty.debug(f"Deduplicated {plural(len(files), 'file')} ({size} bytes) of {spec.prefix}")
+
+    # The files that were replaced have the inode and mtime of the shared file now
+    spack.verify.update_manifest(spec, files)
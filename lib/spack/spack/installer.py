@@ -26,18 +26,21 @@
 installations of packages in a Spack instance.
 """
 
+import concurrent.futures
 import copy
 import glob
 import heapq
 import io
 import itertools
+import multiprocessing.connection
 import os
 import shutil
+import statistics
 import sys
 import time
 from collections import defaultdict
 from gzip import GzipFile
-from typing import Dict, Iterator, List, Optional, Set, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 import llnl.util.filesystem as fs
 import llnl.util.lock as lk
@@ -60,8 +63,11 @@
 import spack.repo
 import spack.spec
 import spack.store
+import spack.util.cpus
 import spack.util.executable
+import spack.util.jobserver
 import spack.util.path
+import spack.util.spack_json as sjson
 import spack.util.timer as timer
 from spack.util.environment import EnvironmentModifications, dump_environment
 from spack.util.executable import which
@@ -91,6 +97,12 @@
 #: queue invariants).
 STATUS_REMOVED = "removed"
 
+#: Error message when the installation is terminated after a failure, with --fail-fast
+FAIL_FAST_ERR = "Terminating after first install failure"
+
+#: Maximum number of previous builds of a package looked at to estimate its build time
+MAX_BUILD_TIME_SAMPLES = 5
+
 
 def _write_timer_json(pkg, timer, cache):
     extra_attributes = {"name": pkg.name, "cache": cache, "hash": pkg.spec.dag_hash()}
@@ -102,6 +114,42 @@ def _write_timer_json(pkg, timer, cache):
         return
 
 
+def _historical_build_time(spec: "spack.spec.Spec") -> Optional[float]:
+    """Estimate how long it takes to build a spec from sources, as the median of the times
+    recorded by ``_write_timer_json`` for previous builds of the same package in the store.
+    Builds of the same version are preferred. Returns None if there is no such build.
+    """
+    try:
+        candidates = spack.store.STORE.db.query(spec.name, installed=True)
+    except spack.error.SpackError as e:
+        tty.debug(f"Cannot query previous builds of {spec.name}: {e}")
+        return None
+
+    candidates.sort(key=lambda s: s.version != spec.version)
+    samples: List[float] = []
+    for candidate in candidates:
+        if candidate.external:
+            continue
+        times_log = os.path.join(
+            candidate.prefix,
+            spack.store.STORE.layout.metadata_dir,
+            spack.package_base.spack_times_log,
+        )
+        try:
+            with open(times_log, encoding="utf-8") as f:
+                data = sjson.load(f)
+        except (OSError, ValueError):
+            continue
+        # Installations from a binary cache don't tell how long a build takes
+        if data.get("cache") or not isinstance(data.get("total"), (int, float)):
+            continue
+        samples.append(data["total"])
+        if len(samples) == MAX_BUILD_TIME_SAMPLES:
+            break
+
+    return statistics.median(samples) if samples else None
+
+
 class InstallAction:
     #: Don't perform an install
     NONE = 0
@@ -382,7 +430,10 @@ def _print_timer(pre: str, pkg_id: str, timer: timer.BaseTimer) -> None:
 
 
 def _install_from_cache(
-    pkg: "spack.package_base.PackageBase", explicit: bool, unsigned: Optional[bool] = False
+    pkg: "spack.package_base.PackageBase",
+    explicit: bool,
+    unsigned: Optional[bool] = False,
+    prefetched: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Install the package from binary cache
@@ -392,12 +443,13 @@ def _install_from_cache(
         explicit: ``True`` if installing the package was explicitly
             requested by the user, otherwise, ``False``
         unsigned: if ``True`` or ``False`` override the mirror signature verification defaults
+        prefetched: download of the binary package started in the background, if any
 
     Return: ``True`` if the package was extract from binary cache, ``False`` otherwise
     """
     t = timer.Timer()
     installed_from_cache = _try_install_from_binary_cache(
-        pkg, explicit, unsigned=unsigned, timer=t
+        pkg, explicit, unsigned=unsigned, timer=t, prefetched=prefetched
     )
     if not installed_from_cache:
         return False
@@ -460,6 +512,7 @@ def _process_binary_cache_tarball(
     unsigned: Optional[bool],
     mirrors_for_spec: Optional[list] = None,
     timer: timer.BaseTimer = timer.NULL_TIMER,
+    prefetched: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Process the binary cache tarball.
@@ -471,15 +524,20 @@ def _process_binary_cache_tarball(
         mirrors_for_spec: Optional list of concrete specs and mirrors
         obtained by calling binary_distribution.get_mirrors_for_spec().
         timer: timer to keep track of binary install phases.
+        prefetched: download of the binary package started in the background. If given,
+            its result is used instead of downloading the tarball again.
 
     Return:
         bool: ``True`` if the package was extracted from binary cache,
             else ``False``
     """
     with timer.measure("fetch"):
-        download_result = binary_distribution.download_tarball(
-            pkg.spec, unsigned, mirrors_for_spec
-        )
+        if prefetched is not None:
+            download_result = prefetched.result()
+        else:
+            download_result = binary_distribution.download_tarball(
+                pkg.spec, unsigned, mirrors_for_spec
+            )
 
         if download_result is None:
             return False
@@ -499,6 +557,7 @@ def _try_install_from_binary_cache(
     explicit: bool,
     unsigned: Optional[bool] = None,
     timer: timer.BaseTimer = timer.NULL_TIMER,
+    prefetched: Optional[concurrent.futures.Future] = None,
 ) -> bool:
     """
     Try to extract the package from binary cache.
@@ -508,11 +567,17 @@ def _try_install_from_binary_cache(
         explicit: the package was explicitly requested by the user
         unsigned: if ``True`` or ``False`` override the mirror signature verification defaults
         timer: timer to keep track of binary install phases.
+        prefetched: download of the binary package started in the background, if any
     """
     # Early exit if no binary mirrors are configured.
     if not spack.mirror.MirrorCollection(binary=True):
         return False
 
+    if prefetched is not None:
+        return _process_binary_cache_tarball(
+            pkg, explicit, unsigned, timer=timer, prefetched=prefetched
+        )
+
     tty.debug(f"Searching for binary cache of {package_id(pkg)}")
 
     with timer.measure("search"):
@@ -799,6 +864,8 @@ def __str__(self) -> str:
     def _add_default_args(self) -> None:
         """Ensure standard install options are set to at least the default."""
         for arg, default in [
+            ("concurrent_fetches", 1),
+            ("concurrent_packages", 1),
             ("context", "build"),  # installs *always* build
             ("dependencies_cache_only", False),
             ("dependencies_use_cache", True),
@@ -955,6 +1022,10 @@ def __init__(
         # to support tracking of parallel, multi-spec, environment installs.
         self.dependents = set(get_dependent_ids(self.pkg.spec))
 
+        # Estimated time, in seconds, to install this package and the longest chain of
+        # packages depending on it. Only used by the "critical_path" install scheduler.
+        self.critical_path = 0.0
+
         tty.debug(f"Pkg id {self.pkg_id} has the following dependents:")
         for dep_id in self.dependents:
             tty.debug(f"- {dep_id}")
@@ -1094,9 +1165,9 @@ def cache_only(self) -> bool:
             return self.request.install_args.get("dependencies_cache_only", _cache_only)
 
     @property
-    def key(self) -> Tuple[int, int]:
-        """The key is the tuple (# uninstalled dependencies, sequence)."""
-        return (self.priority, self.sequence)
+    def key(self) -> Tuple[int, float, int]:
+        """The key is the tuple (# uninstalled dependencies, -critical path, sequence)."""
+        return (self.priority, -self.critical_path, self.sequence)
 
     def next_attempt(self, installed) -> "BuildTask":
         """Create a new, updated task for the next installation attempt."""
@@ -1112,6 +1183,83 @@ def priority(self):
         return len(self.uninstalled_deps)
 
 
+class BinaryCachePrefetcher:
+    """Downloads binary packages from build caches in background threads, ahead of their
+    installation, so that the installer doesn't wait on the network for each package.
+
+    Downloads are started in the order packages are scheduled, and at most twice as many
+    tarballs as concurrent downloads are kept on disk before they are extracted.
+
+    Args:
+        concurrent_fetches: maximum number of binary packages downloaded at the same time
+    """
+
+    def __init__(self, concurrent_fetches: int) -> None:
+        self.concurrent_fetches = concurrent_fetches
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrent_fetches)
+
+        # Packages scheduled for download, keyed on DAG hash, in download order
+        self._pending: Dict[str, Tuple["spack.package_base.PackageBase", Optional[bool]]] = {}
+
+        # Downloads that have been started and not yet claimed, keyed on DAG hash
+        self._downloads: Dict[str, concurrent.futures.Future] = {}
+
+    def schedule(self, pkg: "spack.package_base.PackageBase", unsigned: Optional[bool]) -> None:
+        """Schedule the download of the binary package for ``pkg``.
+
+        Args:
+            pkg: package to be installed from a build cache
+            unsigned: if ``True`` or ``False`` override the mirror signature verification defaults
+        """
+        key = pkg.spec.dag_hash()
+        if key not in self._downloads:
+            self._pending.setdefault(key, (pkg, unsigned))
+        self._start_downloads()
+
+    def _start_downloads(self) -> None:
+        while self._pending and len(self._downloads) < 2 * self.concurrent_fetches:
+            key = next(iter(self._pending))
+            pkg, unsigned = self._pending.pop(key)
+
+            # Searching the local copy of the buildcache indices is done in this thread, since
+            # the indices are shared. Packages not in any index are left to the installer.
+            matches = binary_distribution.get_mirrors_for_spec(pkg.spec, index_only=True)
+            if not matches:
+                continue
+
+            tty.debug(f"Prefetching {package_id(pkg)} from binary cache")
+            self._downloads[key] = self._executor.submit(
+                binary_distribution.download_tarball, pkg.spec, unsigned, matches
+            )
+
+    def claim(self, spec: "spack.spec.Spec") -> Optional[concurrent.futures.Future]:
+        """Return the download of the binary package for ``spec``, if it was started, and
+        cancel it if it wasn't. The caller is responsible for the downloaded files.
+        """
+        key = spec.dag_hash()
+        self._pending.pop(key, None)
+        result = self._downloads.pop(key, None)
+        self._start_downloads()
+        return result
+
+    def shutdown(self) -> None:
+        """Stop downloading, and remove the binary packages that were downloaded but not
+        claimed.
+        """
+        self._pending.clear()
+        for future in self._downloads.values():
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+        for future in self._downloads.values():
+            if future.cancelled() or future.exception() is not None:
+                continue
+            download_result = future.result()
+            if download_result is not None:
+                binary_distribution._delete_staged_downloads(download_result)
+        self._downloads.clear()
+
+
 class PackageInstaller:
     """
     Class for managing the install process for a Spack instance based on a
@@ -1134,7 +1282,7 @@ def __init__(self, installs: List[Tuple["spack.package_base.PackageBase", dict]]
         self.build_requests = [BuildRequest(pkg, install_args) for pkg, install_args in installs]
 
         # Priority queue of build tasks
-        self.build_pq: List[Tuple[Tuple[int, int], BuildTask]] = []
+        self.build_pq: List[Tuple[Tuple[int, float, int], BuildTask]] = []
 
         # Mapping of unique package ids to build task
         self.build_tasks: Dict[str, BuildTask] = {}
@@ -1158,6 +1306,25 @@ def __init__(self, installs: List[Tuple["spack.package_base.PackageBase", dict]]
         # fast then that option applies to all build requests.
         self.fail_fast = False
 
+        # Maximum number of packages built at the same time. When it's greater than one,
+        # builds from sources run in the background.
+        self.concurrent_packages = max(
+            (r.install_args.get("concurrent_packages", 1) for r in self.build_requests), default=1
+        )
+
+        # Builds running in the background, keyed on the package's unique id
+        self.running: Dict[str, Tuple[BuildTask, spack.build_environment.BuildProcess]] = {}
+
+        # Jobserver shared by the builds running in the background, and the number of
+        # tokens taken from it, one for each build beyond the first
+        self.jobserver: Optional[spack.util.jobserver.JobServer] = None
+        self.jobserver_tokens = 0
+        self._waiting_for_token = False
+
+        # Downloads binary packages ahead of their installation, if more than one
+        # concurrent fetch is requested
+        self.prefetcher: Optional[BinaryCachePrefetcher] = None
+
     def __repr__(self) -> str:
         """Returns a formal representation of the package installer."""
         rep = f"{self.__class__.__name__}("
@@ -1633,14 +1800,21 @@ def _add_compiler_package_to_config(self, pkg: "spack.package_base.PackageBase")
             spack.compilers.find_compilers([compiler_search_prefix])
         )
 
-    def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
+    def _install_task(
+        self, task: BuildTask, install_status: InstallStatus, background: bool = False
+    ) -> Optional["spack.build_environment.BuildProcess"]:
         """
         Perform the installation of the requested spec and/or dependency
         represented by the build task.
 
         Args:
             task: the installation build task for a package
-            install_status: the installation status for the package"""
+            install_status: the installation status for the package
+            background: if ``True``, a build from sources is started in a child process
+                that is returned without waiting for it, and must be completed with
+                ``_complete_build``
+
+        Return: the build process started in the background, if any"""
 
         explicit = task.explicit
         install_args = task.request.install_args
@@ -1658,11 +1832,12 @@ def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
 
         # Use the binary cache if requested
         if use_cache:
-            if _install_from_cache(pkg, explicit, unsigned):
+            prefetched = self.prefetcher.claim(pkg.spec) if self.prefetcher else None
+            if _install_from_cache(pkg, explicit, unsigned, prefetched=prefetched):
                 self._update_installed(task)
                 if task.compiler:
                     self._add_compiler_package_to_config(pkg)
-                return
+                return None
             elif cache_only:
                 raise InstallError("No binary found when cache-only was specified", pkg=pkg)
             else:
@@ -1673,24 +1848,59 @@ def _install_task(self, task: BuildTask, install_status: InstallStatus) -> None:
         # hook that allows tests to inspect the Package before installation
         # see unit_test_check() docs.
         if not pkg.unit_test_check():
-            return
+            return None
 
         # Injecting information to know if this installation request is the root one
         # to determine in BuildProcessInstaller whether installation is explicit or not
         install_args["is_root"] = task.is_root
 
-        try:
-            self._setup_install_dir(pkg)
+        self._setup_install_dir(pkg)
 
-            # Create stage object now and let it be serialized for the child process. That
-            # way monkeypatch in tests works correctly.
-            pkg.stage
+        # Create stage object now and let it be serialized for the child process. That
+        # way monkeypatch in tests works correctly.
+        pkg.stage
 
-            # Create a child process to do the actual installation.
-            # Preserve verbosity settings across installs.
-            spack.package_base.PackageBase._verbose = spack.build_environment.start_build_process(
-                pkg, build_process, install_args
+        if background:
+            # Builds running at the same time share the parallel jobs, through the
+            # jobserver if there is one
+            jobs = spack.util.cpus.determine_number_of_jobs(parallel=True)
+            if self.jobserver is not None:
+                kwargs = dict(install_args, build_jobs=jobs, jobserver=self.jobserver.path)
+            else:
+                kwargs = dict(install_args, build_jobs=max(1, jobs // self.concurrent_packages))
+            return spack.build_environment.BuildProcess(
+                pkg, build_process, kwargs, forward_stdin=False
             )
+
+        # Create a child process to do the actual installation.
+        self._finish_build(
+            task,
+            lambda: spack.build_environment.start_build_process(pkg, build_process, install_args),
+        )
+        return None
+
+    def _complete_build(
+        self, task: BuildTask, build: "spack.build_environment.BuildProcess"
+    ) -> None:
+        """Wait for a build started in the background by ``_install_task`` to finish.
+
+        Args:
+            task: the installation build task for a package
+            build: the process building the package
+        """
+        self._finish_build(task, build.complete)
+
+    def _finish_build(self, task: BuildTask, wait: Callable[[], bool]) -> None:
+        """Wait for the build process of a package, and register the package once installed.
+
+        Args:
+            task: the installation build task for a package
+            wait: function waiting for the build process, and returning its result
+        """
+        pkg, explicit = task.pkg, task.explicit
+        try:
+            # Preserve verbosity settings across installs.
+            spack.package_base.PackageBase._verbose = wait()
             # Currently this is how RPATH-like behavior is achieved on Windows, after install
             # establish runtime linkage via Windows Runtime link object
             # Note: this is a no-op on non Windows platforms
@@ -1953,6 +2163,46 @@ def _init_queue(self) -> None:
                 for dependent_id in dependents.difference(task.dependents):
                     task.add_dependent(dependent_id)
 
+        if spack.config.get("config:install_scheduler", "fifo") == "critical_path":
+            self._prioritize_critical_path()
+
+    def _prioritize_critical_path(self) -> None:
+        """Among the packages that are ready to be installed, start with those at the head
+        of the longest chain of builds still to do, estimated from previous builds.
+        """
+        durations: Dict[str, Optional[float]] = {}
+        for pkg_id, task in self.build_tasks.items():
+            spec = task.pkg.spec
+            if spec.external or spec.installed_upstream or self._check_db(spec)[1]:
+                durations[pkg_id] = 0.0
+            else:
+                durations[pkg_id] = _historical_build_time(spec)
+
+        # Packages never built before take the typical time of the others
+        known = [x for x in durations.values() if x]
+        default = statistics.median(known) if known else 1.0
+
+        # Visit dependents before their dependencies
+        paths: Dict[str, float] = {}
+
+        def _critical_path(pkg_id: str) -> float:
+            if pkg_id not in paths:
+                task = self.build_tasks[pkg_id]
+                duration = durations[pkg_id]
+                tail = max(
+                    (_critical_path(x) for x in task.dependents if x in self.build_tasks),
+                    default=0.0,
+                )
+                paths[pkg_id] = (default if duration is None else duration) + tail
+            return paths[pkg_id]
+
+        for pkg_id, task in self.build_tasks.items():
+            task.critical_path = _critical_path(pkg_id)
+            tty.debug(f"{pkg_id}: critical path of {task.critical_path:.1f}s", level=2)
+
+        self.build_pq = [(task.key, task) for _, task in self.build_pq]
+        heapq.heapify(self.build_pq)
+
     def _install_action(self, task: BuildTask) -> int:
         """
         Determine whether the installation should be overwritten (if it already
@@ -1989,13 +2239,226 @@ def _install_action(self, task: BuildTask) -> int:
         # back on failure
         return InstallAction.OVERWRITE
 
+    def _start_prefetching(self) -> None:
+        """Schedule the download of binary packages for all the build tasks that can use
+        the build cache, in dependency order, if concurrent fetches are requested.
+        """
+        concurrent_fetches = max(
+            request.install_args.get("concurrent_fetches", 1) for request in self.build_requests
+        )
+        if concurrent_fetches <= 1 or not spack.mirror.MirrorCollection(binary=True):
+            return
+
+        self.prefetcher = BinaryCachePrefetcher(concurrent_fetches)
+        for request in self.build_requests:
+            for spec in itertools.chain(request.traverse_dependencies(), [request.spec]):
+                task = self.build_tasks.get(package_id(spec.package))
+                if task is None or not task.use_cache:
+                    continue
+                if spec.external or spec.installed_upstream or self._check_db(spec)[1]:
+                    continue
+                unsigned = task.request.install_args.get("unsigned")
+                self.prefetcher.schedule(task.pkg, unsigned)
+
+    def _can_start_task(self) -> bool:
+        """Whether the next task in the queue can be started, while builds are running in
+        the background.
+        """
+        # Discard removed tasks, to look at the next task that will actually be processed
+        while self.build_pq and self.build_pq[0][1].status == STATUS_REMOVED:
+            heapq.heappop(self.build_pq)
+
+        self._waiting_for_token = False
+        if len(self.running) >= self.concurrent_packages or not self.build_pq:
+            return False
+        if not self._next_is_pri0():
+            return False
+
+        # Each build beyond the first one takes a job slot from the jobserver
+        if self.jobserver is not None and self.jobserver_tokens < len(self.running):
+            if not self.jobserver.acquire():
+                self._waiting_for_token = True
+                return False
+            self.jobserver_tokens += 1
+        return True
+
+    def _wait_for_build(
+        self,
+    ) -> Optional[Tuple[BuildTask, "spack.build_environment.BuildProcess"]]:
+        """Wait for one of the builds running in the background to finish, and return it
+        together with its build task.
+
+        If the next task is only waiting for a job slot, this returns None as soon as a
+        token is available in the jobserver.
+        """
+        pkg_ids = {build.connection: pkg_id for pkg_id, (_, build) in self.running.items()}
+        waitables: List = list(pkg_ids)
+        if self._waiting_for_token:
+            waitables.append(self.jobserver)
+
+        ready = [x for x in multiprocessing.connection.wait(waitables) if x in pkg_ids]
+        if not ready:
+            return None
+        result = self.running.pop(pkg_ids[ready[0]])
+
+        # Give back the tokens that are not needed by the remaining builds
+        while self.jobserver_tokens > max(len(self.running) - 1, 0):
+            self.jobserver.release()  # type: ignore[union-attr]
+            self.jobserver_tokens -= 1
+        return result
+
+    def _complete_task(
+        self,
+        task: BuildTask,
+        install_status: InstallStatus,
+        failed_explicits: List[Tuple["spack.package_base.PackageBase", str, str]],
+        build: Optional["spack.build_environment.BuildProcess"] = None,
+    ) -> None:
+        """Install the package of a build task, or complete its build if it was started
+        in the background, and record the outcome.
+
+        When more than one package can be installed concurrently, builds from sources are
+        started in the background and this returns immediately. The task is completed
+        once its build has finished, by calling this again with the build process.
+
+        Args:
+            task: the installation build task for a package, with a write lock on it
+            install_status: the installation status for the package
+            failed_explicits: explicit packages that failed to install, with their errors
+            build: the process building the package in the background, if any
+        """
+        pkg, pkg_id = task.pkg, task.pkg_id
+        keep_prefix = task.request.install_args.get("keep_prefix")
+        single_explicit_spec = len(self.build_requests) == 1
+        action = InstallAction.INSTALL
+        try:
+            if build is not None:
+                self._complete_build(task, build)
+            else:
+                action = self._install_action(task)
+
+                if action == InstallAction.INSTALL:
+                    build = self._install_task(
+                        task, install_status, background=self.concurrent_packages > 1
+                    )
+                    if build is not None:
+                        self.running[pkg_id] = (task, build)
+                        return
+                elif action == InstallAction.OVERWRITE:
+                    # spack.store.STORE.db is not really a Database object, but a small
+                    # wrapper -- silence mypy
+                    OverwriteInstall(self, spack.store.STORE.db, task, install_status).install()  # type: ignore[arg-type] # noqa: E501
+
+            self._update_installed(task)
+
+            # If we installed then we should keep the prefix
+            stop_before_phase = getattr(pkg, "stop_before_phase", None)
+            last_phase = getattr(pkg, "last_phase", None)
+            keep_prefix = keep_prefix or (stop_before_phase is None and last_phase is None)
+
+        except KeyboardInterrupt as exc:
+            # The build has been terminated with a Ctrl-C so terminate
+            # regardless of the number of remaining specs.
+            tty.error(
+                f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
+            )
+            raise
+
+        except binary_distribution.NoChecksumException as exc:
+            if task.cache_only:
+                raise
+
+            # Checking hash on downloaded binary failed.
+            tty.error(
+                f"Failed to install {pkg.name} from binary cache due "
+                f"to {str(exc)}: Requeueing to install from source."
+            )
+            # this overrides a full method, which is ugly.
+            task.use_cache = False  # type: ignore[misc]
+            self._requeue_task(task, install_status)
+            return
+
+        except (Exception, SystemExit) as exc:
+            self._update_failed(task, True, exc)
+
+            # Best effort installs suppress the exception and mark the
+            # package as a failure.
+            if not isinstance(exc, spack.error.SpackError) or not exc.printed:  # type: ignore[union-attr] # noqa: E501
+                exc.printed = True  # type: ignore[union-attr]
+                # SpackErrors can be printed by the build process or at
+                # lower levels -- skip printing if already printed.
+                # TODO: sort out this and SpackError.print_context()
+                tty.error(
+                    f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
+                )
+            # Terminate if requested to do so on the first failure.
+            if self.fail_fast:
+                raise InstallError(f"{FAIL_FAST_ERR}: {str(exc)}", pkg=pkg)
+
+            # Terminate at this point if the single explicit spec has
+            # failed to install.
+            if single_explicit_spec and task.explicit:
+                raise
+
+            # Track explicit spec id and error to summarize when done
+            if task.explicit:
+                failed_explicits.append((pkg, pkg_id, str(exc)))
+
+        finally:
+            # Remove the install prefix if anything went wrong during
+            # install, unless the build continues in the background.
+            running = pkg_id in self.running
+            if not running and not keep_prefix and not action == InstallAction.OVERWRITE:
+                pkg.remove_prefix()
+
+        # Perform basic task cleanup for the installed spec to
+        # include downgrading the write to a read lock
+        self._cleanup_task(pkg)
+
+    def _stop_builds(self) -> None:
+        """Terminate the builds running in the background, e.g. after a failure"""
+        for task, build in self.running.values():
+            tty.debug(f"Terminating the build of {task.pkg_id}")
+            build.terminate()
+            if not task.request.install_args.get("keep_prefix"):
+                task.pkg.remove_prefix()
+        self.running.clear()
+
+    def _start_jobserver(self) -> None:
+        """Start a jobserver, so that packages built at the same time share the budget of
+        parallel jobs. Not needed when Spack already runs under the jobserver of make.
+        """
+        if self.concurrent_packages <= 1 or sys.platform == "win32":
+            return
+        if spack.build_environment.jobserver_enabled():
+            return
+        jobs = spack.util.cpus.determine_number_of_jobs(parallel=True)
+        try:
+            self.jobserver = spack.util.jobserver.JobServer(jobs)
+        except OSError as e:
+            tty.debug(f"Cannot start a jobserver, jobs will be split among builds: {e}")
+
     def install(self) -> None:
         """Install the requested package(s) and or associated dependencies."""
 
         self._init_queue()
-        fail_fast_err = "Terminating after first install failure"
-        single_explicit_spec = len(self.build_requests) == 1
-        failed_explicits = []
+        self._start_prefetching()
+        self._start_jobserver()
+        try:
+            self._install()
+        finally:
+            self._stop_builds()
+            if self.jobserver is not None:
+                self.jobserver.close()
+                self.jobserver = None
+                self.jobserver_tokens = 0
+            if self.prefetcher is not None:
+                self.prefetcher.shutdown()
+                self.prefetcher = None
+
+    def _install(self) -> None:
+        """Process the build queue"""
+        failed_explicits: List[Tuple["spack.package_base.PackageBase", str, str]] = []
 
         install_status = InstallStatus(len(self.build_pq))
 
@@ -2005,14 +2468,20 @@ def install(self) -> None:
             enabled=sys.stdout.isatty() and tty.msg_enabled() and not tty.is_debug()
         )
 
-        while self.build_pq:
+        while self.build_pq or self.running:
+            # Wait for a build running in the background to finish, if no other task
+            # can be started meanwhile
+            if self.running and not self._can_start_task():
+                finished = self._wait_for_build()
+                if finished is not None:
+                    task, build = finished
+                    self._complete_task(task, install_status, failed_explicits, build)
+                continue
+
             task = self._pop_task()
             if task is None:
                 continue
 
-            install_args = task.request.install_args
-            keep_prefix = install_args.get("keep_prefix")
-
             pkg, pkg_id, spec = task.pkg, task.pkg_id, task.pkg.spec
             install_status.next_pkg(pkg)
             install_status.set_term_title(f"Processing {pkg.name}")
@@ -2058,7 +2527,7 @@ def install(self) -> None:
                 self._update_failed(task)
 
                 if self.fail_fast:
-                    raise InstallError(fail_fast_err, pkg=pkg)
+                    raise InstallError(FAIL_FAST_ERR, pkg=pkg)
 
                 continue
 
@@ -2136,81 +2605,7 @@ def install(self) -> None:
             # Proceed with the installation since we have an exclusive write
             # lock on the package.
             install_status.set_term_title(f"Installing {pkg.name}")
-            try:
-                action = self._install_action(task)
-
-                if action == InstallAction.INSTALL:
-                    self._install_task(task, install_status)
-                elif action == InstallAction.OVERWRITE:
-                    # spack.store.STORE.db is not really a Database object, but a small
-                    # wrapper -- silence mypy
-                    OverwriteInstall(self, spack.store.STORE.db, task, install_status).install()  # type: ignore[arg-type] # noqa: E501
-
-                self._update_installed(task)
-
-                # If we installed then we should keep the prefix
-                stop_before_phase = getattr(pkg, "stop_before_phase", None)
-                last_phase = getattr(pkg, "last_phase", None)
-                keep_prefix = keep_prefix or (stop_before_phase is None and last_phase is None)
-
-            except KeyboardInterrupt as exc:
-                # The build has been terminated with a Ctrl-C so terminate
-                # regardless of the number of remaining specs.
-                tty.error(
-                    f"Failed to install {pkg.name} due to " f"{exc.__class__.__name__}: {str(exc)}"
-                )
-                raise
-
-            except binary_distribution.NoChecksumException as exc:
-                if task.cache_only:
-                    raise
-
-                # Checking hash on downloaded binary failed.
-                tty.error(
-                    f"Failed to install {pkg.name} from binary cache due "
-                    f"to {str(exc)}: Requeueing to install from source."
-                )
-                # this overrides a full method, which is ugly.
-                task.use_cache = False  # type: ignore[misc]
-                self._requeue_task(task, install_status)
-                continue
-
-            except (Exception, SystemExit) as exc:
-                self._update_failed(task, True, exc)
-
-                # Best effort installs suppress the exception and mark the
-                # package as a failure.
-                if not isinstance(exc, spack.error.SpackError) or not exc.printed:  # type: ignore[union-attr] # noqa: E501
-                    exc.printed = True  # type: ignore[union-attr]
-                    # SpackErrors can be printed by the build process or at
-                    # lower levels -- skip printing if already printed.
-                    # TODO: sort out this and SpackError.print_context()
-                    tty.error(
-                        f"Failed to install {pkg.name} due to "
-                        f"{exc.__class__.__name__}: {str(exc)}"
-                    )
-                # Terminate if requested to do so on the first failure.
-                if self.fail_fast:
-                    raise InstallError(f"{fail_fast_err}: {str(exc)}", pkg=pkg)
-
-                # Terminate at this point if the single explicit spec has
-                # failed to install.
-                if single_explicit_spec and task.explicit:
-                    raise
-
-                # Track explicit spec id and error to summarize when done
-                if task.explicit:
-                    failed_explicits.append((pkg, pkg_id, str(exc)))
-
-            finally:
-                # Remove the install prefix if anything went wrong during
-                # install.
-                if not keep_prefix and not action == InstallAction.OVERWRITE:
-                    pkg.remove_prefix()
-
-            # Perform basic task cleanup for the installed spec to
-            # include downgrading the write to a read lock
-            self._cleanup_task(pkg)
+            self._complete_task(task, install_status, failed_explicits)
 
         # Cleanup, which includes releasing all of the read locks
         self._cleanup_all_tasks()
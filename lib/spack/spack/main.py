@@ -34,12 +34,9 @@
 
 import spack.cmd
 import spack.config
-import spack.environment as ev
-import spack.modules
 import spack.paths
 import spack.platforms
 import spack.repo
-import spack.solver.asp
 import spack.spec
 import spack.store
 import spack.util.debug
@@ -48,6 +45,10 @@
 import spack.util.path
 from spack.error import SpackError
 
+#: Environments and module files are imported only by the commands that need them
+ev = llnl.util.lang.lazy_import("spack.environment")
+modules = llnl.util.lang.lazy_import("spack.modules")
+
 #: names of profile statistics
 stat_names = pstats.Stats.sort_arg_dict_default
 
@@ -530,6 +531,11 @@ def make_argument_parser(**kwargs):
         metavar="STAT",
         help=f"profile and sort\n\none or more of: {stat_lines[0]}",
     )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="report the modules that are slowest to import, using python -X importtime",
+    )
     parser.add_argument(
         "--lines",
         default=20,
@@ -748,15 +754,20 @@ def _log_command_output(self, out):
                     tty.verbose(fmt.format(ln.replace("==> ", "")))
 
 
-def _profile_wrapper(command, parser, args, unknown_args):
-    import cProfile
-
+def _profile_lines(args):
+    """Number of lines of profile output requested with ``--lines``, or -1 for all of them"""
     try:
-        nlines = int(args.lines)
+        return int(args.lines)
     except ValueError:
         if args.lines != "all":
             tty.die("Invalid number for --lines: %s" % args.lines)
-        nlines = -1
+        return -1
+
+
+def _profile_wrapper(command, parser, args, unknown_args):
+    import cProfile
+
+    nlines = _profile_lines(args)
 
     # allow comma-separated list of fields
     sortby = ["time"]
@@ -781,6 +792,46 @@ def _profile_wrapper(command, parser, args, unknown_args):
         stats.print_stats(nlines)
 
 
+#: Line of ``python -X importtime`` output: self time, cumulative time, indented module name
+IMPORT_TIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def _profile_imports(argv, args):
+    """Run Spack again with ``python -X importtime``, and print the modules that took longest
+    to import, including the modules they imported, to stderr.
+    """
+    nlines = _profile_lines(args)
+    argv = [arg for arg in argv if arg != "--profile-imports"]
+    proc = sp.run(
+        [sys.executable, "-X", "importtime", spack.paths.spack_script, *argv],
+        stderr=sp.PIPE,
+        universal_newlines=True,
+    )
+
+    imports = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            imports.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+        elif not line.startswith("import time:"):
+            sys.stderr.write(line + "\n")
+
+    # modules imported at the top level add up to the total import time
+    total = sum(cumulative for cumulative, _, depth, _ in imports if depth == 0)
+    imports.sort(key=operator.itemgetter(0), reverse=True)
+    if nlines >= 0:
+        imports = imports[:nlines]
+
+    sys.stderr.write(f"\nimported modules in {total / 1e6:.3f}s\n\n")
+    sys.stderr.write(f"{'cumulative':>12}{'self':>12}  module\n")
+    for cumulative, self_time, depth, name in imports:
+        sys.stderr.write(
+            f"{cumulative / 1e3:10.1f}ms{self_time / 1e3:10.1f}ms  {'  ' * depth}{name}\n"
+        )
+    return proc.returncode
+
+
 @llnl.util.lang.memoized
 def _compatible_sys_types():
     """Return a list of all the platform-os-target tuples compatible
@@ -824,7 +875,7 @@ def shell_set(var, value):
     # print roots for all module systems
     module_to_roots = {"tcl": list(), "lmod": list()}
     for name in module_to_roots.keys():
-        path = spack.modules.common.root_path(name, "default")
+        path = modules.common.root_path(name, "default")
         module_to_roots[name].append(path)
 
     other_spack_instances = spack.config.get("upstreams") or {}
@@ -950,6 +1001,10 @@ def _main(argv=None):
         parser.print_help()
         return 1
 
+    # the imports are timed in a new process, since most of them happened already in this one
+    if args.profile_imports:
+        return _profile_imports(sys.argv[1:] if argv is None else argv, args)
+
     # version is special as it does not require a command or loading and additional infrastructure
     if args.version:
         print(get_version())
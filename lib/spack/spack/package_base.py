@@ -776,54 +776,23 @@ def possible_dependencies(
 
         visited.setdefault(cls.name, set())
 
+        dependency_types: Dict[str, dt.DepFlag] = {}
         for name, conditions in cls.dependencies_by_name(when=True).items():
-            # check whether this dependency could be of the type asked for
-            depflag_union = 0
+            dependency_types[name] = 0
             for deplist in conditions.values():
                 for dep in deplist:
-                    depflag_union |= dep.depflag
-            if not (depflag & depflag_union):
-                continue
-
-            # expand virtuals if enabled, otherwise just stop at virtuals
-            if spack.repo.PATH.is_virtual(name):
-                if virtuals is not None:
-                    virtuals.add(name)
-                if expand_virtuals:
-                    providers = spack.repo.PATH.providers_for(name)
-                    dep_names = [spec.name for spec in providers]
-                else:
-                    visited.setdefault(cls.name, set()).add(name)
-                    visited.setdefault(name, set())
-                    continue
-            else:
-                dep_names = [name]
-
-            # add the dependency names to the visited dict
-            visited.setdefault(cls.name, set()).update(set(dep_names))
-
-            # recursively traverse dependencies
-            for dep_name in dep_names:
-                if dep_name in visited:
-                    continue
-
-                visited.setdefault(dep_name, set())
-
-                # skip the rest if not transitive
-                if not transitive:
-                    continue
-
-                try:
-                    dep_cls = spack.repo.PATH.get_pkg_class(dep_name)
-                except spack.repo.UnknownPackageError:
-                    # log unknown packages
-                    missing.setdefault(cls.name, set()).add(dep_name)
-                    continue
-
-                dep_cls.possible_dependencies(
-                    transitive, expand_virtuals, depflag, visited, missing, virtuals
-                )
-
+                    dependency_types[name] |= dep.depflag
+
+        _possible_dependencies(
+            cls.name,
+            dependency_types,
+            transitive,
+            expand_virtuals,
+            depflag,
+            visited,
+            missing,
+            virtuals,
+        )
         return visited
 
     @classproperty
@@ -2462,6 +2431,72 @@ def flatten_dependencies(spec, flat_dir):
         dep_files.merge(flat_dir + "/" + name)
 
 
+def _possible_dependencies(
+    pkg_name: str,
+    dependency_types: Dict[str, dt.DepFlag],
+    transitive: bool,
+    expand_virtuals: bool,
+    depflag: dt.DepFlag,
+    visited: dict,
+    missing: dict,
+    virtuals: Optional[set],
+) -> None:
+    """Visit the possible dependencies of a package, given the union of the dependency types
+    of each of them. See ``PackageBase.possible_dependencies`` for the other arguments.
+
+    Transitive dependencies are read from the package metadata index, so that their
+    ``package.py`` files are not imported.
+    """
+    for name, depflag_union in dependency_types.items():
+        # check whether this dependency could be of the type asked for
+        if not (depflag & depflag_union):
+            continue
+
+        # expand virtuals if enabled, otherwise just stop at virtuals
+        if spack.repo.PATH.is_virtual(name):
+            if virtuals is not None:
+                virtuals.add(name)
+            if expand_virtuals:
+                providers = spack.repo.PATH.providers_for(name)
+                dep_names = [spec.name for spec in providers]
+            else:
+                visited.setdefault(pkg_name, set()).add(name)
+                visited.setdefault(name, set())
+                continue
+        else:
+            dep_names = [name]
+
+        # add the dependency names to the visited dict
+        visited.setdefault(pkg_name, set()).update(set(dep_names))
+
+        # recursively traverse dependencies
+        for dep_name in dep_names:
+            if dep_name in visited:
+                continue
+
+            visited.setdefault(dep_name, set())
+
+            # skip the rest if not transitive
+            if not transitive:
+                continue
+
+            if not spack.repo.PATH.exists(dep_name):
+                # log unknown packages
+                missing.setdefault(pkg_name, set()).add(dep_name)
+                continue
+
+            _possible_dependencies(
+                dep_name,
+                spack.repo.PATH.metadata_index.dependency_types(dep_name),
+                transitive,
+                expand_virtuals,
+                depflag,
+                visited,
+                missing,
+                virtuals,
+            )
+
+
 def possible_dependencies(
     *pkg_or_spec: Union[str, spack.spec.Spec, typing.Type[PackageBase]],
     transitive: bool = True,
@@ -0,0 +1,210 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Index of the metadata that packages declare through directives, so that it can be queried
+without importing their ``package.py`` files.
+
+Each package is described by a plain dictionary, with the conditions of its directives
+stored as spec strings:
+
+.. code-block:: python
+
+    {
+        "doc": "docstring of the package class",
+        "versions": {"1.2.3": {"preferred": True}, "1.1.0": {"deprecated": True}},
+        "variants": {"shared": {"default": True, "description": "...", "values": None,
+                                "multi": False, "when": ""}},
+        "dependencies": {"when spec": {"dep name": {"spec": "dep spec",
+                                                    "type": ["build", "link"]}}},
+        "provides": {"when spec": ["virtual spec", ...]},
+        "conflicts": {"when spec": [["conflicting spec", "message or None"], ...]},
+        "patches": {"when spec": [patch.to_dict(), ...]},
+        "sources": ["/path/to/build_systems/generic.py", ...],
+    }
+
+The directives of a package also come from its base classes, which may be defined in other
+``package.py`` files or in ``spack.build_systems``. Their files are listed in ``sources``, so
+that the entry is updated when any of them changes, not only when the package file does.
+"""
+import copy
+import os
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional
+
+import spack.deptypes as dt
+import spack.error
+import spack.util.spack_json as sjson
+
+#: Keys of the version directives that are stored in the index
+VERSION_KEYS = ("deprecated", "preferred")
+
+#: Prefixes of the modules that define package classes with directives: the packages of
+#: repositories, and build systems
+SOURCE_MODULE_PREFIXES = ("spack.pkg.", "spack.build_systems.")
+
+
+def _json_value(value):
+    return value if isinstance(value, (bool, int, str)) or value is None else str(value)
+
+
+def _sources(pkg_cls) -> List[str]:
+    """Files that define the base classes of a package class, other than its own file"""
+    sources = set()
+    for cls in pkg_cls.__mro__[1:]:
+        if cls.__module__ == pkg_cls.__module__:
+            continue
+        if not cls.__module__.startswith(SOURCE_MODULE_PREFIXES):
+            continue
+        path = getattr(sys.modules.get(cls.__module__), "__file__", None)
+        if path:
+            sources.add(path)
+    return sorted(sources)
+
+
+def package_metadata(pkg_cls) -> Dict[str, Any]:
+    """Return the metadata declared by the directives of a package class"""
+    variants = {}
+    for name, (variant, when) in pkg_cls.variants.items():
+        variants[name] = {
+            "default": _json_value(variant.default),
+            "description": variant.description,
+            "values": None if variant.values is None else [str(v) for v in variant.values],
+            "multi": variant.multi,
+            "when": str(when),
+        }
+
+    return {
+        "doc": pkg_cls.__doc__ or "",
+        "versions": {
+            str(v): {key: info[key] for key in VERSION_KEYS if key in info}
+            for v, info in pkg_cls.versions.items()
+        },
+        "variants": variants,
+        "dependencies": {
+            str(when): {
+                name: {"spec": str(dep.spec), "type": list(dt.flag_to_tuple(dep.depflag))}
+                for name, dep in deps_by_name.items()
+            }
+            for when, deps_by_name in pkg_cls.dependencies.items()
+        },
+        "provides": {
+            str(when): sorted(str(s) for s in provided)
+            for when, provided in pkg_cls.provided.items()
+        },
+        "conflicts": {
+            str(when): [[str(spec), msg] for spec, msg in conflicts]
+            for when, conflicts in pkg_cls.conflicts.items()
+        },
+        "patches": {
+            str(when): [patch.to_dict() for patch in patches]
+            for when, patches in pkg_cls.patches.items()
+        },
+        "sources": _sources(pkg_cls),
+    }
+
+
+class PackageMetadataIndex(Mapping):
+    """Maps package names to the metadata declared by their directives."""
+
+    def __init__(self, repository):
+        self.repository = repository
+        self._packages: Dict[str, Dict[str, Any]] = {}
+
+    def to_json(self, stream):
+        sjson.dump({"packages": self._packages}, stream)
+
+    @staticmethod
+    def from_json(stream, repository):
+        d = sjson.load(stream)
+
+        if not isinstance(d, dict):
+            raise PackageMetadataIndexError("PackageMetadataIndex data was not a dict.")
+
+        if "packages" not in d:
+            raise PackageMetadataIndexError(
+                "PackageMetadataIndex data does not start with 'packages'"
+            )
+
+        r = PackageMetadataIndex(repository=repository)
+        r._packages.update(d["packages"])
+        return r
+
+    def __getitem__(self, pkg_name):
+        return self._packages[pkg_name]
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
+
+    def copy(self):
+        """Return a deep copy of this index."""
+        clone = PackageMetadataIndex(repository=self.repository)
+        clone._packages = copy.deepcopy(self._packages)
+        return clone
+
+    def update(self, other):
+        """Update this index with the packages of another one, which take precedence.
+
+        Args:
+            other (PackageMetadataIndex): index to be merged into this one
+        """
+        self._packages.update(other._packages)
+
+    def update_package(self, pkg_name):
+        """Updates a package in the index, or removes it if it no longer exists.
+
+        Args:
+            pkg_name (str): name of the package to be updated
+        """
+        if not self.repository.exists(pkg_name):
+            self._packages.pop(pkg_name, None)
+            return
+        self._packages[pkg_name] = package_metadata(self.repository.get_pkg_class(pkg_name))
+
+    def outdated(self, since: float) -> List[str]:
+        """Return the packages whose base classes are defined in files that were modified after
+        ``since``, or that no longer exist.
+
+        Args:
+            since: modification time of the index
+        """
+        mtimes: Dict[str, Optional[float]] = {}
+        result = []
+        for pkg_name, metadata in self._packages.items():
+            sources = metadata.get("sources")
+            if sources is None:
+                # written before base classes were tracked
+                result.append(pkg_name)
+                continue
+            for path in sources:
+                if path not in mtimes:
+                    try:
+                        mtimes[path] = os.stat(path).st_mtime
+                    except OSError:
+                        mtimes[path] = None
+                mtime = mtimes[path]
+                if mtime is None or mtime > since:
+                    result.append(pkg_name)
+                    break
+        return result
+
+    def dependency_types(self, pkg_name) -> Dict[str, dt.DepFlag]:
+        """Return the names of the possible dependencies of a package, under any condition,
+        mapped to the union of their dependency types.
+
+        Args:
+            pkg_name (str): name of the package
+        """
+        result: Dict[str, dt.DepFlag] = {}
+        for deps_by_name in self._packages[pkg_name]["dependencies"].values():
+            for name, dep in deps_by_name.items():
+                result[name] = result.get(name, 0) | dt.flag_from_strings(dep["type"])
+        return result
+
+
+class PackageMetadataIndexError(spack.error.SpackError):
+    """Raised when there is a problem with a PackageMetadataIndex."""
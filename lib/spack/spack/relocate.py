@@ -7,7 +7,7 @@
 import os
 import re
 from collections import OrderedDict
-from typing import List, Optional
+from typing import Iterable, List, Optional
 
 import macholib.mach_o
 import macholib.MachO
@@ -18,6 +18,7 @@
 from llnl.util.lang import memoized
 from llnl.util.symlink import symlink
 
+import spack.config
 import spack.paths
 import spack.platforms
 import spack.repo
@@ -25,11 +26,38 @@
 import spack.store
 import spack.util.elf as elf
 import spack.util.executable as executable
+import spack.util.parallel
 
-from .relocate_text import BinaryFilePrefixReplacer, TextFilePrefixReplacer
+from .relocate_text import BinaryFilePrefixReplacer, BinaryTextReplaceError, TextFilePrefixReplacer
 
 is_macos = str(spack.platforms.real_host()) == "darwin"
 
+#: Minimum number of files relocated by each task of a process pool, so that relocating
+#: small packages doesn't pay for starting processes
+MIN_FILES_PER_RELOCATION_TASK = 64
+
+#: Minimum number of bytes relocated by each process of a pool, since relocation is mostly
+#: bound by I/O, and sending work to processes costs more than relocating small files
+MIN_BYTES_PER_RELOCATION_JOB = 64 * 2**20
+
+
+def relocation_jobs(sizes: Iterable[int]) -> int:
+    """Return the number of processes relocating files with the given sizes, which is at most
+    ``config:relocation_jobs``, and is only larger than one for many files with a large total
+    size."""
+    jobs = spack.config.get("config:relocation_jobs", 1)
+    if jobs <= 1:
+        return 1
+    sizes = list(sizes)
+    return max(
+        1,
+        min(
+            jobs,
+            len(sizes) // MIN_FILES_PER_RELOCATION_TASK,
+            sum(sizes) // MIN_BYTES_PER_RELOCATION_JOB,
+        ),
+    )
+
 
 class InstallRootStringError(spack.error.SpackError):
     def __init__(self, file_path, root_path):
@@ -494,21 +522,42 @@ def _transform_rpaths(orig_rpaths, orig_root, new_prefixes):
 
 def new_relocate_elf_binaries(binaries, prefix_to_prefix):
     """Take a list of binaries, and an ordered dictionary of
-    prefix to prefix mapping, and update the rpaths accordingly."""
+    prefix to prefix mapping, and update the rpaths accordingly.
+
+    Return the binaries that were rewritten by patchelf, since the rpaths could not be
+    updated in place."""
 
     # Transform to binary string
     prefix_to_prefix = OrderedDict(
         (k.encode("utf-8"), v.encode("utf-8")) for (k, v) in prefix_to_prefix.items()
     )
 
+    # Updates that can't be done in place are applied here, since patchelf may have to be
+    # bootstrapped first
+    patched = []
+    for path, rpath, pt_interp in _map_files(_relocate_elf_files, binaries, prefix_to_prefix):
+        apply_elf_updates_with_patchelf(path, elf.ElfCStringUpdatesFailed(rpath, pt_interp))
+        patched.append(path)
+    return patched
+
+
+def _relocate_elf_files(binaries, prefix_to_prefix):
+    """Update the rpaths of ELF binaries in place, and return those that need patchelf"""
+    failed = []
     for path in binaries:
         try:
             elf.substitute_rpath_and_pt_interp_in_place_or_raise(path, prefix_to_prefix)
         except elf.ElfCStringUpdatesFailed as e:
-            # Fall back to `patchelf --set-rpath ... --set-interpreter ...`
-            rpaths = e.rpath.new_value.decode("utf-8").split(":") if e.rpath else []
-            interpreter = e.pt_interp.new_value.decode("utf-8") if e.pt_interp else None
-            _set_elf_rpaths_and_interpreter(path, rpaths=rpaths, interpreter=interpreter)
+            failed.append((path, e.rpath, e.pt_interp))
+    return failed
+
+
+def apply_elf_updates_with_patchelf(path: str, updates: elf.ElfCStringUpdatesFailed) -> None:
+    """Fall back to ``patchelf --set-rpath ... --set-interpreter ...`` for the updates of an
+    ELF binary that could not be done in place."""
+    rpaths = updates.rpath.new_value.decode("utf-8").split(":") if updates.rpath else []
+    interpreter = updates.pt_interp.new_value.decode("utf-8") if updates.pt_interp else None
+    _set_elf_rpaths_and_interpreter(path, rpaths=rpaths, interpreter=interpreter)
 
 
 def relocate_elf_binaries(
@@ -636,10 +685,12 @@ def relocate_text(files, prefixes):
         files (list): Text files to be relocated
         prefixes (OrderedDict): String prefixes which need to be changed
     """
-    TextFilePrefixReplacer.from_strings_or_bytes(prefixes).apply(files)
+    replacer = TextFilePrefixReplacer.from_strings_or_bytes(prefixes)
+    if not replacer.is_noop:
+        _map_files(replacer.apply, files)
 
 
-def relocate_text_bin(binaries, prefixes):
+def relocate_text_bin(binaries, prefixes, offsets=None):
     """Replace null terminated path strings hard-coded into binaries.
 
     The new install prefix must be shorter than the original one.
@@ -647,11 +698,47 @@ def relocate_text_bin(binaries, prefixes):
     Args:
         binaries (list): binaries to be relocated
         prefixes (OrderedDict): String prefixes which need to be changed.
+        offsets (dict): optional map from binaries to the offsets where prefixes were found
+            when they were pushed to a build cache. Other binaries are scanned for prefixes.
 
     Raises:
       spack.relocate_text.BinaryTextReplaceError: when the new path is longer than the old path
     """
-    return BinaryFilePrefixReplacer.from_strings_or_bytes(prefixes).apply(binaries)
+    replacer = BinaryFilePrefixReplacer.from_strings_or_bytes(prefixes)
+    if replacer.is_noop:
+        return []
+    return _map_files(replacer.apply, binaries, offsets)
+
+
+def _map_files(func, files, *args):
+    """Call ``func(chunk, *args)`` on chunks of ``files``, and return the concatenation of
+    the lists it returns.
+
+    The chunks are processed in parallel by up to ``config:relocation_jobs`` processes, and
+    the order of the results is not guaranteed.
+    """
+    files = list(files)
+    jobs = relocation_jobs(os.path.getsize(f) for f in files)
+    if jobs <= 1:
+        return func(files, *args)
+
+    # A few chunks per process balance the work when files have very different sizes
+    size = max(MIN_FILES_PER_RELOCATION_TASK, -(-len(files) // (4 * jobs)))
+    tasks = [(func, files[i : i + size], args) for i in range(0, len(files), size)]
+    results = []
+    for result, error in spack.util.parallel.imap_unordered(_call_on_chunk, tasks, processes=jobs):
+        if error is not None:
+            raise error
+        results.extend(result)
+    return results
+
+
+def _call_on_chunk(task):
+    func, chunk, args = task
+    try:
+        return func(chunk, *args), None
+    except BinaryTextReplaceError as e:
+        return [], e
 
 
 def is_binary(filename):
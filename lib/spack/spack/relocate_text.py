@@ -6,14 +6,22 @@
 """This module contains pure-Python classes and functions for replacing
 paths inside text files and binaries."""
 
+import io
+import itertools
+import mmap
+import os
 import re
+import string
 from collections import OrderedDict
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
 
 import spack.error
 
 Prefix = Union[str, bytes]
 
+#: Bytes matched by ``[\w\-_]`` in the regexes of text relocation
+_WORD_BYTES = frozenset((string.ascii_letters + string.digits + "-_").encode())
+
 
 def encode_path(p: Prefix) -> bytes:
     return p if isinstance(p, bytes) else p.encode("utf-8")
@@ -111,6 +119,13 @@ def __init__(self, prefix_to_prefix: Dict[bytes, bytes]):
         super().__init__(prefix_to_prefix)
         # Single regex for all paths.
         self.regex = _byte_strings_to_single_binary_regex(self.prefix_to_prefix.keys())
+        # Substrings that every prefix starts with, which are searched for first, since a plain
+        # substring search is much faster than trying the regex at every offset of a file: the
+        # common prefix of all paths, and the keys that are not paths (e.g. old sbang lines).
+        paths = [p for p in self.prefix_to_prefix if p.startswith(b"/")]
+        others = [p for p in self.prefix_to_prefix if not p.startswith(b"/")]
+        self.needles = ([os.path.commonprefix(paths)] if paths else []) + others
+        self.grows = any(len(new) > len(old) for old, new in self.prefix_to_prefix.items())
 
     @classmethod
     def from_strings_or_bytes(
@@ -120,18 +135,78 @@ def from_strings_or_bytes(
         return cls(_prefix_to_prefix_as_bytes(prefix_to_prefix))
 
     def _apply_to_file(self, f):
-        """Text replacement implementation simply reads the entire file
-        in memory and applies the combined regex."""
-        replacement = lambda m: m.group(1) + self.prefix_to_prefix[m.group(2)] + m.group(3)
-        data = f.read()
-        new_data = re.sub(self.regex, replacement, data)
-        if id(data) == id(new_data):
+        """Text replacement implementation: files on disk are memory mapped, and are not
+        copied nor written at all when they contain none of the prefixes. Otherwise, only
+        the part of the file starting at the first match is rewritten."""
+        try:
+            fd = f.fileno()
+            size = os.fstat(fd).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fd, size = None, 0
+
+        # Empty files can't be memory mapped
+        if fd is None or size == 0:
+            end = self._replace(f.read(), f)
+        else:
+            with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as data:
+                end = self._replace(data, f)
+
+        if end is None:
             return False
-        f.seek(0)
-        f.write(new_data)
-        f.truncate()
+        f.truncate(end)
         return True
 
+    def _replace(self, data, f) -> Optional[int]:
+        """Write the relocated contents of ``data`` to ``f``, starting at the offset of the first
+        match. Return the new size of the file, or None if nothing was replaced."""
+        matches = self._finditer(data)
+        first = next(matches, None)
+        if first is None:
+            return None
+
+        f.seek(first.start())
+        chunks, start = [], first.start()
+        for m in itertools.chain([first], matches):
+            # When no prefix grows, the relocated text never overtakes the text that is still
+            # to be scanned, so what precedes the current match can be written already
+            if not self.grows:
+                f.write(b"".join(chunks))
+                chunks.clear()
+            chunks.append(data[start : m.start()])
+            chunks.append(m.group(1) + self.prefix_to_prefix[m.group(2)] + m.group(3))
+            start = m.end()
+        chunks.append(data[start:])
+        f.write(b"".join(chunks))
+        return f.tell()
+
+    def _finditer(self, data):
+        """Equivalent to ``self.regex.finditer(data)``, but only tries the regex where the
+        substrings that the prefixes start with occur."""
+        # Matches of prefixes starting with a word character may begin anywhere in a word
+        if not self.needles or any(not n or n[0] in _WORD_BYTES for n in self.needles):
+            yield from self.regex.finditer(data)
+            return
+
+        pos = 0
+        found = {n: data.find(n, pos) for n in self.needles}
+        while True:
+            for n, i in found.items():
+                if 0 <= i < pos:
+                    found[n] = data.find(n, pos)
+            i = min((i for i in found.values() if i >= 0), default=-1)
+            if i < 0:
+                return
+            # The match starts at the beginning of the word right before the prefix
+            start = i
+            while start > pos and data[start - 1] in _WORD_BYTES:
+                start -= 1
+            m = self.regex.match(data, start)
+            if m is None:
+                pos = i + 1
+            else:
+                yield m
+                pos = m.end()
+
 
 class BinaryFilePrefixReplacer(PrefixReplacer):
     def __init__(self, prefix_to_prefix, suffix_safety_size=7):
@@ -208,10 +283,62 @@ def _apply_to_file(self, f):
         # We *could* read binary data in chunks to avoid loading all in memory,
         # but it's nasty to deal with matches across boundaries, so let's stick to
         # something simple.
+        return self._replace(f, ((m.start(), m) for m in self.regex.finditer(f.read())))
+
+    def apply(self, filenames: list, offsets: Optional[Dict[str, List[int]]] = None):
+        """Returns a list of files that were modified.
+
+        Files in ``offsets`` are not scanned for prefixes, but only relocated at the given
+        offsets, where prefixes were found when they were pushed to a build cache.
+        """
+        if offsets is None:
+            return super().apply(filenames)
+        changed_files = []
+        if self.is_noop:
+            return []
+        for filename in filenames:
+            if filename not in offsets:
+                modified = self.apply_to_filename(filename)
+            elif offsets[filename]:
+                with open(filename, "rb+") as f:
+                    modified = self.apply_at_offsets(f, offsets[filename])
+            else:
+                modified = False
+            if modified:
+                changed_files.append(filename)
+        return changed_files
+
+    def apply_at_offsets(self, f, offsets: List[int]) -> bool:
+        """Like ``apply_to_file``, but only reads the file at the given sorted offsets, where a
+        prefix may start.
 
+        Arguments:
+            f: file opened in rb+ mode
+            offsets: offsets of the possible prefix occurrences
+        """
+        if self.is_noop:
+            return False
+        return self._replace(f, self._matches_at(f, offsets))
+
+    def _matches_at(self, f, offsets: List[int]):
+        # Enough bytes to match the longest prefix, and look ahead for a null terminator
+        window = max(len(p) for p in self.prefix_to_prefix) + self.suffix_safety_size + 1
+        end = 0
+        for offset in offsets:
+            # Matches don't overlap, as with finditer
+            if offset < end:
+                continue
+            f.seek(offset)
+            match = self.regex.match(f.read(window))
+            if match:
+                end = offset + match.end()
+                yield offset, match
+
+    def _replace(self, f, matches) -> bool:
+        """Replace the prefixes of ``(offset, match)`` pairs in a file"""
         modified = True
 
-        for match in self.regex.finditer(f.read()):
+        for start, match in matches:
             # The matching prefix (old) and its replacement (new)
             old = match.group(1)
             new = self.prefix_to_prefix[old]
@@ -251,7 +378,7 @@ def _apply_to_file(self, f):
             else:
                 raise CannotShrinkCString(old, new, match.group()[:-1])
 
-            f.seek(match.start())
+            f.seek(start)
             f.write(replacement)
             modified = True
 
@@ -282,6 +409,17 @@ def __init__(self, msg):
         )
         super().__init__(msg)
 
+    def __reduce__(self):
+        # Errors raised in relocation processes are sent to the parent, where they are rebuilt
+        # from their final message, since subclasses take other arguments
+        return _rebuild_binary_text_replace_error, (type(self), self.message)
+
+
+def _rebuild_binary_text_replace_error(cls, message):
+    error = cls.__new__(cls)
+    spack.error.SpackError.__init__(error, message)
+    return error
+
 
 class CannotGrowString(BinaryTextReplaceError):
     def __init__(self, old, new):
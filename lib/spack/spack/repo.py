@@ -5,15 +5,18 @@
 
 import abc
 import collections.abc
+import concurrent.futures
 import contextlib
 import difflib
 import errno
 import functools
+import hashlib
 import importlib
 import importlib.machinery
 import importlib.util
 import inspect
 import itertools
+import marshal
 import os
 import os.path
 import random
@@ -25,7 +28,7 @@
 import traceback
 import types
 import uuid
-from typing import Any, Dict, List, Set, Tuple, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import llnl.path
 import llnl.util.filesystem as fs
@@ -36,6 +39,7 @@
 import spack.caches
 import spack.config
 import spack.error
+import spack.package_metadata
 import spack.patch
 import spack.provider_index
 import spack.spec
@@ -44,6 +48,7 @@
 import spack.util.git
 import spack.util.naming as nm
 import spack.util.path
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 
 #: Package modules are imported as spack.pkg.<repo-namespace>.<pkg-name>
@@ -116,6 +121,50 @@ def __init__(self, fullname, repo, package_name):
         self.fullname = fullname
         super().__init__(self.fullname, self.package_py, prepend=self._package_prepend)
 
+    def bytecode_key(self, source: bytes) -> str:
+        """Key of the bytecode of a package in the misc cache.
+
+        The bytecode depends on the version of Python, and on the path of the package file,
+        which is recorded in the code objects. The version of Spack is part of the key too,
+        so that upgrading Spack never reuses bytecode compiled by another version.
+        """
+        digest = hashlib.sha256()
+        for part in (spack.spack_version.encode(), self.path.encode("utf-8"), source):
+            digest.update(part)
+            digest.update(b"\0")
+        return f"package-bytecode/{sys.implementation.cache_tag}/{digest.hexdigest()}.pyc"
+
+    def get_code(self, fullname):
+        """Return the code object of the package, from the misc cache if it has already been
+        compiled.
+
+        The ``__pycache__`` directories written by Python next to ``package.py`` files are
+        not reusable when the repository is read-only or shared by several users, so
+        bytecode is cached by content instead.
+        """
+        source = self.get_data(self.path)
+        bytecode_path = self.repo._cache.cache_path(self.bytecode_key(source))
+        try:
+            with open(bytecode_path, "rb") as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        code = self.source_to_code(source, self.path)
+        if not sys.dont_write_bytecode:
+            # Write to a temporary file and rename it, so that readers never see partial data
+            tmp_path = f"{bytecode_path}.{os.getpid()}.tmp"
+            try:
+                os.makedirs(os.path.dirname(bytecode_path), exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    marshal.dump(code, f)
+                os.replace(tmp_path, bytecode_path)
+            except OSError:
+                # The cache is not writable, compile again next time
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+        return code
+
 
 class SpackNamespaceLoader:
     def create_module(self, spec):
@@ -351,14 +400,27 @@ class FastPackageChecker(collections.abc.Mapping):
     For each repository a cache is maintained at class level, and shared among
     all instances referring to it. Update of the global cache is done lazily
     during instance initialization.
+
+    Args:
+        packages_path: directory with the packages of the repository
+        cache: if given, the stats are saved in this file cache, and reused as long as the
+            modification time of ``packages_path`` does not change
+        threads: number of threads calling ``stat`` on the package files
     """
 
     #: Global cache, reused by every instance
     _paths_cache: Dict[str, Dict[str, os.stat_result]] = {}
 
-    def __init__(self, packages_path):
+    def __init__(
+        self,
+        packages_path: str,
+        cache: Optional[spack.util.file_cache.FileCache] = None,
+        threads: int = 1,
+    ):
         # The path of the repository managed by this instance
         self.packages_path = packages_path
+        self.cache = cache
+        self.threads = threads
 
         # If the cache we need is not there yet, then build it appropriately
         if packages_path not in self._paths_cache:
@@ -369,33 +431,69 @@ def __init__(self, packages_path):
 
     def invalidate(self):
         """Regenerate cache for this checker."""
-        self._paths_cache[self.packages_path] = self._create_new_cache()
+        self._paths_cache[self.packages_path] = self._create_new_cache(use_snapshot=False)
         self._packages_to_stats = self._paths_cache[self.packages_path]
 
-    def _create_new_cache(self) -> Dict[str, os.stat_result]:
+    @property
+    def snapshot_key(self) -> str:
+        """Key of the snapshot of the stats in the file cache"""
+        digest = hashlib.sha1(self.packages_path.encode("utf-8")).hexdigest()
+        return f"package-stats/{digest}.json"
+
+    def _create_new_cache(self, use_snapshot: bool = True) -> Dict[str, os.stat_result]:
         """Create a new cache for packages in a repo.
 
         The implementation here should try to minimize filesystem
         calls.  At the moment, it is O(number of packages) and makes
         about one stat call per package.  This is reasonably fast, and
         avoids actually importing packages in Spack, which is slow.
+
+        With a file cache, the stats are read from a snapshot taken when the
+        packages directory had the same modification time, which takes a single
+        stat call.
         """
-        # Create a dictionary that will store the mapping between a
-        # package name and its stat info
-        cache: Dict[str, os.stat_result] = {}
+        # Adding or removing a package changes the mtime of the packages directory
+        mtime = os.stat(self.packages_path).st_mtime_ns
+        if self.cache is not None and use_snapshot:
+            cache = self._read_snapshot(mtime)
+            if cache is not None:
+                return cache
+
+        pkg_names = []
         for pkg_name in os.listdir(self.packages_path):
-            # Skip non-directories in the package root.
-            pkg_dir = os.path.join(self.packages_path, pkg_name)
-
             # Warn about invalid names that look like packages.
             if not nm.valid_module_name(pkg_name):
                 if not pkg_name.startswith(".") and pkg_name != "repo.yaml":
+                    pkg_dir = os.path.join(self.packages_path, pkg_name)
                     tty.warn(
                         'Skipping package at {0}. "{1}" is not '
                         "a valid Spack module name.".format(pkg_dir, pkg_name)
                     )
                 continue
+            pkg_names.append(pkg_name)
+
+        # Stat calls are dominated by latency on network filesystems, and release the GIL
+        threads = min(self.threads, len(pkg_names))
+        if threads <= 1:
+            cache = self._stat_packages(pkg_names)
+        else:
+            cache = {}
+            with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+                chunks = [pkg_names[i::threads] for i in range(threads)]
+                for stats in executor.map(self._stat_packages, chunks):
+                    cache.update(stats)
+
+        if self.cache is not None:
+            self._write_snapshot(mtime, cache)
+        return cache
 
+    def _stat_packages(self, pkg_names: List[str]) -> Dict[str, os.stat_result]:
+        """Map the names of packages to the stats of their package files, skipping
+        directories that don't have one."""
+        # Create a dictionary that will store the mapping between a
+        # package name and its stat info
+        cache: Dict[str, os.stat_result] = {}
+        for pkg_name in pkg_names:
             # Construct the file name from the directory
             pkg_file = os.path.join(self.packages_path, pkg_name, package_file_name)
 
@@ -421,6 +519,31 @@ def _create_new_cache(self) -> Dict[str, os.stat_result]:
 
         return cache
 
+    def _read_snapshot(self, mtime: int) -> Optional[Dict[str, os.stat_result]]:
+        """Return the stats saved in the file cache, or None if there are none, or if they
+        were taken when the packages directory had another modification time."""
+        if not self.cache.init_entry(self.snapshot_key):
+            return None
+
+        with self.cache.read_transaction(self.snapshot_key) as f:
+            try:
+                data = sjson.load(f)
+                if data["packages_path"] != self.packages_path or data["mtime"] != mtime:
+                    return None
+                return {name: os.stat_result(values) for name, values in data["packages"].items()}
+            except (ValueError, TypeError, KeyError):
+                return None
+
+    def _write_snapshot(self, mtime: int, cache: Dict[str, os.stat_result]) -> None:
+        # Times are saved as floats, so that st_mtime is preserved
+        packages = {
+            name: list(sinfo[:7]) + [sinfo.st_atime, sinfo.st_mtime, sinfo.st_ctime]
+            for name, sinfo in cache.items()
+        }
+        data = {"packages_path": self.packages_path, "mtime": mtime, "packages": packages}
+        with self.cache.write_transaction(self.snapshot_key) as (old, new):
+            sjson.dump(data, new)
+
     def last_mtime(self):
         return max(sinfo.st_mtime for sinfo in self._packages_to_stats.values())
 
@@ -467,6 +590,15 @@ def needs_update(self, pkg):
         """
         return False
 
+    def outdated(self, since: float) -> List[str]:
+        """Packages whose entries in the index depend on files other than their own package
+        file, which were modified after ``since``. The index must have been read first.
+
+        Args:
+            since: modification time of the index
+        """
+        return []
+
     @abc.abstractmethod
     def read(self, stream):
         """Read this index from a provided file object."""
@@ -542,6 +674,27 @@ def update(self, pkg_fullname):
         self.index.update_package(pkg_fullname)
 
 
+class PackageMetadataIndexer(Indexer):
+    """Lifecycle methods for the index of the metadata declared by packages."""
+
+    def _create(self):
+        return spack.package_metadata.PackageMetadataIndex(repository=self.repository)
+
+    def read(self, stream):
+        self.index = spack.package_metadata.PackageMetadataIndex.from_json(
+            stream, repository=self.repository
+        )
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
+    def outdated(self, since: float) -> List[str]:
+        return self.index.outdated(since)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname.split(".")[-1])
+
+
 class RepoIndex:
     """Container class that manages a set of Indexers for a Repo.
 
@@ -618,21 +771,25 @@ def _build_index(self, name: str, indexer: Indexer):
             with self.cache.read_transaction(cache_filename) as f:
                 indexer.read(f)
 
-        else:
-            # Otherwise update it and rewrite the cache file
-            with self.cache.write_transaction(cache_filename) as (old, new):
-                indexer.read(old) if old else indexer.create()
+            # unless some of its entries depend on other files that changed
+            if not indexer.outdated(index_mtime):
+                return indexer.index
+
+        # Otherwise update it and rewrite the cache file
+        with self.cache.write_transaction(cache_filename) as (old, new):
+            indexer.read(old) if old else indexer.create()
 
-                # Compute which packages needs to be updated **again** in case someone updated them
-                # while we waited for the lock
-                new_index_mtime = self.cache.mtime(cache_filename)
-                if new_index_mtime != index_mtime:
-                    needs_update = self.checker.modified_since(new_index_mtime)
+            # Compute which packages needs to be updated **again** in case someone updated them
+            # while we waited for the lock
+            new_index_mtime = self.cache.mtime(cache_filename)
+            if new_index_mtime != index_mtime:
+                needs_update = self.checker.modified_since(new_index_mtime)
+            needs_update = sorted(set(needs_update) | set(indexer.outdated(new_index_mtime)))
 
-                for pkg_name in needs_update:
-                    indexer.update(f"{self.namespace}.{pkg_name}")
+            for pkg_name in needs_update:
+                indexer.update(f"{self.namespace}.{pkg_name}")
 
-                indexer.write(new)
+            indexer.write(new)
 
         return indexer.index
 
@@ -656,6 +813,7 @@ def __init__(self, *repos, **kwargs):
         self._provider_index = None
         self._patch_index = None
         self._tag_index = None
+        self._metadata_index = None
 
         # Add each repo to this path.
         for repo in repos:
@@ -792,6 +950,16 @@ def patch_index(self):
 
         return self._patch_index
 
+    @property
+    def metadata_index(self):
+        """Merged PackageMetadataIndex from all Repos in the RepoPath."""
+        if self._metadata_index is None:
+            self._metadata_index = spack.package_metadata.PackageMetadataIndex(repository=self)
+            for repo in reversed(self.repos):
+                self._metadata_index.update(repo.metadata_index)
+
+        return self._metadata_index
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -1096,6 +1264,7 @@ def index(self):
             self._repo_index.add_indexer("providers", ProviderIndexer(self))
             self._repo_index.add_indexer("tags", TagIndexer(self))
             self._repo_index.add_indexer("patches", PatchIndexer(self))
+            self._repo_index.add_indexer("metadata", PackageMetadataIndexer(self))
         return self._repo_index
 
     @property
@@ -1113,6 +1282,11 @@ def patch_index(self):
         """Index of patches and packages they're defined on."""
         return self.index["patches"]
 
+    @property
+    def metadata_index(self):
+        """Index of the metadata declared by the directives of each package."""
+        return self.index["metadata"]
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -1149,7 +1323,15 @@ def filename_for_package_name(self, pkg_name):
     @property
     def _pkg_checker(self):
         if self._fast_package_checker is None:
-            self._fast_package_checker = FastPackageChecker(self.packages_path)
+            # The snapshot misses edits of package files, so it is used only for repositories
+            # that the user can't modify
+            use_snapshot = spack.config.get("config:repo_stat_snapshot", False)
+            read_only = not os.access(self.packages_path, os.W_OK)
+            self._fast_package_checker = FastPackageChecker(
+                self.packages_path,
+                cache=self._cache if use_snapshot and read_only else None,
+                threads=spack.config.get("config:repo_stat_threads", 1),
+            )
         return self._fast_package_checker
 
     def all_package_names(self, include_virtuals=False):
@@ -18,6 +18,8 @@
                 "oneOf": [{"type": "boolean"}, {"type": "string", "enum": ["dependencies"]}]
             },
             "enable_node_namespace": {"type": "boolean"},
+            "facts_cache": {"type": "boolean"},
+            "ground_once": {"type": "boolean"},
             "targets": {
                 "type": "object",
                 "properties": {
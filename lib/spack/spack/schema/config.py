@@ -74,6 +74,7 @@
             "verify_ssl": {"type": "boolean"},
             "suppress_gpg_warnings": {"type": "boolean"},
             "install_missing_compilers": {"type": "boolean"},
+            "install_scheduler": {"type": "string", "enum": ["fifo", "critical_path"]},
             "debug": {"type": "boolean"},
             "checksum": {"type": "boolean"},
             "deprecated": {"type": "boolean"},
@@ -81,9 +82,18 @@
             "dirty": {"type": "boolean"},
             "build_language": {"type": "string"},
             "build_jobs": {"type": "integer", "minimum": 1},
+            "relocation_jobs": {"type": "integer", "minimum": 1},
             "ccache": {"type": "boolean"},
             "concretizer": {"type": "string", "enum": ["original", "clingo"]},
             "db_lock_timeout": {"type": "integer", "minimum": 1},
+            "db_format": {"type": "string", "enum": ["json", "sqlite"]},
+            "db_journal_size": {"type": "integer", "minimum": 0},
+            "db_upstream_snapshots": {"type": "boolean"},
+            "deduplicate_files": {"type": "boolean"},
+            "incremental_views": {"type": "boolean"},
+            "view_traversal_threads": {"type": "integer", "minimum": 1},
+            "repo_stat_threads": {"type": "integer", "minimum": 1},
+            "repo_stat_snapshot": {"type": "boolean"},
             "package_lock_timeout": {
                 "anyOf": [{"type": "integer", "minimum": 1}, {"type": "null"}]
             },
@@ -60,6 +60,7 @@
     parse_term,
 )
 from .counter import FullDuplicatesCounter, MinimalDuplicatesCounter, NoDuplicatesCounter
+from .facts_cache import LocalId, PackageFacts, PackageFactsCache
 
 GitOrStandardVersion = Union[spack.version.GitVersion, spack.version.StandardVersion]
 
@@ -733,13 +734,80 @@ def solve(self, setup, specs, reuse=None, output=None, control=None, allow_depre
         self.control = control or default_clingo_control()
 
         timer.start("setup")
-        asp_problem = setup.setup(specs, reuse=reuse, allow_deprecated=allow_deprecated)
+        asp_problem = setup.setup(
+            specs, reuse=reuse, allow_deprecated=allow_deprecated, timer=timer
+        )
         if output.out is not None:
             output.out.write(asp_problem)
         if output.setup_only:
             return Result(specs), None, None
         timer.stop("setup")
 
+        self._load_and_ground(setup, asp_problem, timer)
+
+        result = self._solve_grounded(setup, specs, setup.assumptions, timer)
+
+        if output.timers:
+            timer.write_tty()
+            if setup.facts_cache is not None:
+                print(
+                    f"    package facts: {len(setup.facts_cache.hits)} cached, "
+                    f"{len(setup.facts_cache.misses)} regenerated"
+                )
+            print()
+
+        if output.stats:
+            print("Statistics:")
+            pprint.pprint(self.control.statistics)
+
+        if result.unsolved_specs and setup.concretize_everything:
+            unsolved_str = Result.format_unsolved(result.unsolved_specs)
+            raise InternalConcretizerError(
+                "Internal Spack error: the solver completed but produced specs"
+                f" that do not satisfy the request.\n\t{unsolved_str}"
+            )
+
+        return result, timer, self.control.statistics
+
+    def solve_separately(self, setup, specs, reuse=None, allow_deprecated=False):
+        """Set up and ground a single problem for all the ``specs``, then solve it once for each
+        of them, with only its literal switched on.
+
+        The literal of each input spec is declared as an external atom, which is switched on
+        only for the solve of that spec. Specs that cannot be solved are reported as
+        unsatisfiable results, without error messages.
+
+        Arguments:
+            setup (SpackSolverSetup): An object to set up the ASP problem.
+            specs (list): List of ``Spec`` objects to solve for.
+            reuse (None or list): list of concrete specs that can be reused
+            allow_deprecated: if True, allow deprecated versions in the solve
+
+        Return:
+            A generator yielding one ``Result`` per input spec, in the same order as the input
+        """
+        timer = spack.util.timer.NULL_TIMER
+        self.control = default_clingo_control()
+        setup.literals_as_externals = True
+        asp_problem = setup.setup(specs, reuse=reuse, allow_deprecated=allow_deprecated)
+        self._load_and_ground(setup, asp_problem, timer)
+
+        for spec, literal in zip(specs, setup.literal_externals):
+            self.control.assign_external(literal, True)
+            try:
+                result = self._solve_grounded(setup, [spec], setup.assumptions, timer)
+            except spack.error.SpackError as e:
+                tty.debug(f"[SOLVE SEPARATELY] cannot solve {spec}: {e}")
+                result = Result([spec])
+                result.satisfiable = False
+            finally:
+                self.control.assign_external(literal, False)
+            yield result
+
+    def _load_and_ground(self, setup, asp_problem, timer):
+        """Add the problem instance and the logic program to the control object, and ground
+        them.
+        """
         timer.start("load")
         # Add the problem instance
         self.control.add("base", [], asp_problem)
@@ -761,6 +829,10 @@ def solve(self, setup, specs, reuse=None, output=None, control=None, allow_depre
         self.control.ground([("base", [])])
         timer.stop("ground")
 
+    def _solve_grounded(self, setup, specs, assumptions, timer):
+        """Solve the grounded program in the control object, and construct the result for
+        the input ``specs``.
+        """
         # With a grounded program, we can run the solve.
         result = Result(specs)
         models = []  # stable models if things go well
@@ -769,11 +841,7 @@ def solve(self, setup, specs, reuse=None, output=None, control=None, allow_depre
         def on_model(model):
             models.append((model.cost, model.symbols(shown=True, terms=True)))
 
-        solve_kwargs = {
-            "assumptions": setup.assumptions,
-            "on_model": on_model,
-            "on_core": cores.append,
-        }
+        solve_kwargs = {"assumptions": assumptions, "on_model": on_model, "on_core": cores.append}
 
         if clingo_cffi():
             solve_kwargs["on_unsat"] = cores.append
@@ -815,22 +883,7 @@ def on_model(model):
             result.control = self.control
             result.cores.extend(cores)
 
-        if output.timers:
-            timer.write_tty()
-            print()
-
-        if output.stats:
-            print("Statistics:")
-            pprint.pprint(self.control.statistics)
-
-        if result.unsolved_specs and setup.concretize_everything:
-            unsolved_str = Result.format_unsolved(result.unsolved_specs)
-            raise InternalConcretizerError(
-                "Internal Spack error: the solver completed but produced specs"
-                f" that do not satisfy the request.\n\t{unsolved_str}"
-            )
-
-        return result, timer, self.control.statistics
+        return result
 
 
 class ConcreteSpecsByHash(collections.abc.Mapping):
@@ -936,12 +989,24 @@ def __init__(self, tests: bool = False):
         # Caches to optimize the setup phase of the solver
         self.target_specs_cache = None
 
+        #: Persistent cache for facts derived from package directives, set in setup()
+        self.facts_cache: Optional[PackageFactsCache] = None
+        #: Names of packages, virtuals and compilers in the conditions of the facts being
+        #: recorded for the facts cache, or None when not recording
+        self._referenced_names: Optional[Set[str]] = None
+        self.timer: spack.util.timer.BaseTimer = spack.util.timer.NULL_TIMER
+
         # whether to add installed/binary hashes to the solve
         self.tests = tests
 
         # If False allows for input specs that are not solved
         self.concretize_everything = True
 
+        # If True, literals are declared as external atoms, so that they can be switched on
+        # and off between solves of the same grounded program
+        self.literals_as_externals = False
+        self.literal_externals: List["clingo.Symbol"] = []  # type: ignore[name-defined]
+
         # Set during the call to setup
         self.pkgs: Set[str] = set()
         self.explicitly_required_namespaces: Dict[str, str] = {}
@@ -1087,17 +1152,8 @@ def pkg_rules(self, pkg, tests):
         self.pkg_version_rules(pkg)
         self.gen.newline()
 
-        # variants
-        self.variant_rules(pkg)
-
-        # conflicts
-        self.conflict_rules(pkg)
-
-        # virtuals
-        self.package_provider_rules(pkg)
-
-        # dependencies
-        self.package_dependencies_rules(pkg)
+        # variants, conflicts, virtuals and dependencies
+        self.package_directives_rules(pkg)
 
         # virtual preferences
         self.virtual_preferences(
@@ -1111,6 +1167,98 @@ def pkg_rules(self, pkg, tests):
         self.trigger_rules()
         self.effect_rules()
 
+    def package_directives_rules(self, pkg):
+        """Emit the facts derived from the directives of a package, i.e. variants, conflicts,
+        provided virtuals and dependencies.
+
+        These facts depend only on the package source and on a few properties of the current
+        solve, so they are taken from the persistent facts cache when possible.
+        """
+        if self.facts_cache is None:
+            self._package_directives_rules(pkg)
+            return
+
+        tests = bool(self.tests) and (isinstance(self.tests, bool) or pkg.name in self.tests)
+        virtuals = [x for x in pkg.provided_virtual_names() if x in self.possible_virtuals]
+        key = self.facts_cache.key(pkg, tests=tests, virtuals=virtuals)
+
+        with self.timer.measure("cached"):
+            facts = self.facts_cache.get(key)
+
+        if facts is None:
+            with self.timer.measure("regenerated"):
+                facts = self._record_package_facts(pkg)
+                self.facts_cache.put(key, facts)
+            self.facts_cache.misses.append(pkg.name)
+        else:
+            self.facts_cache.hits.append(pkg.name)
+
+        ids = [next(self._id_counter) for _ in range(facts.ids)]
+        self.gen.append(facts.facts_with_ids(ids))
+        versions, targets, compilers, variant_values = facts.setup_state()
+        self.version_constraints.update(versions)
+        self.target_constraints.update(targets)
+        self.compiler_version_constraints.update(compilers)
+        self.variant_values_from_specs.update(variant_values)
+
+    def _package_directives_rules(self, pkg):
+        self.variant_rules(pkg)
+        self.conflict_rules(pkg)
+        self.package_provider_rules(pkg)
+        self.package_dependencies_rules(pkg)
+        self.trigger_rules()
+        self.effect_rules()
+
+    def _record_package_facts(self, pkg) -> PackageFacts:
+        """Generate the facts from the directives of a package in isolation from the rest of
+        the solve, so that they can be stored in the facts cache.
+        """
+        saved_state = (
+            self.gen,
+            self._id_counter,
+            self._trigger_cache,
+            self._effect_cache,
+            self.version_constraints,
+            self.target_constraints,
+            self.compiler_version_constraints,
+            self.variant_values_from_specs,
+            self._referenced_names,
+        )
+        local_counter = itertools.count()
+        self.gen = ProblemInstanceBuilder()
+        self._id_counter = map(LocalId, local_counter)
+        self._trigger_cache = collections.defaultdict(dict)
+        self._effect_cache = collections.defaultdict(dict)
+        self.version_constraints = set()
+        self.target_constraints = set()
+        self.compiler_version_constraints = set()
+        self.variant_values_from_specs = set()
+        self._referenced_names = set()
+        try:
+            self._package_directives_rules(pkg)
+            self._referenced_names.discard(pkg.name)
+            return PackageFacts.from_setup_state(
+                facts=self.gen.value(),
+                ids=next(local_counter),
+                version_constraints=self.version_constraints,
+                target_constraints=self.target_constraints,
+                compiler_version_constraints=self.compiler_version_constraints,
+                variant_values=self.variant_values_from_specs,
+                dependencies=self.facts_cache.fingerprints(self._referenced_names),
+            )
+        finally:
+            (
+                self.gen,
+                self._id_counter,
+                self._trigger_cache,
+                self._effect_cache,
+                self.version_constraints,
+                self.target_constraints,
+                self.compiler_version_constraints,
+                self.variant_values_from_specs,
+                self._referenced_names,
+            ) = saved_state
+
     def trigger_rules(self):
         """Flushes all the trigger rules collected so far, and clears the cache."""
         self.gen.h2("Trigger conditions")
@@ -1245,6 +1393,15 @@ def _get_condition_id(
             The id of the cached trigger or effect.
 
         """
+        # Facts depend on whether the names in a condition are virtual, on the variants of the
+        # packages they refer to, etc., which must be checked before cached facts are reused
+        if self._referenced_names is not None:
+            for node in named_cond.traverse():
+                if node.name:
+                    self._referenced_names.add(node.name)
+                if node.compiler:
+                    self._referenced_names.add(node.compiler.name)
+
         pkg_cache = cache[named_cond.name]
 
         named_cond_key = (str(named_cond), transform)
@@ -2274,6 +2431,7 @@ def setup(
         *,
         reuse: Optional[List[spack.spec.Spec]] = None,
         allow_deprecated: bool = False,
+        timer: spack.util.timer.BaseTimer = spack.util.timer.NULL_TIMER,
     ) -> str:
         """Generate an ASP program with relevant constraints for specs.
 
@@ -2285,9 +2443,15 @@ def setup(
             specs: list of Specs to solve
             reuse: list of concrete specs that can be reused
             allow_deprecated: if True adds deprecated versions into the solve
+            timer: timer to record how long it takes to retrieve or regenerate package facts
         """
         check_packages_exist(specs)
 
+        self.timer = timer
+        self.facts_cache = None
+        if spack.config.get("concretizer:facts_cache", False):
+            self.facts_cache = PackageFactsCache()
+
         node_counter = _create_counter(specs, tests=self.tests)
         self.possible_virtuals = node_counter.possible_virtuals()
         self.pkgs = node_counter.possible_dependencies()
@@ -2482,7 +2646,11 @@ def literal_specs(self, specs):
             cache[imposed_spec_key] = (effect_id, requirements)
             self.gen.fact(fn.pkg_fact(spec.name, fn.condition_effect(condition_id, effect_id)))
 
-            if self.concretize_everything:
+            if self.literals_as_externals:
+                literal = fn.solve_literal(trigger_id).symbol()
+                self.literal_externals.append(literal)
+                self.gen.append(f"#external {literal}.\n")
+            elif self.concretize_everything:
                 self.gen.fact(fn.solve_literal(trigger_id))
 
         self.effect_rules()
@@ -3440,6 +3608,32 @@ def solve(
         )
         return result
 
+    def solve_separately(self, specs, tests=False, allow_deprecated=False):
+        """Solve each of the input specs independently of the others, grounding a single
+        problem for all of them.
+
+        Each spec is solved without the constraints of the others, but all of them share a
+        single grounded problem: the possible dependencies, the versions declared in the input
+        specs and the reusable specs are the union of those of every spec. Results can thus
+        differ from solving each spec on its own, e.g. when a version declared in another
+        input spec becomes a candidate, or when optimization weights depend on the set of
+        possible packages.
+
+        The function is a generator that yields one result per input spec, in order.
+
+        Arguments:
+            specs (list): list of Specs to solve.
+            tests (bool): add test dependencies to the solve
+            allow_deprecated (bool): allow deprecated version in the solve
+        """
+        specs = [s.lookup_hash() for s in specs]
+        reusable_specs = self._check_input_and_extract_concrete_specs(specs)
+        reusable_specs.extend(self._reusable_specs(specs))
+        setup = SpackSolverSetup(tests=tests)
+        yield from self.driver.solve_separately(
+            setup, specs, reuse=reusable_specs, allow_deprecated=allow_deprecated
+        )
+
     def solve_in_rounds(
         self, specs, out=None, timers=False, stats=False, tests=False, allow_deprecated=False
     ):
@@ -0,0 +1,257 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Persistent cache of the ASP facts emitted for each package during solver setup.
+
+The facts that ``SpackSolverSetup`` derives from the directives of a package (variants,
+conflicts, provided virtuals and dependencies) depend on the source files defining the package
+class, on a small amount of state from the current solve, and on the other packages, virtuals
+and compilers named in the directives. They are stored in Spack's misc cache, in files
+addressed by a hash of the former inputs, together with a fingerprint of each of the names
+they reference, so that they can be reused across solves until any of those changes.
+
+Condition ids are global to a solve, so facts are recorded with local placeholders
+(see :class:`LocalId`) that are renumbered when the facts are emitted.
+"""
+import hashlib
+import inspect
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import llnl.util.tty as tty
+
+import spack
+import spack.caches
+import spack.repo
+import spack.spec
+import spack.target
+import spack.util.file_cache
+import spack.version as vn
+
+from .core import AspFunction
+
+#: Version of the format of cache entries. Bump it when the layout of entries changes.
+FORMAT_VERSION = 2
+
+#: Prefix for the keys of cache entries in the misc cache
+CACHE_PREFIX = "solver-facts"
+
+#: Files whose content determines how facts are generated
+_GENERATOR_FILES = tuple(
+    os.path.join(os.path.dirname(__file__), x) for x in ("asp.py", "facts_cache.py")
+)
+
+_LOCAL_ID_RE = re.compile(r"\blocal_id\((\d+)\)")
+
+
+class LocalId(AspFunction):
+    """Placeholder for a condition id, used while recording the facts of a single package."""
+
+    __slots__ = ()
+
+    def __init__(self, idx: int) -> None:
+        super().__init__("local_id", (idx,))
+
+
+class PackageFacts(NamedTuple):
+    """Facts recorded for a single package, together with the side effects of generating them
+    on the state of the solver setup.
+    """
+
+    #: Facts in ASP syntax, with condition ids replaced by ``local_id(N)`` placeholders
+    facts: str
+    #: Number of condition ids to be allocated when emitting the facts
+    ids: int
+    #: (package, version constraint) pairs used in the facts
+    version_constraints: List[Tuple[str, str]]
+    #: Target constraints used in the facts
+    target_constraints: List[str]
+    #: Compiler constraints used in the facts
+    compiler_version_constraints: List[str]
+    #: (package, variant, value) triplets used in the facts
+    variant_values: List[Tuple[str, str, Any]]
+    #: Fingerprints of the packages, virtuals and compilers named in the directives, when the
+    #: facts were recorded
+    dependencies: Dict[str, str] = {}
+
+    def facts_with_ids(self, ids: List[Any]) -> str:
+        """Return the facts, with placeholders replaced by the condition ids passed as input"""
+        return _LOCAL_ID_RE.sub(lambda m: str(ids[int(m.group(1))]), self.facts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"format": FORMAT_VERSION, **self._asdict()}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> "PackageFacts":
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported format for cached facts: {data.get('format')}")
+        return PackageFacts(
+            facts=data["facts"],
+            ids=data["ids"],
+            version_constraints=[tuple(x) for x in data["version_constraints"]],
+            target_constraints=data["target_constraints"],
+            compiler_version_constraints=data["compiler_version_constraints"],
+            variant_values=[tuple(x) for x in data["variant_values"]],
+            dependencies=data["dependencies"],
+        )
+
+    @staticmethod
+    def from_setup_state(
+        *,
+        facts: str,
+        ids: int,
+        version_constraints: Set,
+        target_constraints: Set,
+        compiler_version_constraints: Set,
+        variant_values: Set,
+        dependencies: Optional[Dict[str, str]] = None,
+    ) -> "PackageFacts":
+        """Serialize the state accumulated by the solver setup while recording facts"""
+
+        def _value(x):
+            return x if isinstance(x, (str, bool, int)) else str(x)
+
+        return PackageFacts(
+            facts=facts,
+            ids=ids,
+            version_constraints=sorted((name, str(v)) for name, v in version_constraints),
+            target_constraints=sorted(str(x) for x in target_constraints),
+            compiler_version_constraints=sorted(str(x) for x in compiler_version_constraints),
+            variant_values=sorted(
+                ((pkg, name, _value(value)) for pkg, name, value in variant_values), key=str
+            ),
+            dependencies=dict(sorted((dependencies or {}).items())),
+        )
+
+    def setup_state(self) -> Tuple[Set, Set, Set, Set]:
+        """Return the side effects on the solver setup, in the same form they had when the
+        facts were recorded.
+        """
+        return (
+            {(name, vn.VersionList(v)) for name, v in self.version_constraints},
+            {spack.target.Target(x) for x in self.target_constraints},
+            {spack.spec.CompilerSpec(x) for x in self.compiler_version_constraints},
+            set(self.variant_values),
+        )
+
+
+class PackageFactsCache:
+    """Content-addressed storage for :class:`PackageFacts` in the misc cache.
+
+    Args:
+        cache: file cache where entries are stored. Defaults to the misc cache.
+    """
+
+    def __init__(self, cache: Optional[spack.util.file_cache.FileCache] = None) -> None:
+        self._cache = cache or spack.caches.MISC_CACHE
+        self._file_hashes: Dict[str, str] = {}
+        self._fingerprints: Dict[str, str] = {}
+        #: Names of the packages whose facts were found in the cache
+        self.hits: List[str] = []
+        #: Names of the packages whose facts were regenerated
+        self.misses: List[str] = []
+
+    def _file_hash(self, path: str) -> str:
+        result = self._file_hashes.get(path)
+        if result is None:
+            with open(path, "rb") as f:
+                result = hashlib.sha256(f.read()).hexdigest()
+            self._file_hashes[path] = result
+        return result
+
+    def source_files(self, pkg_cls) -> List[str]:
+        """Return the files defining a package class, its bases and the other package
+        modules it imports (e.g. to depend on ``Boost.with_default_variants``).
+        """
+        modules = [sys.modules.get(cls.__module__) for cls in pkg_cls.__mro__]
+        pkg_module = sys.modules.get(pkg_cls.__module__)
+        if pkg_module is not None:
+            for value in vars(pkg_module).values():
+                name = getattr(value, "__module__", None) or getattr(value, "__name__", "")
+                if isinstance(name, str) and name.startswith(spack.repo.ROOT_PYTHON_NAMESPACE):
+                    modules.append(sys.modules.get(name))
+
+        result = []
+        for module in modules:
+            if module is None or getattr(module, "__file__", None) is None:
+                continue
+            path = inspect.getfile(module)
+            if path not in result:
+                result.append(path)
+        return result
+
+    def fingerprint(self, name: str) -> str:
+        """Return a fingerprint of a name referenced by the directives of another package, which
+        changes when it becomes, or stops being, a virtual, or when the sources of the package
+        with that name change, e.g. its variants and versions.
+        """
+        result = self._fingerprints.get(name)
+        if result is None:
+            if spack.repo.PATH.is_virtual(name):
+                result = "virtual"
+            elif not spack.repo.PATH.exists(name):
+                result = "missing"
+            else:
+                pkg_cls = spack.repo.PATH.get_pkg_class(name)
+                data = [pkg_cls.namespace] + [
+                    self._file_hash(x) for x in self.source_files(pkg_cls)
+                ]
+                result = hashlib.sha256(json.dumps(data).encode()).hexdigest()
+            self._fingerprints[name] = result
+        return result
+
+    def fingerprints(self, names: Iterable[str]) -> Dict[str, str]:
+        """Return the fingerprints of the names referenced by the directives of a package"""
+        return {name: self.fingerprint(name) for name in names}
+
+    def key(self, pkg_cls, *, tests: bool, virtuals: Iterable[str]) -> str:
+        """Return the key of the cache entry for a package.
+
+        Args:
+            pkg_cls: package class
+            tests: whether test dependencies are considered for this package
+            virtuals: virtuals provided by this package that are possible in the current solve
+        """
+        data = {
+            "format": FORMAT_VERSION,
+            "spack": spack.spack_version,
+            "generator": [self._file_hash(x) for x in _GENERATOR_FILES],
+            "name": pkg_cls.name,
+            "namespace": pkg_cls.namespace,
+            "sources": [self._file_hash(x) for x in self.source_files(pkg_cls)],
+            "tests": tests,
+            "virtuals": sorted(virtuals),
+        }
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        return os.path.join(CACHE_PREFIX, f"{pkg_cls.name}-{digest}.json")
+
+    def get(self, key: str) -> Optional[PackageFacts]:
+        """Return the facts stored under a key, or None if there is no valid entry, or if any
+        of the names referenced by the facts changed since they were recorded"""
+        try:
+            if not self._cache.init_entry(key):
+                return None
+            with self._cache.read_transaction(key) as f:
+                facts = PackageFacts.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[SOLVER FACTS CACHE] cannot read '{key}': {e}")
+            return None
+
+        for name, fingerprint in facts.dependencies.items():
+            if self.fingerprint(name) != fingerprint:
+                tty.debug(f"[SOLVER FACTS CACHE] '{key}' is stale, since '{name}' changed")
+                return None
+        return facts
+
+    def put(self, key: str, facts: PackageFacts) -> None:
+        """Store facts under a key. Failures to write are not fatal."""
+        try:
+            self._cache.init_entry(key)
+            with self._cache.write_transaction(key) as (_, new):
+                json.dump(facts.to_dict(), new)
+        except (OSError, spack.util.file_cache.CacheError) as e:
+            tty.debug(f"[SOLVER FACTS CACHE] cannot write '{key}': {e}")
@@ -17,6 +17,7 @@
 debugging easier.
 
 """
+
 import contextlib
 import os
 import pathlib
@@ -27,12 +28,15 @@
 import llnl.util.lang
 from llnl.util import tty
 
+import spack.caches
 import spack.config
 import spack.database
 import spack.directory_layout
 import spack.error
 import spack.paths
 import spack.spec
+import spack.util.blob_pool
+import spack.util.file_cache
 import spack.util.path
 
 #: default installation root, relative to the Spack install path
@@ -156,6 +160,10 @@ class Store:
             truncated to this length
         upstreams: optional list of upstream databases
         lock_cfg: lock configuration for the database
+        db_format: format of the on-disk index of the database
+        db_journal_size: maximum number of records in the journal of the database
+        deduplicate_files: whether identical files installed from build caches are shared
+            through a pool of files in the store
     """
 
     def __init__(
@@ -166,6 +174,9 @@ def __init__(
         hash_length: Optional[int] = None,
         upstreams: Optional[List[spack.database.Database]] = None,
         lock_cfg: spack.database.LockConfiguration = spack.database.NO_LOCK,
+        db_format: str = "json",
+        db_journal_size: int = 0,
+        deduplicate_files: bool = False,
     ) -> None:
         self.root = root
         self.unpadded_root = unpadded_root or root
@@ -173,7 +184,16 @@ def __init__(
         self.hash_length = hash_length
         self.upstreams = upstreams
         self.lock_cfg = lock_cfg
-        self.db = spack.database.Database(root, upstream_dbs=upstreams, lock_cfg=lock_cfg)
+        self.db_format = db_format
+        self.db_journal_size = db_journal_size
+        self.deduplicate_files = deduplicate_files
+        self.db = spack.database.Database(
+            root,
+            upstream_dbs=upstreams,
+            lock_cfg=lock_cfg,
+            db_format=db_format,
+            journal_size=db_journal_size,
+        )
 
         timeout_format_str = (
             f"{str(lock_cfg.package_timeout)}s" if lock_cfg.package_timeout else "No timeout"
@@ -191,6 +211,13 @@ def __init__(
             root, projections=projections, hash_length=hash_length
         )
 
+        #: Pool of the files shared by different prefixes, if files are deduplicated
+        self.blobs: Optional[spack.util.blob_pool.BlobPool] = None
+        if deduplicate_files:
+            self.blobs = spack.util.blob_pool.BlobPool(
+                os.path.join(self.db.database_directory, "blobs")
+            )
+
     def reindex(self) -> None:
         """Convenience function to reindex the store DB with its own layout."""
         return self.db.reindex(self.layout)
@@ -203,6 +230,9 @@ def __reduce__(self):
             self.hash_length,
             self.upstreams,
             self.lock_cfg,
+            self.db_format,
+            self.db_journal_size,
+            self.deduplicate_files,
         )
 
 
@@ -221,7 +251,12 @@ def create(configuration: ConfigurationType) -> Store:
         install_properties["install_tree"]
         for install_properties in configuration.get("upstreams", {}).values()
     ]
-    upstreams = _construct_upstream_dbs_from_install_roots(install_roots)
+    snapshot_cache = None
+    if configuration.get("config:db_upstream_snapshots", True):
+        snapshot_cache = spack.caches.MISC_CACHE
+    upstreams = _construct_upstream_dbs_from_install_roots(
+        install_roots, snapshot_cache=snapshot_cache
+    )
 
     return Store(
         root=root,
@@ -230,6 +265,9 @@ def create(configuration: ConfigurationType) -> Store:
         hash_length=hash_length,
         upstreams=upstreams,
         lock_cfg=spack.database.lock_configuration(configuration),
+        db_format=configuration.get("config:db_format", "json"),
+        db_journal_size=configuration.get("config:db_journal_size", 0),
+        deduplicate_files=configuration.get("config:deduplicate_files", False),
     )
 
 
@@ -261,7 +299,9 @@ def restore(token):
 
 
 def _construct_upstream_dbs_from_install_roots(
-    install_roots: List[str], _test: bool = False
+    install_roots: List[str],
+    _test: bool = False,
+    snapshot_cache: Optional[spack.util.file_cache.FileCache] = None,
 ) -> List[spack.database.Database]:
     accumulated_upstream_dbs: List[spack.database.Database] = []
     for install_root in reversed(install_roots):
@@ -270,6 +310,7 @@ def _construct_upstream_dbs_from_install_roots(
             spack.util.path.canonicalize_path(install_root),
             is_upstream=True,
             upstream_dbs=upstream_dbs,
+            snapshot_cache=snapshot_cache,
         )
         next_db._fail_when_missing_deps = _test
         next_db._read()
@@ -28,6 +28,9 @@
 import spack.hooks.sbang as sbang
 import spack.main
 import spack.mirror
+import spack.paths
+import spack.relocate
+import spack.relocate_text
 import spack.repo
 import spack.store
 import spack.util.gpg
@@ -921,9 +924,9 @@ def test_tarball_doesnt_include_buildinfo_twice(tmp_path: Path):
             "metadata": "new"
         }
         assert tar.getnames() == [
+            f"{expected_prefix}/.spack/binary_distribution",
             *_all_parents(expected_prefix),
             f"{expected_prefix}/.spack",
-            f"{expected_prefix}/.spack/binary_distribution",
         ]
 
 
@@ -1052,6 +1055,148 @@ def test_tarball_common_prefix(dummy_prefix, tmpdir):
         )
 
 
+@pytest.mark.skipif(sys.platform != "linux", reason="ELF binaries are relocated on Linux")
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_relocate_while_extracting(jobs, tmp_path, install_mockery, mutable_config, monkeypatch):
+    """Test that text files, hardlinks and symlinks are relocated when a binary package is
+    extracted from its tarball, also by a pool of processes."""
+    monkeypatch.setattr(spack.relocate, "MIN_FILES_PER_RELOCATION_TASK", 1)
+    monkeypatch.setattr(spack.relocate, "MIN_BYTES_PER_RELOCATION_JOB", 1)
+    spack.config.set("config:relocation_jobs", jobs)
+    spec = Spec("trivial-install-test-package").concretized()
+    old_root = tmp_path / "old-store"
+    # Binaries can only be relocated to a shorter prefix
+    old_prefix = old_root / ("prefix" + "_" * 200)
+    (old_prefix / "bin").mkdir(parents=True)
+    (old_prefix / "share").mkdir()
+    (old_prefix / "lib").mkdir()
+    (old_prefix / ".spack").mkdir()
+    (old_prefix / "bin" / "script").write_text(f"#!/bin/sh\necho {old_prefix}/share\n")
+    (old_prefix / "bin" / "script").chmod(0o755)
+    (old_prefix / "share" / "data").write_text(f"{old_prefix}/share")
+    os.link(old_prefix / "share" / "data", old_prefix / "share" / "data2")
+    os.symlink(old_prefix / "bin" / "script", old_prefix / "share" / "link")
+    (old_prefix / "lib" / "libfoo.so").write_bytes(
+        b"\0%s/lib\0\0%s/share/foo\0" % (bytes(old_prefix), bytes(old_prefix))
+    )
+
+    buildinfo = {
+        "buildpath": str(old_root),
+        "relative_prefix": old_prefix.name,
+        "spackprefix": spack.paths.prefix,
+        "relocate_textfiles": ["bin/script", "share/data2"],
+        "relocate_binaries": ["lib/libfoo.so"],
+        "relocate_links": ["share/link"],
+        "hash_to_prefix": {spec.dag_hash(): str(old_prefix)},
+        "binary_prefix_offsets": bindist.binary_prefix_offsets(
+            str(old_prefix), ["lib/libfoo.so"], [str(old_prefix), str(old_root)]
+        ),
+    }
+    offset = len(b"\0%s/lib\0\0" % bytes(old_prefix))
+    assert buildinfo["binary_prefix_offsets"]["lib/libfoo.so"] == [1, offset]
+    tarball = str(tmp_path / "prefix.tar.gz")
+    bindist._do_create_tarball(tarball, binaries_dir=str(old_prefix), buildinfo=buildinfo)
+
+    with tarfile.open(tarball) as tar:
+        prefix = bindist._ensure_common_prefix(tar)
+        relocator = bindist.RelocateWhileExtracting.from_tarball(spec, tar, prefix)
+        assert relocator is not None
+        members = relocator.members(tar, bindist._tar_strip_component(tar, prefix))
+        tar.extractall(path=spec.prefix, members=members)
+    relocator.finish()
+
+    new_prefix = Path(spec.prefix)
+    assert (new_prefix / "bin" / "script").read_text() == f"#!/bin/sh\necho {new_prefix}/share\n"
+    assert os.access(new_prefix / "bin" / "script", os.X_OK)
+    assert (new_prefix / "share" / "data").read_text() == f"{new_prefix}/share"
+    assert os.path.samefile(new_prefix / "share" / "data", new_prefix / "share" / "data2")
+    assert os.readlink(new_prefix / "share" / "link") == str(new_prefix / "bin" / "script")
+    binary = (new_prefix / "lib" / "libfoo.so").read_bytes()
+    assert bytes(old_prefix) not in binary
+    assert b"%s/lib\0" % bytes(new_prefix) in binary
+    assert b"%s/share/foo\0" % bytes(new_prefix) in binary
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ELF binaries are relocated on Linux")
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_relocate_while_extracting_error(
+    jobs, tmp_path, install_mockery, mutable_config, monkeypatch
+):
+    """Test that binaries that cannot be relocated raise the same error, whether they are
+    relocated by a pool of processes or not."""
+    monkeypatch.setattr(spack.relocate, "MIN_FILES_PER_RELOCATION_TASK", 1)
+    monkeypatch.setattr(spack.relocate, "MIN_BYTES_PER_RELOCATION_JOB", 1)
+    spack.config.set("config:relocation_jobs", jobs)
+    spec = Spec("trivial-install-test-package").concretized()
+    old_prefix = tmp_path / "o"
+    (old_prefix / "lib").mkdir(parents=True)
+    (old_prefix / ".spack").mkdir()
+    for i in range(4):
+        (old_prefix / "lib" / f"lib{i}.so").write_bytes(b"\0%s/share/foo\0" % bytes(old_prefix))
+
+    buildinfo = {
+        "buildpath": str(tmp_path),
+        "relative_prefix": old_prefix.name,
+        "spackprefix": spack.paths.prefix,
+        "relocate_textfiles": [],
+        "relocate_binaries": [f"lib/lib{i}.so" for i in range(4)],
+        "relocate_links": [],
+        "hash_to_prefix": {spec.dag_hash(): str(old_prefix)},
+    }
+    tarball = str(tmp_path / "prefix.tar.gz")
+    bindist._do_create_tarball(tarball, binaries_dir=str(old_prefix), buildinfo=buildinfo)
+
+    with tarfile.open(tarball) as tar:
+        prefix = bindist._ensure_common_prefix(tar)
+        relocator = bindist.RelocateWhileExtracting.from_tarball(spec, tar, prefix)
+        members = relocator.members(tar, bindist._tar_strip_component(tar, prefix))
+        with pytest.raises(spack.relocate_text.CannotGrowString) as e:
+            tar.extractall(path=spec.prefix, members=members)
+    assert str(e.value).count("To fix this") == 1
+
+
+@pytest.mark.requires_executables("patchelf", "gcc")
+@pytest.mark.skipif(sys.platform != "linux", reason="ELF binaries are relocated on Linux")
+def test_relocate_while_extracting_to_longer_prefix(
+    binary_with_rpaths, tmp_path, install_mockery, mutable_config
+):
+    """Test that the RPATH of an ELF binary is relocated to a longer prefix with patchelf,
+    before the other prefixes in the binary are relocated."""
+    spec = Spec("trivial-install-test-package").concretized()
+    old_root = tmp_path / "old-store"
+    old_prefix = old_root / "x"
+    (old_prefix / "bin").mkdir(parents=True)
+    (old_prefix / ".spack").mkdir()
+    executable = binary_with_rpaths(rpaths=[f"{old_prefix}/lib"])
+    os.rename(str(executable), old_prefix / "bin" / "main.x")
+    assert len(str(spec.prefix)) > len(str(old_prefix))
+
+    buildinfo = {
+        "buildpath": str(old_root),
+        "relative_prefix": old_prefix.name,
+        "spackprefix": spack.paths.prefix,
+        "relocate_textfiles": [],
+        "relocate_binaries": ["bin/main.x"],
+        "relocate_links": [],
+        "hash_to_prefix": {spec.dag_hash(): str(old_prefix)},
+    }
+    tarball = str(tmp_path / "prefix.tar.gz")
+    bindist._do_create_tarball(tarball, binaries_dir=str(old_prefix), buildinfo=buildinfo)
+
+    with tarfile.open(tarball) as tar:
+        prefix = bindist._ensure_common_prefix(tar)
+        relocator = bindist.RelocateWhileExtracting.from_tarball(spec, tar, prefix)
+        members = relocator.members(tar, bindist._tar_strip_component(tar, prefix))
+        tar.extractall(path=spec.prefix, members=members)
+    assert len(relocator.elf_updates) == 1
+    relocator.finish()
+
+    new_binary = os.path.join(spec.prefix, "bin", "main.x")
+    assert spack.relocate._elf_rpaths_for(new_binary) == [f"{spec.prefix}/lib"]
+    with open(new_binary, "rb") as f:
+        assert bytes(old_prefix) not in f.read()
+
+
 def test_tarfile_missing_binary_distribution_file(tmpdir):
     """A tarfile that does not contain a .spack/binary_distribution file cannot be
     used to install."""
@@ -554,6 +554,19 @@ def test_build_jobs_defaults():
     )
 
 
+@pytest.mark.parametrize("command_line", [True, False])
+def test_set_build_jobs_overrides_command_line(command_line, monkeypatch):
+    """Tests the parallel jobs of builds that run concurrently with other builds"""
+    scopes = [spack.config.InternalConfigScope("defaults", {"config": {"build_jobs": 16}})]
+    if command_line:
+        data = {"config": {"build_jobs": 32}}
+        scopes.append(spack.config.InternalConfigScope("command_line", data))
+    monkeypatch.setattr(spack.config, "CONFIG", spack.config.Configuration(*scopes))
+
+    spack.build_environment._set_build_jobs(4)
+    assert determine_number_of_jobs(parallel=True, max_cpus=64) == 4
+
+
 def test_dirty_disable_module_unload(config, mock_packages, working_env, mock_module_cmd):
     """Test that on CRAY platform 'module unload' is not called if the 'dirty'
     option is on.
@@ -23,6 +23,7 @@
 import spack.environment.environment
 import spack.environment.shell
 import spack.error
+import spack.filesystem_view
 import spack.modules
 import spack.package_base
 import spack.paths
@@ -1570,6 +1571,23 @@ def test_env_updates_view_uninstall(tmpdir, mock_stage, mock_fetch, install_mock
     check_viewdir_removal(view_dir)
 
 
+def test_env_updates_view_incrementally(tmpdir, mock_stage, mock_fetch, install_mockery):
+    view_dir = tmpdir.join("view")
+    env("create", "--with-view=%s" % view_dir, "test")
+    with ev.read("test"), spack.config.override("config:incremental_views", True):
+        install("--fake", "--add", "libelf")
+        assert os.path.exists(str(view_dir.join(".spack", spack.filesystem_view.VIEW_MANIFEST)))
+        install("--fake", "--add", "mpileaks")
+
+    check_mpileaks_and_deps_in_view(view_dir)
+    assert os.path.exists(str(view_dir.join(".spack", "libelf")))
+
+    with ev.read("test"), spack.config.override("config:incremental_views", True):
+        uninstall("-ay")
+
+    check_viewdir_removal(view_dir)
+
+
 def test_env_updates_view_uninstall_referenced_elsewhere(
     tmpdir, mock_stage, mock_fetch, install_mockery
 ):
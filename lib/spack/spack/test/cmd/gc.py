@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import os
 
 import pytest
 
@@ -10,7 +11,9 @@
 import spack.environment as ev
 import spack.main
 import spack.spec
+import spack.store
 import spack.traverse
+import spack.util.blob_pool
 
 gc = spack.main.SpackCommand("gc")
 add = spack.main.SpackCommand("add")
@@ -149,3 +152,18 @@ def test_gc_except_specific_dir_env(config, mutable_database, mutable_mock_env_p
     assert "Restricting garbage collection" not in output
     assert "Successfully uninstalled zmpi" in output
     assert not mutable_database.query_local("zmpi")
+
+
+@pytest.mark.db
+def test_gc_removes_unused_shared_files(config, mutable_database, tmp_path, monkeypatch):
+    pool = spack.util.blob_pool.BlobPool(str(tmp_path / "blobs"))
+    monkeypatch.setattr(spack.store.STORE, "blobs", pool)
+    (tmp_path / "used").write_text("used")
+    (tmp_path / "unused").write_text("unused")
+    pool.add(str(tmp_path / "used"))
+    pool.add(str(tmp_path / "unused"))
+    os.unlink(tmp_path / "unused")
+
+    assert "Removed 1 unused shared file (6 bytes)" in gc("-y")
+    assert "Removed" not in gc("-y")
+    assert (tmp_path / "used").read_text() == "used"
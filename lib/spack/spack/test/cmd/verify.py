@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Tests for the `spack verify` command"""
+
 import os
 
 import llnl.util.filesystem as fs
@@ -87,3 +88,37 @@ def test_single_spec_verify_cmd(
     res = sjson.load(results)
     assert len(res) == 1
     assert res[new_file] == ["added"]
+
+
+def test_verify_cmd_report(
+    tmpdir, mock_packages, mock_archive, mock_fetch, config, install_mockery
+):
+    # Test that the report lists all the verified specs, with their errors
+    install("libelf")
+    install("libdwarf")
+    libelf = spack.spec.Spec("libelf").concretized()
+    libdwarf = spack.spec.Spec("libdwarf").concretized()
+
+    new_file = os.path.join(libelf.prefix, "new_file_for_verify_test")
+    with open(new_file, "w") as f:
+        f.write("New file")
+
+    report_file = str(tmpdir.join("report.json"))
+    results = verify(
+        "--incremental",
+        "--report",
+        report_file,
+        f"/{libelf.dag_hash()}",
+        f"/{libdwarf.dag_hash()}",
+        fail_on_error=False,
+    )
+    assert verify.returncode == 1
+    assert new_file in results
+
+    with open(report_file) as f:
+        report = sjson.load(f)
+    assert report["incremental"]
+    assert [(s["hash"], s["errors"]) for s in report["specs"]] == [
+        (libelf.dag_hash(), {new_file: ["added"]}),
+        (libdwarf.dag_hash(), {}),
+    ]
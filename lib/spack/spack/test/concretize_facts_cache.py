@@ -0,0 +1,202 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import os
+import sys
+
+import pytest
+
+import spack.caches
+import spack.config
+import spack.repo
+import spack.solver.asp
+import spack.solver.facts_cache
+import spack.spec
+import spack.util.file_cache
+
+pytestmark = [
+    pytest.mark.not_on_windows("Windows uses old concretizer"),
+    pytest.mark.only_clingo("Original concretizer does not cache package facts"),
+]
+
+
+@pytest.fixture()
+def facts_cache(mutable_config, tmp_path, monkeypatch):
+    """Enable the cache of package facts, and use an empty misc cache, so that the first solve
+    regenerates all the facts"""
+    mutable_config.set("concretizer:facts_cache", True)
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "misc_cache"))
+    monkeypatch.setattr(spack.caches, "MISC_CACHE", cache)
+    return cache
+
+
+def _setup(spec_str):
+    setup = spack.solver.asp.SpackSolverSetup()
+    asp_problem = setup.setup([spack.spec.Spec(spec_str)])
+    return setup, asp_problem
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages")
+def test_facts_cache_is_disabled_by_default():
+    setup, _ = _setup("mpileaks")
+    assert setup.facts_cache is None
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages", "facts_cache")
+def test_facts_are_regenerated_only_once():
+    setup, _ = _setup("mpileaks")
+    assert setup.facts_cache.misses and not setup.facts_cache.hits
+
+    setup, _ = _setup("mpileaks")
+    assert setup.facts_cache.hits and not setup.facts_cache.misses
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages", "facts_cache")
+@pytest.mark.parametrize("spec_str", ["mpileaks", "hdf5+mpi", "multivalue-variant"])
+def test_cached_facts_give_the_same_result(spec_str):
+    with spack.config.override("concretizer:facts_cache", False):
+        expected = spack.spec.Spec(spec_str).concretized()
+
+    # Solve twice, to use both freshly generated and cached facts
+    for _ in range(2):
+        assert spack.spec.Spec(spec_str).concretized() == expected
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages", "facts_cache")
+def test_cached_facts_side_effects():
+    """Tests that version constraints from cached facts are restored in the setup"""
+    uncached = spack.solver.asp.SpackSolverSetup()
+    with spack.config.override("concretizer:facts_cache", False):
+        uncached.setup([spack.spec.Spec("mpileaks")])
+
+    for _ in range(2):
+        setup, _ = _setup("mpileaks")
+        assert setup.version_constraints == uncached.version_constraints
+        assert setup.variant_values_from_specs == uncached.variant_values_from_specs
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages")
+def test_facts_cache_key(tmp_path):
+    cache = spack.solver.facts_cache.PackageFactsCache(
+        spack.util.file_cache.FileCache(str(tmp_path))
+    )
+    pkg_cls = spack.repo.PATH.get_pkg_class("mpich")
+
+    key = cache.key(pkg_cls, tests=False, virtuals=["mpi"])
+    assert key == cache.key(pkg_cls, tests=False, virtuals=["mpi"])
+    assert key != cache.key(pkg_cls, tests=True, virtuals=["mpi"])
+    assert key != cache.key(pkg_cls, tests=False, virtuals=[])
+    assert pkg_cls.module.__file__ in cache.source_files(pkg_cls)
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages", "facts_cache")
+def test_cached_facts_record_referenced_names():
+    setup, _ = _setup("mpileaks")
+    key = setup.facts_cache.key(setup.pkg_class("mpileaks"), tests=False, virtuals=[])
+    facts = setup.facts_cache.get(key)
+    assert facts.dependencies["mpi"] == "virtual"
+    assert facts.dependencies["callpath"] == setup.facts_cache.fingerprint("callpath")
+    assert "mpileaks" not in facts.dependencies
+
+
+@pytest.mark.usefixtures("mutable_config", "mock_packages")
+def test_stale_entries_are_ignored(tmp_path):
+    """Tests that cached facts are not used when the names they reference have changed, e.g.
+    when a dependency became a virtual."""
+    cache = spack.solver.facts_cache.PackageFactsCache(
+        spack.util.file_cache.FileCache(str(tmp_path))
+    )
+
+    def _facts(dependencies):
+        return spack.solver.facts_cache.PackageFacts.from_setup_state(
+            facts="",
+            ids=0,
+            version_constraints=set(),
+            target_constraints=set(),
+            compiler_version_constraints=set(),
+            variant_values=set(),
+            dependencies=dependencies,
+        )
+
+    facts = _facts(cache.fingerprints(["mpi", "callpath", "not-a-package"]))
+    assert facts.dependencies["not-a-package"] == "missing"
+    cache.put("solver-facts/a.json", facts)
+    assert cache.get("solver-facts/a.json") == facts
+
+    cache.put("solver-facts/a.json", _facts({"mpi": cache.fingerprint("callpath")}))
+    assert cache.get("solver-facts/a.json") is None
+
+
+DEPENDENT = """\
+from spack.package import *
+
+
+class Dependent(Package):
+    homepage = "http://www.example.com"
+    url = "http://www.example.com/dependent-1.0.tar.gz"
+
+    version("1.0", sha256="abcde")
+
+    depends_on("dependency+foo")
+"""
+
+DEPENDENCY = """\
+from spack.package import *
+
+
+class Dependency(Package):
+    homepage = "http://www.example.com"
+    url = "http://www.example.com/dependency-1.0.tar.gz"
+
+    version("1.0", sha256="abcde")
+
+    variant("{variant}", default=False, description="A variant")
+"""
+
+
+@pytest.mark.usefixtures("mutable_config", "facts_cache")
+def test_facts_are_regenerated_when_a_dependency_changes(tmp_path):
+    """Tests that the facts of a package are regenerated when the variants of a package it
+    depends on change, and that the same errors are reported as without the cache."""
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo", namespace="facts")
+    for name, text in [("dependent", DEPENDENT), ("dependency", DEPENDENCY)]:
+        path = builder.recipe_filename(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(text.format(variant="foo"))
+
+    def _setup_in_new_process():
+        for name in [m for m in sys.modules if m.startswith("spack.pkg.facts")]:
+            del sys.modules[name]
+        with spack.repo.use_repositories(builder.root):
+            return _setup("dependent")[0]
+
+    assert "dependent" in _setup_in_new_process().facts_cache.misses
+    assert "dependent" in _setup_in_new_process().facts_cache.hits
+
+    with open(builder.recipe_filename("dependency"), "w") as f:
+        f.write(DEPENDENCY.format(variant="bar"))
+    with pytest.raises(RuntimeError, match='variant "foo" not found in package "dependency"'):
+        _setup_in_new_process()
+
+
+def test_corrupted_entries_are_ignored(tmp_path):
+    cache = spack.solver.facts_cache.PackageFactsCache(
+        spack.util.file_cache.FileCache(str(tmp_path))
+    )
+    facts = spack.solver.facts_cache.PackageFacts.from_setup_state(
+        facts="pkg_fact(a, condition(local_id(0))).\n",
+        ids=1,
+        version_constraints=set(),
+        target_constraints=set(),
+        compiler_version_constraints=set(),
+        variant_values=set(),
+    )
+    cache.put("solver-facts/a.json", facts)
+    assert cache.get("solver-facts/a.json") == facts
+    assert facts.facts_with_ids([42]) == "pkg_fact(a, condition(42)).\n"
+
+    (tmp_path / "solver-facts" / "a.json").write_text("{not json")
+    assert cache.get("solver-facts/a.json") is None
+    assert cache.get("solver-facts/missing.json") is None
@@ -0,0 +1,119 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Tests for the daemon that runs read-only commands in a resident spack."""
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import spack.daemon
+import spack.paths
+import spack.repo
+
+pytestmark = pytest.mark.not_on_windows("the spack daemon is not supported on Windows")
+
+
+@pytest.mark.parametrize(
+    "argv,expected",
+    [
+        (["arch"], True),
+        (["find", "-l", "zlib"], True),
+        (["--color", "always", "location", "-r"], True),
+        (["--color=never", "info", "zlib"], True),
+        (["--print-shell-vars", "sh"], True),
+        (["config", "get", "config"], True),
+        (["env", "status"], True),
+        (["env", "activate", "--sh", "-p", "foo"], True),
+        (["env", "activate", "--sh", "--create", "foo"], False),
+        (["env", "activate", "--sh", "--temp"], False),
+        (["env", "activate", "--sh", "--te"], False),
+        (["env", "activate", "--sh", "--envfile=spack.yaml", "foo"], False),
+        (["mirror", "list"], True),
+        (["config", "add", "config:build_jobs:2"], False),
+        (["env", "create", "foo"], False),
+        (["mirror", "add", "foo", "/tmp"], False),
+        (["config"], False),
+        (["install", "zlib"], False),
+        (["-d", "arch"], False),
+        ([], False),
+    ],
+)
+def test_forwardable(argv, expected):
+    assert spack.daemon.forwardable(argv) is expected
+
+
+def test_forward_without_daemon(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPACK_DAEMON_SOCKET", str(tmp_path / "daemon.sock"))
+    assert spack.daemon.forward(["arch"]) is None
+    assert spack.daemon.request({"status": True}) is None
+
+
+@pytest.mark.usefixtures("mutable_config")
+@pytest.mark.parametrize("threads", [1, 2])
+def test_daemon_restarts_when_any_package_changes(threads, tmp_path):
+    """Tests that packages that were not imported are checked too, since they are part of the
+    indexes of the repository"""
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo")
+    builder.add_package("pkg-a")
+    builder.add_package("pkg-b")
+    with spack.repo.use_repositories(builder.root):
+        daemon = spack.daemon.Daemon(str(tmp_path / "daemon.sock"), [])
+        daemon._stat_threads = threads
+        daemon._config_snapshot = daemon._snapshot(daemon._config_paths(), threads)
+        assert daemon.up_to_date()
+
+        os.utime(builder.recipe_filename("pkg-b"), ns=(0, 0))
+        assert not daemon.up_to_date()
+
+
+def _wait_for_daemon(path):
+    for _ in range(600):
+        status = spack.daemon.request({"status": True}, path)
+        if status:
+            return status
+        time.sleep(0.1)
+    raise AssertionError("the spack daemon did not start")
+
+
+@pytest.mark.maybeslow
+def test_daemon_runs_commands(tmp_path, working_env, monkeypatch):
+    path = str(tmp_path / "daemon.sock")
+    monkeypatch.setenv("SPACK_DAEMON_SOCKET", path)
+    monkeypatch.setenv("SPACK_SYSTEM_CONFIG_PATH", str(tmp_path / "system"))
+    monkeypatch.setenv("SPACK_USER_CONFIG_PATH", str(tmp_path))
+    monkeypatch.delenv("SPACK_DISABLE_LOCAL_CONFIG", raising=False)
+    monkeypatch.delenv("SPACK_ENV", raising=False)
+
+    def _spack(*args, **kwargs):
+        return subprocess.run(
+            [sys.executable, spack.paths.spack_script, *args],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            env=dict(os.environ, **kwargs),
+        )
+
+    local_arch = _spack("arch", SPACK_DAEMON="0").stdout
+
+    daemon = subprocess.Popen([sys.executable, spack.paths.spack_script, "daemon", "start", "-f"])
+    try:
+        _wait_for_daemon(path)
+        assert _spack("arch").stdout == local_arch
+        assert spack.daemon.request({"status": True}, path)["requests"] == 1
+
+        # the daemon restarts to pick up changes to the configuration
+        (tmp_path / "config.yaml").write_text("config:\n  build_jobs: 3\n")
+        assert "build_jobs: 3" in _spack("config", "get", "config").stdout
+        _wait_for_daemon(path)
+        assert "build_jobs: 3" in _spack("config", "get", "config").stdout
+        assert spack.daemon.request({"status": True}, path)["requests"] == 1
+
+        assert spack.daemon.request({"stop": True}, path) == {"stopped": True}
+        assert daemon.wait(timeout=60) == 0
+        assert not os.path.exists(path)
+    finally:
+        if daemon.poll() is None:
+            daemon.kill()
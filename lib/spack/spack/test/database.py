@@ -30,6 +30,8 @@
 import spack.repo
 import spack.spec
 import spack.store
+import spack.util.file_cache
+import spack.util.spack_json as sjson
 import spack.version as vn
 from spack.schema.database_index import schema
 from spack.util.executable import Executable
@@ -1086,3 +1088,240 @@ def test_database_construction_doesnt_use_globals(tmpdir, config, nullify_global
     lock_cfg = lock_cfg or spack.database.lock_configuration(config)
     db = spack.database.Database(str(tmpdir), lock_cfg=lock_cfg)
     assert os.path.exists(db.database_directory)
+
+
+@pytest.fixture()
+def sqlite_database(mutable_database):
+    """Mutable database that has written its sqlite index"""
+    mutable_database.db_format = "sqlite"
+    with mutable_database.write_transaction():
+        pass
+    yield mutable_database
+    mutable_database.db_format = "json"
+
+
+def _record_dicts(db):
+    """Return the records in a database, as they are serialized in the JSON index"""
+    return sjson.load(sjson.dump({key: db._data[key].to_dict() for key in db._data}))
+
+
+def test_sqlite_index_is_read_lazily(sqlite_database):
+    assert os.path.isfile(sqlite_database._index_path)
+    assert os.path.isfile(sqlite_database._sqlite_index_path)
+    expected = sqlite_database.query_local(installed=any)
+    mpileaks = next(s for s in expected if s.satisfies("mpileaks ^mpich"))
+
+    db = spack.database.Database(sqlite_database.root)
+    record = db.query_local_by_spec_hash(mpileaks.dag_hash())
+    assert isinstance(db._data, spack.database.LazyInstallRecords)
+    assert db._installed_prefixes == sqlite_database._installed_prefixes
+
+    # Only the records in the DAG of the spec that was accessed are reconstructed
+    assert record.spec.concrete and record.spec == mpileaks
+    loaded = set(key for key in db._data if db._data.raw(key) is None)
+    assert loaded == set(s.dag_hash() for s in mpileaks.traverse())
+
+    assert sorted(db.query_local(installed=any)) == sorted(expected)
+    assert _record_dicts(db) == _record_dicts(sqlite_database)
+
+
+def test_stale_sqlite_index_is_ignored(sqlite_database):
+    mpileaks = sqlite_database.query_one("mpileaks ^mpich")
+    sqlite_database.db_format = "json"
+    sqlite_database.update_explicit(mpileaks, False)
+
+    db = spack.database.Database(sqlite_database.root)
+    assert not db.get_record(mpileaks).explicit
+    assert not isinstance(db._data, spack.database.LazyInstallRecords)
+
+
+def test_write_database_read_from_sqlite_index(sqlite_database):
+    mpileaks = sqlite_database.query_one("mpileaks ^mpich")
+    db = spack.database.Database(sqlite_database.root, db_format="sqlite")
+    db.update_explicit(db.query_local_by_spec_hash(mpileaks.dag_hash()).spec, False)
+
+    # Records that were never accessed are written back unchanged to both indexes
+    expected = _record_dicts(sqlite_database)
+    expected[mpileaks.dag_hash()]["explicit"] = False
+    with open(db._index_path) as f:
+        assert sjson.load(f)["database"]["installs"] == expected
+    db = spack.database.Database(db.root)
+    db._read()
+    assert _record_dicts(db) == expected
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def journaled_database(mutable_database, request):
+    """Mutable database that appends changes to a journal"""
+    mutable_database.db_format = request.param
+    mutable_database.journal_size = 100
+    with mutable_database.write_transaction():
+        pass
+    yield mutable_database
+    mutable_database.db_format = "json"
+    mutable_database.journal_size = 0
+
+
+def _read_database(db, **kwargs):
+    result = spack.database.Database(db.root, **kwargs)
+    result._read()
+    return result
+
+
+def test_journal_records_changes(journaled_database):
+    with open(journaled_database._index_path) as f:
+        index = f.read()
+
+    journaled_database.remove("mpileaks ^mpich")
+    journaled_database.update_explicit(journaled_database.query_one("mpich"), True)
+
+    with open(journaled_database._index_path) as f:
+        assert f.read() == index
+    with open(journaled_database._journal_path) as f:
+        assert len(f.readlines()) == 3
+
+    db = _read_database(journaled_database)
+    assert not db.query_local("mpileaks ^mpich")
+    assert db.get_record("mpich").explicit
+    assert db._installed_prefixes == journaled_database._installed_prefixes
+    assert _record_dicts(db) == _record_dicts(journaled_database)
+
+
+def test_journal_is_replayed_incrementally(journaled_database):
+    db = _read_database(journaled_database)
+    offset = db._journal_offset
+
+    spec = journaled_database.query_one("mpileaks ^mpich")
+    journaled_database.remove(spec)
+    assert not db.query_local("mpileaks ^mpich")
+    assert db._journal_offset > offset
+    assert not db.query_local(spec, installed=any)
+
+    journaled_database.add(spec, spack.store.STORE.layout)
+    assert db.query_local("mpileaks ^mpich") == [spec]
+    assert db._installed_prefixes == journaled_database._installed_prefixes
+    assert _record_dicts(db) == _record_dicts(journaled_database)
+
+
+def test_journal_is_compacted(journaled_database):
+    journaled_database.journal_size = 2
+    journaled_database.update_explicit(journaled_database.query_one("mpich"), True)
+    assert journaled_database._journal_records == 1
+
+    # Removing a root modifies the records of its dependencies as well
+    journaled_database.remove("mpileaks ^mpich")
+    assert journaled_database._journal_records == 0
+    with open(journaled_database._journal_path) as f:
+        assert len(f.readlines()) == 1
+
+    # Compacted changes are in the index, and can be read without the journal
+    os.remove(journaled_database._journal_path)
+    db = _read_database(journaled_database)
+    assert _record_dicts(db) == _record_dicts(journaled_database)
+
+
+def test_incomplete_journal_entries_are_discarded(journaled_database):
+    with open(journaled_database._journal_path, "a") as f:
+        f.write('{"installs": {')
+
+    db = _read_database(journaled_database, journal_size=100)
+    assert _record_dicts(db) == _record_dicts(journaled_database)
+
+    db.update_explicit(db.query_one("mpich"), True)
+    assert _read_database(journaled_database).get_record("mpich").explicit
+
+
+@pytest.mark.parametrize(
+    "query,expected",
+    [
+        # Exact name matches
+        ("mpileaks", ["mpileaks"]),
+        ("builtin.mock.callpath", ["callpath"]),
+        # Providers of virtuals
+        ("mpi", ["mpich", "mpich2", "zmpi"]),
+        ("mpi@:1", ["mpich", "mpich2", "zmpi"]),
+    ],
+)
+def test_query_tests_only_candidate_records(query, expected, database, monkeypatch):
+    """Tests that the secondary indexes are used to select the specs tested by a query"""
+    tested = []
+    satisfies = spack.spec.Spec.satisfies
+
+    def _satisfies(self, other, deps=True):
+        tested.append(self.name)
+        return satisfies(self, other, deps=deps)
+
+    monkeypatch.setattr(spack.spec.Spec, "satisfies", _satisfies)
+    results = database.query_local(query, installed=any)
+    assert set(tested) == set(expected)
+    assert all(s.satisfies(query) for s in results)
+
+
+def test_query_indexes_are_updated(mutable_database):
+    explicit = mutable_database.query_local(explicit=True)
+    spec = mutable_database.query_one("mpileaks ^mpich")
+    assert spec in explicit
+
+    mutable_database.update_explicit(spec, False)
+    assert set(mutable_database.query_local(explicit=True)) == set(explicit) - {spec}
+    assert spec in mutable_database.query_local("mpileaks", explicit=False)
+
+    mutable_database.remove(spec)
+    assert spec not in mutable_database.query_local("mpileaks", installed=any)
+    assert all(s.installed for s in mutable_database.query_local("mpileaks"))
+
+    mutable_database.add(spec, spack.store.STORE.layout, explicit=True)
+    assert spec in mutable_database.query_local("mpileaks", explicit=True)
+
+
+def test_named_queries_reconstruct_only_matching_records(sqlite_database):
+    expected = sqlite_database.query_local("mpileaks ^mpich")
+    db = _read_database(sqlite_database)
+    assert db.query_local("mpileaks ^mpich") == expected
+
+    needed = set(s.dag_hash() for m in db.query_local("mpileaks") for s in m.traverse())
+    loaded = set(key for key in db._data if db._data.raw(key) is None)
+    assert loaded == needed
+
+
+def _read_upstream(root, cache):
+    db = spack.database.Database(root, is_upstream=True, snapshot_cache=cache)
+    db._read()
+    return db
+
+
+def test_upstream_snapshot_is_reused_until_index_changes(mutable_database, tmp_path):
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    expected = _read_upstream(mutable_database.root, cache)
+    assert not isinstance(expected._data, spack.database.LazyInstallRecords)
+
+    db = _read_upstream(mutable_database.root, cache)
+    assert isinstance(db._data, spack.database.LazyInstallRecords)
+    assert db._installed_prefixes == expected._installed_prefixes
+    assert sorted(db._query(installed=any)) == sorted(expected._query(installed=any))
+    assert _record_dicts(db) == _record_dicts(expected)
+
+    # Modifying the upstream invalidates its snapshot
+    mpileaks = mutable_database.query_one("mpileaks ^mpich")
+    mutable_database.remove(mpileaks)
+    db = _read_upstream(mutable_database.root, cache)
+    assert not isinstance(db._data, spack.database.LazyInstallRecords)
+    assert not db._query("mpileaks ^mpich", installed=any)
+
+    db = _read_upstream(mutable_database.root, cache)
+    assert isinstance(db._data, spack.database.LazyInstallRecords)
+    assert not db._query("mpileaks ^mpich", installed=any)
+
+
+def test_corrupted_upstream_snapshot_is_ignored(mutable_database, tmp_path):
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    expected = _read_upstream(mutable_database.root, cache)
+    with open(cache.cache_path(expected._snapshot_key()), "w") as f:
+        f.write("{not json")
+
+    db = _read_upstream(mutable_database.root, cache)
+    assert _record_dicts(db) == _record_dicts(expected)
+
+    # The snapshot is rewritten after reading the index
+    db = _read_upstream(mutable_database.root, cache)
+    assert isinstance(db._data, spack.database.LazyInstallRecords)
@@ -11,8 +11,12 @@
 
 import llnl.util.filesystem as fs
 
+import spack.config
 import spack.environment as ev
+import spack.solver.asp
 import spack.spec
+import spack.util.cpus
+import spack.util.parallel
 from spack.environment.environment import (
     EnvironmentManifestFile,
     SpackEnvironmentViewError,
@@ -725,6 +729,100 @@ def test_variant_propagation_with_unify_false(tmp_path, mock_packages, config):
         assert node.satisfies("+foo")
 
 
+@pytest.mark.only_clingo("Grounding once is not supported by the original concretizer")
+def test_ground_once_with_unify_false(tmp_path, mock_packages, config):
+    """Tests that grounding a single problem for all the roots of an environment with
+    unify:false gives the same result as concretizing each root on its own, and that roots
+    which cannot be solved together are still concretized.
+    """
+    manifest = tmp_path / "spack.yaml"
+    manifest.write_text(
+        """
+    spack:
+      specs:
+      - parent-foo ++foo
+      - mpileaks ^zmpi
+      - mpileaks ^mpich
+      - hdf5~mpi
+      - libelf@0.8.12
+      concretizer:
+        unify: false
+    """
+    )
+    with ev.Environment(tmp_path) as env:
+        env.concretize()
+        expected = {str(x): y.dag_hash() for x, y in env.concretized_specs()}
+
+    with spack.config.override("concretizer:ground_once", True):
+        with ev.Environment(tmp_path) as env:
+            env.concretize(force=True)
+            assert {str(x): y.dag_hash() for x, y in env.concretized_specs()} == expected
+
+
+@pytest.mark.only_clingo("Grounding once is not supported by the original concretizer")
+def test_ground_once_does_not_depend_on_number_of_processes(
+    tmp_path, mock_packages, config, monkeypatch
+):
+    """Tests that roots are grounded together in the same batches, and thus concretized in
+    the same way, whatever the number of processes."""
+    monkeypatch.setattr(ev.environment, "ground_once_batch_size", 2)
+    manifest = tmp_path / "spack.yaml"
+    manifest.write_text(
+        """
+    spack:
+      specs:
+      - mpileaks ^zmpi
+      - mpileaks ^mpich
+      - hdf5~mpi
+      - libelf@0.8.12
+      - libdwarf
+      concretizer:
+        unify: false
+        ground_once: true
+    """
+    )
+    imap_unordered, batches, results = spack.util.parallel.imap_unordered, [], []
+
+    def _imap_unordered(f, list_of_args, **kwargs):
+        batches.append([[index for index, *_ in batch] for batch, _ in list_of_args])
+        return imap_unordered(f, list_of_args, **kwargs)
+
+    monkeypatch.setattr(spack.util.parallel, "imap_unordered", _imap_unordered)
+    for jobs in (1, 3):
+        monkeypatch.setattr(spack.util.cpus, "determine_number_of_jobs", lambda **kwargs: jobs)
+        with ev.Environment(tmp_path) as env:
+            env.concretize(force=True)
+            results.append({str(x): y.dag_hash() for x, y in env.concretized_specs()})
+    assert batches == [[[0, 1], [2, 3], [4]]] * 2
+    assert results[0] == results[1]
+
+
+@pytest.mark.only_clingo("Grounding once is not supported by the original concretizer")
+def test_solve_separately(mock_packages, config):
+    """Tests that solving specs separately, with a single grounding, gives the same results
+    as solving each of them on its own, for roots that don't influence each other.
+    """
+    specs = [
+        spack.spec.Spec("mpileaks ^zmpi"),
+        spack.spec.Spec("mpileaks ^mpich"),
+        spack.spec.Spec("libelf@0.8.12"),
+    ]
+    results = list(spack.solver.asp.Solver().solve_separately(specs))
+    assert len(results) == len(specs)
+    for spec, result in zip(specs, results):
+        assert result.satisfiable and not result.unsolved_specs
+        assert result.specs[0] == spec.concretized()
+
+    # Unsatisfiable specs are reported without affecting the others
+    specs = [
+        spack.spec.Spec("mpileaks ^zmpi"),
+        spack.spec.Spec("mpileaks@10.0"),
+        spack.spec.Spec("libelf"),
+    ]
+    results = list(spack.solver.asp.Solver().solve_separately(specs))
+    assert [r.satisfiable for r in results] == [True, False, True]
+
+
 def test_env_with_include_defs(mutable_mock_env_path, mock_packages):
     """Test environment with included definitions file."""
     env_path = mutable_mock_env_path
@@ -0,0 +1,66 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import os
+
+import pytest
+
+import spack.hooks
+import spack.hooks.deduplicate_files
+import spack.store
+import spack.verify
+from spack.spec import Spec
+from spack.util.blob_pool import BlobPool
+
+pytestmark = pytest.mark.not_on_windows("Hardlinks are not used on Windows")
+
+
+def test_deduplicate_files_installed_from_binary_cache(install_mockery, tmp_path, monkeypatch):
+    pool = BlobPool(str(tmp_path / "blobs"))
+    monkeypatch.setattr(spack.store.STORE, "blobs", pool)
+    spec = Spec("trivial-install-test-package").concretized()
+    spec.package.do_install(fake=True)
+    data = os.path.join(spec.prefix, "data")
+    with open(data, "w") as f:
+        f.write("data")
+
+    # Packages built from source are not deduplicated
+    spack.hooks.deduplicate_files.post_install(spec)
+    assert os.stat(data).st_nlink == 1
+
+    spec.package.installed_from_binary_cache = True
+    spack.hooks.deduplicate_files.post_install(spec)
+    assert os.stat(data).st_nlink == 2
+    metadata_dir = os.path.join(spec.prefix, spack.store.STORE.layout.metadata_dir)
+    assert all(
+        os.stat(os.path.join(root, name)).st_nlink == 1
+        for root, _, names in os.walk(metadata_dir)
+        for name in names
+    )
+
+
+def test_install_manifest_of_deduplicated_files(install_mockery, tmp_path, monkeypatch):
+    """Tests that the install manifest describes files after they are deduplicated, so that
+    they are not reported as modified."""
+    monkeypatch.setattr(spack.store.STORE, "blobs", BlobPool(str(tmp_path / "blobs")))
+    specs = [Spec(name).concretized() for name in ("trivial-install-test-package", "libelf")]
+    for i, spec in enumerate(specs):
+        spec.package.do_install(fake=True)
+        data = os.path.join(spec.prefix, "data")
+        with open(data, "w") as f:
+            f.write("data")
+        os.utime(data, (i, i))
+
+        # Binaries come with the manifest of the prefix they were built in, which is kept.
+        # It is written before the install times, as in a real installation.
+        os.remove(spack.verify._manifest_path(spec))
+        os.remove(spec.package.times_log_path)
+        spack.hooks.post_install(spec, False)
+        spec.package.installed_from_binary_cache = True
+        spack.hooks.post_install(spec, False)
+
+    assert os.path.samefile(*(os.path.join(s.prefix, "data") for s in specs))
+    for spec in specs:
+        assert not spack.verify.check_spec_manifest(spec).has_errors()
+        assert not spack.verify.check_spec_manifest(spec, incremental=True).has_errors()
@@ -3,7 +3,9 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import concurrent.futures
 import glob
+import json
 import os
 import shutil
 import sys
@@ -27,6 +29,7 @@
 import spack.repo
 import spack.spec
 import spack.store
+import spack.util.cpus
 import spack.util.lock as lk
 import spack.version
 
@@ -237,6 +240,91 @@ def test_try_install_from_binary_cache(install_mockery, mock_packages, monkeypat
     assert not result
 
 
+def test_process_binary_cache_tarball_prefetched(install_mockery, monkeypatch):
+    """Tests that a download started in the background is used instead of a new one"""
+    extracted = []
+
+    def _extract(spec, download_result, force=False, timer=None):
+        extracted.append(download_result)
+
+    monkeypatch.setattr(spack.binary_distribution, "download_tarball", _none)
+    monkeypatch.setattr(spack.binary_distribution, "extract_tarball", _extract)
+    monkeypatch.setattr(spack.database.Database, "add", _noop)
+
+    spec = spack.spec.Spec("a").concretized()
+    prefetched = concurrent.futures.Future()
+    prefetched.set_result({"tarball_stage": "mock"})
+    assert inst._process_binary_cache_tarball(
+        spec.package, explicit=False, unsigned=False, prefetched=prefetched
+    )
+    assert extracted == [{"tarball_stage": "mock"}]
+
+
+def test_binary_cache_prefetcher(install_mockery, monkeypatch):
+    """Tests that binary packages are downloaded ahead of their installation, in the order
+    they are scheduled, and that unclaimed downloads are removed.
+    """
+    spec = spack.spec.Spec("mpileaks").concretized()
+    nodes = list(spec.traverse(order="post"))
+    not_indexed = nodes[1]
+    downloaded, deleted = [], []
+
+    def _get_mirrors_for_spec(spec, index_only=False):
+        return [] if spec == not_indexed else [{"mirror_url": "file:///mirror", "spec": spec}]
+
+    def _download(spec, unsigned, mirrors_for_spec):
+        downloaded.append(spec.name)
+        return {"name": spec.name}
+
+    monkeypatch.setattr(spack.binary_distribution, "get_mirrors_for_spec", _get_mirrors_for_spec)
+    monkeypatch.setattr(spack.binary_distribution, "download_tarball", _download)
+    monkeypatch.setattr(
+        spack.binary_distribution,
+        "_delete_staged_downloads",
+        lambda download_result: deleted.append(download_result["name"]),
+    )
+
+    prefetcher = inst.BinaryCachePrefetcher(concurrent_fetches=1)
+    for node in nodes:
+        prefetcher.schedule(node.package, unsigned=False)
+
+    # At most twice as many downloads as concurrent fetches are started ahead of time
+    assert len(prefetcher._downloads) == 2
+    assert prefetcher.claim(nodes[0]).result() == {"name": nodes[0].name}
+    assert prefetcher.claim(not_indexed) is None
+    prefetcher.shutdown()
+
+    assert nodes[-1].name not in downloaded
+    assert sorted(deleted) == sorted(set(downloaded) - {nodes[0].name})
+
+
+def test_installer_prefetches_binaries_in_dependency_order(
+    install_mockery, mutable_config, monkeypatch
+):
+    spack.config.set("mirrors", {"test": "file:///no/such/mirror"})
+    scheduled = []
+    monkeypatch.setattr(
+        inst.BinaryCachePrefetcher,
+        "schedule",
+        lambda self, pkg, unsigned: scheduled.append(pkg.spec),
+    )
+
+    installer = create_installer(installer_args(["trivial-install-test-package"], {}))
+    installer._init_queue()
+    installer._start_prefetching()
+    assert installer.prefetcher is None
+
+    installer = create_installer(installer_args(["mpileaks"], {"concurrent_fetches": 2}))
+    installer._init_queue()
+    installer._start_prefetching()
+    assert installer.prefetcher is not None
+    installer.prefetcher.shutdown()
+
+    assert set(inst.package_id(s.package) for s in scheduled) == set(installer.build_tasks)
+    for idx, s in enumerate(scheduled):
+        assert all(d in scheduled[:idx] for d in s.dependencies())
+
+
 def test_installer_repr(install_mockery):
     const_arg = installer_args(["trivial-install-test-package"], {})
     installer = create_installer(const_arg)
@@ -972,6 +1060,130 @@ def test_update_failed_no_dependent_task(install_mockery):
         assert installer.failed[task.pkg_id] is None
 
 
+def _record_running_builds(monkeypatch):
+    """Record the names of the packages being built, each time the installer waits"""
+    running = []
+    wait_for_build = inst.PackageInstaller._wait_for_build
+
+    def _wait_for_build(installer):
+        running.append(sorted(task.pkg.name for task, _ in installer.running.values()))
+        return wait_for_build(installer)
+
+    monkeypatch.setattr(inst.PackageInstaller, "_wait_for_build", _wait_for_build)
+    return running
+
+
+def test_install_concurrent_packages(install_mockery, mock_fetch, monkeypatch):
+    """Test that packages whose dependencies are installed are built at the same time."""
+    monkeypatch.setattr(spack.util.cpus, "determine_number_of_jobs", lambda **kwargs: 4)
+    running = _record_running_builds(monkeypatch)
+
+    const_arg = installer_args(
+        ["dependent-install", "trivial-install-test-package"], {"concurrent_packages": 2}
+    )
+    installer = create_installer(const_arg)
+    installer.install()
+
+    assert ["dependency-install", "trivial-install-test-package"] in running
+    assert all(len(x) <= 2 for x in running)
+    assert not installer.running
+    assert installer.jobserver is None and installer.jobserver_tokens == 0
+    for request in installer.build_requests:
+        assert request.pkg.spec.installed
+        assert request.pkg_id in installer.installed
+
+
+@pytest.mark.not_on_windows("No jobserver on Windows")
+def test_install_concurrent_packages_share_jobs(install_mockery, mock_fetch, monkeypatch):
+    """Test that concurrent builds take a job slot from the jobserver, so that a single
+    job means a single build at a time.
+    """
+    monkeypatch.setattr(spack.util.cpus, "determine_number_of_jobs", lambda **kwargs: 1)
+    running = _record_running_builds(monkeypatch)
+    jobservers = []
+    start_jobserver = inst.PackageInstaller._start_jobserver
+
+    def _start_jobserver(installer):
+        start_jobserver(installer)
+        jobservers.append(installer.jobserver)
+
+    monkeypatch.setattr(inst.PackageInstaller, "_start_jobserver", _start_jobserver)
+
+    const_arg = installer_args(
+        ["dependent-install", "trivial-install-test-package"], {"concurrent_packages": 2}
+    )
+    installer = create_installer(const_arg)
+    installer.install()
+
+    assert jobservers and jobservers[0] is not None
+    assert running and all(len(x) == 1 for x in running)
+    for request in installer.build_requests:
+        assert request.pkg.spec.installed
+
+
+@pytest.mark.disable_clean_stage_check
+def test_install_concurrent_packages_failure(install_mockery, mock_fetch, monkeypatch):
+    """Test that a failed build running in the background is reported, and doesn't stop
+    the other builds.
+    """
+    const_arg = installer_args(
+        ["failing-build", "trivial-install-test-package"], {"concurrent_packages": 2}
+    )
+    installer = create_installer(const_arg)
+
+    with pytest.raises(inst.InstallError, match="request failed"):
+        installer.install()
+
+    assert not installer.running
+    assert installer.build_requests[1].pkg_id in installer.installed
+    assert installer.build_requests[0].pkg_id in installer.failed
+
+
+def test_historical_build_time(install_mockery, mock_fetch):
+    """Test that build times are estimated from previous builds from sources"""
+    spec = spack.spec.Spec("trivial-install-test-package").concretized()
+    assert inst._historical_build_time(spec) is None
+
+    spec.package.do_install()
+    assert inst._historical_build_time(spec) is not None
+
+    with open(spec.package.times_log_path, "w") as f:
+        json.dump({"total": 42.0, "cache": False}, f)
+    assert inst._historical_build_time(spec) == 42.0
+
+    with open(spec.package.times_log_path, "w") as f:
+        json.dump({"total": 42.0, "cache": True}, f)
+    assert inst._historical_build_time(spec) is None
+
+
+@pytest.mark.parametrize(
+    "scheduler,first",
+    [("fifo", "trivial-install-test-package"), ("critical_path", "dependency-install")],
+)
+def test_install_scheduler(scheduler, first, install_mockery, mutable_config, monkeypatch):
+    """Test that the critical path scheduler starts with the longest chain of builds"""
+    durations = {"trivial-install-test-package": 3.0, "dependency-install": 2.0}
+    monkeypatch.setattr(inst, "_historical_build_time", lambda s: durations.get(s.name))
+    spack.config.set("config:install_scheduler", scheduler)
+
+    const_arg = installer_args(["trivial-install-test-package", "dependent-install"], {})
+    installer = create_installer(const_arg)
+    installer._init_queue()
+
+    paths = {task.pkg.name: task.critical_path for task in installer.build_tasks.values()}
+    if scheduler == "critical_path":
+        # Unknown build times are estimated as the median of the known ones
+        assert paths == {
+            "trivial-install-test-package": 3.0,
+            "dependency-install": 4.5,
+            "dependent-install": 2.5,
+        }
+    else:
+        assert not any(paths.values())
+
+    assert installer._pop_task().pkg.name == first
+
+
 def test_install_uninstalled_deps(install_mockery, monkeypatch, capsys):
     """Test install with uninstalled dependencies."""
     const_arg = installer_args(["dependent-install"], {})
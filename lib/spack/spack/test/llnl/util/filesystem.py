@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Tests for ``llnl/util/filesystem.py``"""
+import errno
 import filecmp
 import os
 import shutil
@@ -93,6 +94,32 @@ def test_multiple_src_file_dest(self, stage):
                 fs.copy("source/a/*/*", "dest/1")
 
 
+@pytest.mark.parametrize("fast_copy", ["reflink", "copy_file_range", "none"])
+def test_copyfile(fast_copy, tmp_path, monkeypatch):
+    """Tests that file contents are copied, whichever way the kernel supports"""
+
+    def not_supported(*args, **kwargs):
+        raise OSError(errno.EOPNOTSUPP, "not supported")
+
+    if fast_copy != "reflink" and sys.platform == "linux":
+        monkeypatch.setattr(fs.fcntl, "ioctl", not_supported)
+    if fast_copy == "none":
+        monkeypatch.setattr(os, "copy_file_range", not_supported, raising=False)
+
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.write_bytes(os.urandom(3 * 2**20 + 1))
+    dst.write_bytes(b"longer previous contents" * 2**17)
+    fs.copyfile(str(src), str(dst))
+    assert dst.read_bytes() == src.read_bytes()
+
+    src.write_bytes(b"")
+    fs.copyfile(str(src), str(dst))
+    assert dst.read_bytes() == b""
+
+    with pytest.raises(shutil.SameFileError):
+        fs.copyfile(str(src), str(src))
+
+
 def check_added_exe_permissions(src, dst):
     src_mode = os.stat(src).st_mode
     dst_mode = os.stat(dst).st_mode
@@ -854,6 +881,29 @@ def test_visit_directory_tree_follow_none(noncyclical_dir_structure):
     assert not visitor.symlinked_dirs_after
 
 
+@pytest.mark.not_on_windows("Requires symlinks")
+@pytest.mark.parametrize("follow_dirs", [True, False])
+@pytest.mark.parametrize("follow_symlink_dirs", [True, False])
+def test_visit_directory_listing(noncyclical_dir_structure, follow_dirs, follow_symlink_dirs):
+    """Tests that visiting a listing of a directory is the same as visiting the directory,
+    including when the listing is incomplete"""
+    root = str(noncyclical_dir_structure)
+    listing = {}
+    for dirpath, dirs, files in os.walk(root):
+        listing[dirpath] = sorted(
+            (name, "symlink" if os.path.islink(os.path.join(dirpath, name)) else kind)
+            for names, kind in ((dirs, "dir"), (files, "file"))
+            for name in names
+        )
+    del listing[os.path.join(root, "a", "d")]
+
+    expected = RegisterVisitor(root, follow_dirs, follow_symlink_dirs)
+    fs.visit_directory_tree(root, expected)
+    visitor = RegisterVisitor(root, follow_dirs, follow_symlink_dirs)
+    fs.visit_directory_listing(root, listing, visitor)
+    assert visitor.__dict__ == expected.__dict__
+
+
 @pytest.mark.regression("29687")
 @pytest.mark.parametrize("initial_mode", [stat.S_IRUSR | stat.S_IXUSR, stat.S_IWGRP])
 @pytest.mark.not_on_windows("Windows might change permissions")
@@ -336,3 +336,15 @@ def test_grouped_exception_base_type():
     message = h.grouped_message(with_tracebacks=False)
     assert "catch-runtime-error" in message
     assert "catch-value-error" not in message
+
+
+def test_lazy_import(tmp_path, monkeypatch):
+    (tmp_path / "lazily_imported.py").write_text("value = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazily_imported", raising=False)
+
+    module = llnl.util.lang.lazy_import("lazily_imported")
+    assert "lazily_imported" not in sys.modules
+
+    assert module.value == 42
+    assert sys.modules["lazily_imported"].value == 42
@@ -3,6 +3,10 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import statistics
+import subprocess
+import sys
+import time
 
 import pytest
 
@@ -97,3 +101,56 @@ def test_get_version_bad_git(tmpdir, working_env, monkeypatch):
 
     monkeypatch.setattr(spack.util.git, "git", lambda: exe.which(bad_git))
     assert spack.spack_version == get_version()
+
+
+@pytest.fixture()
+def isolated_spack(tmp_path, working_env, monkeypatch):
+    """Run spack in a new process, without user and site configuration"""
+    monkeypatch.setenv("SPACK_DISABLE_LOCAL_CONFIG", "1")
+    monkeypatch.setenv("SPACK_USER_CONFIG_PATH", str(tmp_path))
+    monkeypatch.delenv("SPACK_ENV", raising=False)
+
+    def _spack(*args):
+        return subprocess.run(
+            [sys.executable, spack.paths.spack_script, *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    return _spack
+
+
+@pytest.mark.parametrize("command", [["--version"], ["arch"], ["location", "-r"]])
+def test_profile_imports(command, isolated_spack):
+    proc = isolated_spack("--profile-imports", "--lines", "all", *command)
+    assert proc.returncode == 0
+    assert proc.stdout.strip()
+
+    imported = {line.split()[-1] for line in proc.stderr.splitlines() if "ms " in line}
+    assert "spack.main" in imported
+    # environments are imported only by the commands that need them
+    assert "spack.environment" not in imported
+
+
+def test_python_imports_package_modules(isolated_spack):
+    """Scripts run by spack python can import the modules that define packages in any order"""
+    for module in ("spack.package_base", "spack.builder", "spack.installer"):
+        proc = isolated_spack("python", "-c", f"import {module}")
+        assert proc.returncode == 0, proc.stderr
+
+
+@pytest.mark.maybeslow
+@pytest.mark.parametrize(
+    "command", [["--version"], ["arch"], ["location", "-r"], ["config", "get", "config"], ["help"]]
+)
+def test_startup_latency(command, isolated_spack):
+    """Report the median time it takes to run a quick command, most of which is spent
+    starting spack and importing its modules."""
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        proc = isolated_spack(*command)
+        timings.append(time.perf_counter() - start)
+        assert proc.returncode == 0
+    print(f"spack {' '.join(command)}: {statistics.median(timings) * 1000:.0f} ms")
@@ -13,6 +13,7 @@
 
 import pytest
 
+import spack.util.jobserver
 from spack.build_environment import MakeExecutable
 from spack.util.environment import path_put_first
 
@@ -118,3 +119,25 @@ def test_make_jobserver_not_supported(monkeypatch):
     monkeypatch.setenv("MAKEFLAGS", "--jobserver-auth=X,Y")
     # Currently fallback on default job count, Maybe it should force -j1 ?
     assert make(output=str).strip() == "-j8"
+
+
+def test_make_jobserver_of_installer(monkeypatch):
+    """Tools that don't support the jobserver get the job slots that are free"""
+    server = spack.util.jobserver.JobServer(8)
+    try:
+        server.acquire()
+        monkeypatch.setattr(spack.util.jobserver, "CLIENT", None)
+        spack.util.jobserver.connect(server.path, 8)
+
+        ninja = MakeExecutable("make", 8, supports_jobserver=False)
+        assert ninja(output=str).strip() == "-j7"
+
+        # Tokens are given back when the tool is done
+        assert server.acquire()
+        assert ninja(output=str).strip() == "-j6"
+        assert ninja(parallel=False, output=str).strip() == "-j1"
+
+        make = MakeExecutable("make", 8)
+        assert make(output=str).strip() == ""
+    finally:
+        server.close()
@@ -0,0 +1,140 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Tests for the index of package metadata."""
+import io
+import os
+import sys
+
+import pytest
+
+import spack.caches
+import spack.deptypes as dt
+import spack.package_base
+import spack.package_metadata
+import spack.repo
+import spack.util.file_cache
+
+
+def test_package_metadata(mock_packages):
+    metadata = spack.repo.PATH.metadata_index["mpileaks"]
+
+    assert metadata["doc"] == spack.repo.PATH.get_pkg_class("mpileaks").__doc__
+    assert set(metadata["versions"]) == {"1.0", "2.1", "2.2", "2.3"}
+    assert metadata["variants"]["debug"]["default"] is False
+    assert metadata["dependencies"][""]["callpath"] == {
+        "spec": "callpath",
+        "type": ["build", "link"],
+    }
+    assert metadata["dependencies"][""]["mpi"]["type"] == ["build", "link"]
+
+    assert any(
+        path.endswith(os.path.join("build_systems", "generic.py")) for path in metadata["sources"]
+    )
+
+    assert spack.repo.PATH.metadata_index["mpich"]["provides"] == {
+        "mpich@3:": ["mpi@:3"],
+        "mpich@:1": ["mpi@:1"],
+    }
+
+
+def test_package_metadata_dependency_types(mock_packages):
+    index = spack.repo.PATH.metadata_index
+    assert index.dependency_types("dtbuild1") == {
+        "dtbuild2": dt.BUILD,
+        "dtlink2": dt.BUILD | dt.LINK,
+        "dtrun2": dt.RUN,
+    }
+
+
+def test_package_metadata_index_json(mock_packages):
+    index = spack.repo.PATH.metadata_index
+
+    stream = io.StringIO()
+    index.to_json(stream)
+    stream.seek(0)
+    new_index = spack.package_metadata.PackageMetadataIndex.from_json(stream, mock_packages)
+    assert dict(new_index) == dict(index)
+
+    with pytest.raises(spack.package_metadata.PackageMetadataIndexError):
+        spack.package_metadata.PackageMetadataIndex.from_json(
+            io.StringIO('{"tags": {}}'), mock_packages
+        )
+
+
+def test_possible_dependencies_does_not_import_dependencies(mock_packages, monkeypatch):
+    index = spack.repo.PATH.metadata_index
+    pkg_cls = spack.repo.PATH.get_pkg_class("dtbuild1")
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("package.py files must not be imported")
+
+    monkeypatch.setattr(spack.repo.RepoPath, "get_pkg_class", _fail)
+    monkeypatch.setattr(spack.repo.Repo, "get_pkg_class", _fail)
+    assert pkg_cls.possible_dependencies(depflag=dt.LINK | dt.RUN) == {
+        "dtbuild1": {"dtrun2", "dtlink2"},
+        "dtlink2": set(),
+        "dtrun2": set(),
+    }
+    assert "dtlink2" in index
+
+
+def _write_package(builder, name, text):
+    path = builder.recipe_filename(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+BASE_PACKAGE = """\
+from spack.package import *
+
+
+class BasePkg(Package):
+    homepage = "http://www.example.com"
+    url = "http://www.example.com/base-1.0.tar.gz"
+
+    version("1.0", sha256="abcde")
+
+    depends_on("{dep}")
+"""
+
+CHILD_PACKAGE = """\
+from spack.package import *
+from spack.pkg.inherited.base_pkg import BasePkg
+
+
+class Child(BasePkg):
+    pass
+"""
+
+
+def test_possible_dependencies_inherited_from_another_package(
+    tmp_path, mutable_config, monkeypatch
+):
+    """Tests that the index is updated for packages whose base classes change"""
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo", namespace="inherited")
+    builder.add_package("dep")
+    builder.add_package("dep2")
+    builder.add_package("top", dependencies=[("child", None, None)])
+    _write_package(builder, "base-pkg", BASE_PACKAGE.format(dep="dep"))
+    _write_package(builder, "child", CHILD_PACKAGE)
+    monkeypatch.setattr(
+        spack.caches, "MISC_CACHE", spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    )
+
+    def _possible_dependencies():
+        # Import the packages again, as in a new process
+        for name in [m for m in sys.modules if m.startswith("spack.pkg.inherited")]:
+            del sys.modules[name]
+        with spack.repo.use_repositories(builder.root):
+            return sorted(spack.package_base.possible_dependencies("top"))
+
+    assert _possible_dependencies() == ["child", "dep", "top"]
+
+    base = builder.recipe_filename("base-pkg")
+    _write_package(builder, "base-pkg", BASE_PACKAGE.format(dep="dep2"))
+    mtime = os.stat(base).st_mtime + 10
+    os.utime(base, (mtime, mtime))
+    assert _possible_dependencies() == ["child", "dep2", "top"]
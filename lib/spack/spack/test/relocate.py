@@ -6,10 +6,12 @@
 import os.path
 import re
 import shutil
+import time
 
 import pytest
 
 import spack.concretize
+import spack.config
 import spack.paths
 import spack.platforms
 import spack.relocate
@@ -281,6 +283,63 @@ def test_relocate_text_bin_raise_if_new_prefix_is_longer(tmpdir):
         spack.relocate.relocate_text_bin([fpath], {short_prefix: long_prefix})
 
 
+def test_relocate_text_bin_raise_in_worker_process(tmpdir, mutable_config, monkeypatch):
+    monkeypatch.setattr(spack.relocate, "MIN_FILES_PER_RELOCATION_TASK", 1)
+    monkeypatch.setattr(spack.relocate, "MIN_BYTES_PER_RELOCATION_JOB", 1)
+    spack.config.set("config:relocation_jobs", 2)
+    files = [str(tmpdir.join(f"fakebin{i}")) for i in range(4)]
+    for fpath in files:
+        with open(fpath, "w") as f:
+            f.write("/short")
+    with pytest.raises(relocate_text.CannotGrowString) as e:
+        spack.relocate.relocate_text_bin(files, {b"/short": b"/much/longer"})
+    assert str(e.value).count("To fix this") == 1
+
+
+def test_relocation_jobs(mutable_config):
+    """Test that a pool of processes relocates files only when there are enough of them, with a
+    large enough total size."""
+    mib = 2**20
+    spack.config.set("config:relocation_jobs", 4)
+    assert spack.relocate.relocation_jobs([mib] * 1024) == 4
+    assert spack.relocate.relocation_jobs([mib] * 128) == 2
+    assert spack.relocate.relocation_jobs([1024 * mib] * 16) == 1
+    assert spack.relocate.relocation_jobs([1024] * 10000) == 1
+    spack.config.set("config:relocation_jobs", 1)
+    assert spack.relocate.relocation_jobs([mib] * 1024) == 1
+
+
+@pytest.mark.maybeslow
+@pytest.mark.parametrize("jobs", [1, 4])
+def test_relocation_throughput(jobs, tmp_path, mutable_config):
+    """Relocate a synthetic prefix of text files and binaries large enough for a pool of
+    ``jobs`` processes, and report the throughput."""
+    spack.config.set("config:relocation_jobs", jobs)
+    old_prefix, new_prefix = b"/old/spack/opt/prefix-abcdef", b"/new/opt/prefix-abc"
+    text = (b"PATH=" + old_prefix + b"/bin:/usr/bin\n" + b"x" * 200 + b"\n") * 2048
+    binary = (b"\0" * 100 + old_prefix + b"/lib/libfoo.so\0" + bytes(range(256))) * 1024
+    texts, binaries = [], []
+    for i in range(512):
+        texts.append(str(tmp_path / f"text-{i}"))
+        with open(texts[-1], "wb") as f:
+            f.write(text)
+        binaries.append(str(tmp_path / f"binary-{i}"))
+        with open(binaries[-1], "wb") as f:
+            f.write(binary)
+    size = (len(text) + len(binary)) * 512
+    assert spack.relocate.relocation_jobs([size // 1024] * 1024) == jobs
+
+    start = time.perf_counter()
+    spack.relocate.relocate_text(texts, {old_prefix: new_prefix})
+    spack.relocate.relocate_text_bin(binaries, {old_prefix: new_prefix})
+    elapsed = time.perf_counter() - start
+    with open(texts[-1], "rb") as f:
+        assert old_prefix not in f.read()
+    print(
+        f"relocated {size / 2**20:.1f} MiB with {jobs} jobs at {size / 2**20 / elapsed:.1f} MiB/s"
+    )
+
+
 @pytest.mark.requires_executables("install_name_tool", "file", "cc")
 def test_fixup_macos_rpaths(make_dylib, make_object_file):
     # For each of these tests except for the "correct" case, the first fixup
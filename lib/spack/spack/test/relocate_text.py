@@ -3,11 +3,17 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import io
+import os
+import random
+import re
 from collections import OrderedDict
 
 import pytest
 
+import spack.binary_distribution as bindist
+import spack.hooks.sbang
 import spack.relocate_text as relocate_text
+import spack.store
 
 
 def test_text_relocation_regex_is_safe():
@@ -230,6 +236,103 @@ def replace_and_expect(prefix_to_prefix, before: bytes, after: bytes):
     replace_and_expect([(b"/my/prefix", b"/replacement")], b"#!/my/prefix", b"#!/replacement")
 
 
+@pytest.mark.parametrize(
+    "prefix_to_prefix",
+    [
+        # The relocated text is shorter, and written while the file is scanned
+        [(b"/old/store/prefix-abc", b"/new/prefix"), (b"/old/store", b"/new")],
+        # The relocated text is longer
+        [(b"/old/store/prefix-abc", b"/a/much/longer/prefix"), (b"/old/store", b"/new")],
+        # Prefixes starting with a word character can't be searched for as substrings
+        [(b"C:/old", b"D:/new")],
+        # Keys that are not paths are searched for separately
+        [(b"/old/store", b"/new"), (b"#!/bin/bash /old/spack/bin/sbang", b"#!/new/sbang")],
+    ],
+)
+@pytest.mark.parametrize("on_disk", [True, False])
+def test_text_replacement_is_the_regex_substitution(prefix_to_prefix, on_disk, tmp_path):
+    """Test that the text relocation of a file, which only tries the regex where a prefix may
+    occur, gives the same result as substituting the regex in the whole file."""
+    prefix_to_prefix = OrderedDict(prefix_to_prefix)
+    replacer = relocate_text.TextFilePrefixReplacer(prefix_to_prefix)
+    words = list(prefix_to_prefix) + [b"x", b"-I", b"/", b"/lib", b".", b" ", b"\n", b"\0"]
+    rng = random.Random(42)
+
+    for _ in range(200):
+        before = b"".join(rng.choice(words) for _ in range(rng.randint(0, 30)))
+        expected = replacer.regex.sub(
+            lambda m: m.group(1) + prefix_to_prefix[m.group(2)] + m.group(3), before
+        )
+        if on_disk:
+            path = tmp_path / "file"
+            path.write_bytes(before)
+            assert replacer.apply_to_filename(str(path)) == (expected != before)
+            assert path.read_bytes() == expected
+        else:
+            f = io.BytesIO(before)
+            assert replacer.apply_to_file(f) == (expected != before)
+            assert f.getvalue() == expected
+
+
+def test_text_replacement_with_relocation_prefix_maps(default_mock_concretization, tmp_path):
+    """Test that the prefix to prefix map used to install from a binary cache, which also maps
+    the old sbang line, still lets the replacer search for the paths first."""
+    spec = default_mock_concretization("libdwarf")
+    buildinfo = {
+        "buildpath": "/old/store",
+        "spackprefix": "/old/spack",
+        "relative_prefix": os.path.relpath(spec.prefix, spack.store.STORE.layout.root),
+        "hash_to_prefix": {s.dag_hash(): f"/old/store/{s.name}" for s in spec.traverse()},
+    }
+    prefix_to_prefix, _ = bindist._relocation_prefix_maps(spec, buildinfo)
+    replacer = relocate_text.TextFilePrefixReplacer.from_strings_or_bytes(prefix_to_prefix)
+    assert replacer.needles == [b"/old/store", b"#!/bin/bash /old/spack/bin/sbang"]
+
+    path = tmp_path / "file"
+    path.write_bytes(b"#!/bin/bash /old/spack/bin/sbang\n/old/store/libelf/lib /old/store/x\n")
+    assert replacer.apply_to_filename(str(path))
+    assert path.read_bytes() == b"%s\n%s/lib %s/x\n" % (
+        spack.hooks.sbang.sbang_shebang_line().encode(),
+        spec["libelf"].prefix.encode(),
+        str(spack.store.STORE.layout.root).encode(),
+    )
+
+
+def test_text_replacement_does_not_write_untouched_files(tmp_path):
+    # Files without any prefix are only read, so a read-only file object is enough
+    path = tmp_path / "file"
+    path.write_bytes(b"nothing to relocate in /other/prefix\n" * 1000)
+    replacer = relocate_text.TextFilePrefixReplacer.from_strings_or_bytes({"/old": "/new"})
+    with open(path, "rb") as f:
+        assert not replacer.apply_to_file(f)
+
+
+def test_binary_replacement_at_offsets():
+    """Test that relocating a binary at the offsets where prefixes start gives the same result
+    as scanning it for prefixes."""
+    prefix_to_prefix = OrderedDict(
+        [(b"/old/spack/opt/pkg-abcdef", b"/new/pkg-abcdef"), (b"/old/spack/opt", b"/new/opt")]
+    )
+    replacer = relocate_text.BinaryFilePrefixReplacer(prefix_to_prefix)
+    words = list(prefix_to_prefix) + [b"/old/spack", b"/lib", b"x", b"\0"]
+    regex = re.compile(b"(?=%s)" % b"|".join(re.escape(p) for p in prefix_to_prefix))
+    rng = random.Random(42)
+
+    for _ in range(200):
+        before = b"".join(rng.choice(words) for _ in range(rng.randint(0, 30)))
+        offsets = [m.start() for m in regex.finditer(before)]
+        scanned = io.BytesIO(before)
+        try:
+            replacer.apply_to_file(scanned)
+        except relocate_text.BinaryTextReplaceError as e:
+            with pytest.raises(type(e)):
+                replacer.apply_at_offsets(io.BytesIO(before), offsets)
+            continue
+        at_offsets = io.BytesIO(before)
+        replacer.apply_at_offsets(at_offsets, offsets)
+        assert at_offsets.getvalue() == scanned.getvalue()
+
+
 def test_relocate_text_filters_redundant_entries():
     # Test that we're filtering identical old / new paths, since that's a waste.
     mapping = OrderedDict([("/hello", "/hello"), ("/world", "/world")])
@@ -3,12 +3,16 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 import os
+import sys
+import time
 
 import pytest
 
+import spack.config
 import spack.package_base
 import spack.paths
 import spack.repo
+import spack.util.file_cache
 
 
 @pytest.fixture(params=["packages", "", "foo"])
@@ -193,3 +197,138 @@ def test_path_computation_with_names(method_name, mock_repo_path):
     unqualified = method("mpileaks")
     qualified = method("builtin.mock.mpileaks")
     assert qualified == unqualified
+
+
+@pytest.fixture()
+def packages_dir(tmp_path, monkeypatch):
+    """A directory with a few packages, and a clean global cache of package stats"""
+    monkeypatch.setattr(spack.repo.FastPackageChecker, "_paths_cache", {})
+    for name in ("pkg-a", "pkg-b", "pkg-c", "pkg-d"):
+        (tmp_path / "packages" / name).mkdir(parents=True)
+        (tmp_path / "packages" / name / "package.py").write_text("")
+    (tmp_path / "packages" / "no-package-file").mkdir()
+    (tmp_path / "packages" / "Invalid.Name").mkdir()
+    return str(tmp_path / "packages")
+
+
+def _stats(checker):
+    return {name: (sinfo.st_mode, sinfo.st_mtime) for name, sinfo in checker.items()}
+
+
+def test_package_checker_threads(packages_dir):
+    serial = spack.repo.FastPackageChecker(packages_dir)
+    assert sorted(serial) == ["pkg-a", "pkg-b", "pkg-c", "pkg-d"]
+
+    spack.repo.FastPackageChecker._paths_cache.clear()
+    threaded = spack.repo.FastPackageChecker(packages_dir, threads=3)
+    assert _stats(threaded) == _stats(serial)
+
+
+def test_package_checker_snapshot(packages_dir, tmp_path, monkeypatch):
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    checker = spack.repo.FastPackageChecker(packages_dir, cache=cache)
+    expected = _stats(checker)
+    assert cache.init_entry(checker.snapshot_key)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("package files must not be stat'ed")
+
+    # The snapshot is used as long as the packages directory does not change
+    spack.repo.FastPackageChecker._paths_cache.clear()
+    with monkeypatch.context() as m:
+        m.setattr(spack.repo.FastPackageChecker, "_stat_packages", _fail)
+        assert _stats(spack.repo.FastPackageChecker(packages_dir, cache=cache)) == expected
+
+    # Adding a package invalidates it
+    (tmp_path / "packages" / "pkg-e").mkdir()
+    (tmp_path / "packages" / "pkg-e" / "package.py").write_text("")
+    os.utime(packages_dir, ns=(0, os.stat(packages_dir).st_mtime_ns + 10**9))
+    spack.repo.FastPackageChecker._paths_cache.clear()
+    checker = spack.repo.FastPackageChecker(packages_dir, cache=cache)
+    assert "pkg-e" in checker
+
+    # Invalidating the checker explicitly does not use the snapshot
+    os.utime(os.path.join(packages_dir, "pkg-a", "package.py"), (0, 0))
+    checker.invalidate()
+    assert checker["pkg-a"].st_mtime == 0
+
+
+def test_package_checker_snapshot_only_for_read_only_repos(mutable_config, tmp_path, monkeypatch):
+    """Tests that the snapshot, which misses edits of package files, is not used for
+    repositories that the user can modify"""
+    spack.config.set("config:repo_stat_snapshot", True)
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo")
+    builder.add_package("pkg-a")
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    assert spack.repo.Repo(builder.root, cache=cache)._pkg_checker.cache is None
+
+    monkeypatch.setattr(os, "access", lambda path, mode: not mode & os.W_OK)
+    assert spack.repo.Repo(builder.root, cache=cache)._pkg_checker.cache is cache
+
+
+@pytest.mark.maybeslow
+def test_package_checker_benchmark(tmp_path, monkeypatch):
+    """Report how long it takes to check the package files of the builtin repository"""
+    packages_dir = os.path.join(spack.paths.packages_path, "packages")
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+
+    def _check(**kwargs):
+        monkeypatch.setattr(spack.repo.FastPackageChecker, "_paths_cache", {})
+        start = time.perf_counter()
+        checker = spack.repo.FastPackageChecker(packages_dir, **kwargs)
+        return _stats(checker), time.perf_counter() - start
+
+    expected, serial = _check()
+    stats, threaded = _check(threads=8)
+    assert stats == expected
+    _check(cache=cache)
+    stats, snapshot = _check(cache=cache)
+    assert stats == expected
+
+    print(f"{len(expected)} packages")
+    print(f"serial stat:   {serial * 1000:.0f} ms")
+    print(f"8 threads:     {threaded * 1000:.0f} ms")
+    print(f"snapshot:      {snapshot * 1000:.0f} ms")
+
+
+def test_repo_loader_caches_bytecode(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo")
+    builder.add_package("pkg-a")
+    cache = spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    repo = spack.repo.Repo(builder.root, cache=cache)
+
+    def _loader():
+        return spack.repo.RepoLoader(f"{repo.full_namespace}.pkg_a", repo, "pkg-a")
+
+    code = _loader().get_code(f"{repo.full_namespace}.pkg_a")
+    assert code.co_filename == builder.recipe_filename("pkg-a")
+    assert len(list((tmp_path / "cache" / "package-bytecode").glob("*/*.pyc"))) == 1
+
+    # Once cached, the package is not compiled again
+    def _fail(*args, **kwargs):
+        raise AssertionError("the package must not be compiled again")
+
+    with monkeypatch.context() as m:
+        m.setattr(spack.repo.RepoLoader, "source_to_code", _fail)
+        assert _loader().get_code(f"{repo.full_namespace}.pkg_a") == code
+
+    # Changing the package changes its key
+    loader = _loader()
+    key = loader.bytecode_key(loader.get_data(loader.path))
+    with open(builder.recipe_filename("pkg-a"), "a") as f:
+        f.write("\n# a comment\n")
+    assert loader.bytecode_key(loader.get_data(loader.path)) != key
+    loader.get_code(f"{repo.full_namespace}.pkg_a")
+    assert len(list((tmp_path / "cache" / "package-bytecode").glob("*/*.pyc"))) == 2
+
+
+def test_repo_loader_respects_dont_write_bytecode(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", True)
+    builder = spack.repo.MockRepositoryBuilder(tmp_path / "repo")
+    builder.add_package("pkg-a")
+    repo = spack.repo.Repo(
+        builder.root, cache=spack.util.file_cache.FileCache(str(tmp_path / "cache"))
+    )
+    spack.repo.RepoLoader(f"{repo.full_namespace}.pkg_a", repo, "pkg-a").get_code("pkg_a")
+    assert not (tmp_path / "cache" / "package-bytecode").exists()
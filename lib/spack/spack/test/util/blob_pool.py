@@ -0,0 +1,81 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import errno
+import os
+
+import pytest
+
+from spack.util.blob_pool import BlobPool
+
+pytestmark = pytest.mark.not_on_windows("Hardlinks are not used on Windows")
+
+
+def _make_prefix(path, mode=0o644):
+    (path / "include").mkdir(parents=True)
+    (path / ".spack").mkdir()
+    (path / "include" / "foo.h").write_text("#define FOO 1\n")
+    (path / "include" / "foo.h").chmod(mode)
+    (path / "unique").write_text(str(path))
+    (path / ".spack" / "spec.json").write_text("{}")
+    return path
+
+
+def test_deduplicate_identical_files(tmp_path):
+    pool = BlobPool(str(tmp_path / "blobs"))
+    a, b = _make_prefix(tmp_path / "a"), _make_prefix(tmp_path / "b")
+
+    # The first prefix only adds its files to the pool
+    assert pool.deduplicate(str(a), exclude=[".spack"]) == ([], 0)
+    assert pool.deduplicate(str(b), exclude=[".spack"]) == (
+        [str(b / "include" / "foo.h")],
+        len("#define FOO 1\n"),
+    )
+
+    assert os.path.samefile(a / "include" / "foo.h", b / "include" / "foo.h")
+    assert (b / "include" / "foo.h").read_text() == "#define FOO 1\n"
+    assert os.stat(a / "include" / "foo.h").st_nlink == 3
+    assert os.stat(b / "unique").st_nlink == 2
+    assert os.stat(b / ".spack" / "spec.json").st_nlink == 1
+
+
+def test_deduplicate_files_with_the_same_permissions(tmp_path):
+    pool = BlobPool(str(tmp_path / "blobs"))
+    a, b = _make_prefix(tmp_path / "a"), _make_prefix(tmp_path / "b", mode=0o600)
+    pool.deduplicate(str(a), exclude=[".spack"])
+    assert pool.deduplicate(str(b), exclude=[".spack"]) == ([], 0)
+
+    assert not os.path.samefile(a / "include" / "foo.h", b / "include" / "foo.h")
+    assert os.stat(b / "include" / "foo.h").st_mode & 0o777 == 0o600
+
+
+def test_prune_unused_files(tmp_path):
+    pool = BlobPool(str(tmp_path / "blobs"))
+    assert pool.prune() == (0, 0)
+    a, b = _make_prefix(tmp_path / "a"), _make_prefix(tmp_path / "b")
+    pool.deduplicate(str(a))
+    pool.deduplicate(str(b))
+
+    # Files used by another prefix are kept
+    for path in ("include/foo.h", "unique", ".spack/spec.json"):
+        os.unlink(a / path)
+    assert pool.prune() == (1, len(str(a)))
+    assert (b / "include" / "foo.h").read_text() == "#define FOO 1\n"
+
+    for path in ("include/foo.h", "unique", ".spack/spec.json"):
+        os.unlink(b / path)
+    assert pool.prune()[0] == 3
+    assert pool.prune() == (0, 0)
+
+
+def test_files_that_cannot_be_linked_are_kept(tmp_path, monkeypatch):
+    pool = BlobPool(str(tmp_path / "blobs"))
+    a = _make_prefix(tmp_path / "a")
+
+    def _link(*args):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", _link)
+    assert pool.deduplicate(str(a)) == ([], 0)
+    assert (a / "include" / "foo.h").read_text() == "#define FOO 1\n"
@@ -0,0 +1,53 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import os
+
+import pytest
+
+import spack.util.jobserver as jobserver
+
+pytestmark = pytest.mark.not_on_windows("No jobserver on Windows")
+
+
+@pytest.fixture()
+def server():
+    server = jobserver.JobServer(3)
+    yield server
+    server.close()
+
+
+def test_jobserver_tokens(server):
+    # The first job slot is implicit, so there are only two tokens
+    assert server.acquire() and server.acquire()
+    assert not server.acquire()
+
+    server.release()
+    assert server.acquire()
+
+
+def test_jobserver_cleanup():
+    server = jobserver.JobServer(2)
+    server.close()
+    assert not os.path.exists(server.path)
+
+
+def test_jobserver_client(server, working_env, monkeypatch):
+    monkeypatch.setattr(jobserver, "CLIENT", None)
+    monkeypatch.setenv("MAKEFLAGS", "-k")
+
+    client = jobserver.connect(server.path, 3)
+    assert jobserver.CLIENT is client
+    assert os.environ["MAKEFLAGS"] == (
+        f"-k -j3 --jobserver-auth={client.read_fd},{client.write_fd}"
+    )
+    assert os.get_inheritable(client.read_fd) and os.get_inheritable(client.write_fd)
+
+    # Tokens are shared between the jobserver and its clients
+    assert server.acquire()
+    assert client.acquire(5) == 1
+    assert client.acquire(1) == 0 and not server.acquire()
+
+    client.release(1)
+    assert server.acquire()
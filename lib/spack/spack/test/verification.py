@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Tests for the `spack.verify` module"""
+
 import os
 import shutil
 import stat
@@ -185,6 +186,94 @@ def test_check_prefix_manifest(tmpdir):
     assert results.errors[spec.prefix] == ["manifest corrupted"]
 
 
+def test_incremental_file_manifest_entry(tmpdir):
+    # Test that files with the same size, mtime and inode are not hashed in incremental mode
+    file = str(tmpdir.join("file"))
+    with open(file, "w") as f:
+        f.write("This is a file")
+
+    data = spack.verify.create_manifest_entry(file)
+    assert data["inode"] == os.stat(file).st_ino
+
+    # Change the contents, but not the size and mtime
+    with open(file, "w") as f:
+        f.write("This is a fake")
+    os.utime(file, (data["time"], data["time"]))
+
+    assert spack.verify.check_entry(file, data, incremental=True).errors == {}
+    assert spack.verify.check_entry(file, data).errors == {file: ["hash"]}
+
+    # Entries of older manifests have no inode, and are always hashed
+    del data["inode"]
+    assert spack.verify.check_entry(file, data, incremental=True).errors == {file: ["hash"]}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_check_spec_manifests(tmpdir, jobs, monkeypatch):
+    # Test that the files of several prefixes are hashed together, and that the hash
+    # errors are reported for the right spec
+    monkeypatch.setattr(spack.verify, "FILES_PER_HASH_TASK", 2)
+    specs = []
+    for name in ("libelf", "libdwarf"):
+        prefix = str(tmpdir.join(name))
+        spec = spack.spec.Spec(name)
+        spec._mark_concrete()
+        spec.prefix = prefix
+        specs.append(spec)
+
+        fs.mkdirp(os.path.join(prefix, ".spack"))
+        for i in range(5):
+            with open(os.path.join(prefix, f"file{i}"), "w") as f:
+                f.write(f"{name} {i}")
+        spack.verify.write_manifest(spec)
+
+    changed = os.path.join(specs[1].prefix, "file3")
+    mtime = os.stat(changed).st_mtime
+    with open(changed, "w") as f:
+        f.write("libdwarf X")
+    os.utime(changed, (mtime, mtime))
+
+    results = spack.verify.check_spec_manifests(specs, jobs=jobs)
+    assert [r.errors for r in results] == [{}, {changed: ["hash"]}]
+
+
+def test_prefix_listing(tmpdir):
+    # Test that prefixes are listed from their manifest, unless it is out of date
+    prefix = str(tmpdir.join("prefix"))
+    spec = spack.spec.Spec("libelf")
+    spec._mark_concrete()
+    spec.prefix = prefix
+
+    for d in (".spack", "bin", "other"):
+        fs.mkdirp(os.path.join(prefix, d))
+    fs.touch(os.path.join(prefix, "other", "file"))
+    symlink(os.path.join(prefix, "other", "file"), os.path.join(prefix, "bin", "run"))
+
+    # The manifest of a binary relocated to another prefix is replaced
+    manifest_file = os.path.join(
+        prefix, spack.store.STORE.layout.metadata_dir, spack.store.STORE.layout.manifest_file_name
+    )
+    with open(manifest_file, "w") as f:
+        sjson.dump({"/build/prefix": {}}, f)
+    assert spack.verify.prefix_listing(spec) is None
+
+    spack.verify.write_manifest(spec)
+    assert spack.verify.prefix_listing(spec) == {
+        prefix: [(".spack", "dir"), ("bin", "dir"), ("other", "dir")],
+        os.path.join(prefix, "bin"): [("run", "symlink")],
+        os.path.join(prefix, "other"): [("file", "file")],
+    }
+
+    # Files added to subdirectories later are not in the manifest
+    mtime = os.stat(manifest_file).st_mtime
+    fs.touch(os.path.join(prefix, "other", "file.pyc"))
+    os.utime(os.path.join(prefix, "other"), (mtime + 1, mtime + 1))
+    assert spack.verify.prefix_listing(spec) is None
+
+    os.utime(manifest_file, (0, 0))
+    assert spack.verify.prefix_listing(spec) is None
+
+
 def test_single_file_verification(tmpdir):
     # Test the API to verify a single file, including finding the package
     # to which it belongs
@@ -4,11 +4,17 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import os
+import time
 
 import pytest
 
+import llnl.util.filesystem as fs
+
+import spack.config
+import spack.filesystem_view
+import spack.verify
 from spack.directory_layout import DirectoryLayout
-from spack.filesystem_view import SimpleFilesystemView, YamlFilesystemView
+from spack.filesystem_view import SimpleFilesystemView, YamlFilesystemView, view_copy
 from spack.spec import Spec
 
 
@@ -65,3 +71,212 @@ def pkg_a_add_files_to_view(view, merge_map, skip_if_exists=True):
     view.add_specs(a, b)
     assert os.path.lexists(os.path.join(view_dir, "file"))
     assert os.path.lexists(os.path.join(view_dir, "subdir", "file"))
+
+
+@pytest.mark.not_on_windows("Not supported on Windows (yet)")
+@pytest.mark.parametrize("fast_copy", [True, False])
+def test_copy_view_contents(fast_copy, mock_packages, mutable_config, tmp_path, monkeypatch):
+    """Tests that copy views have the same contents and permissions, whether files are copied
+    by the kernel or not."""
+    if not fast_copy:
+        monkeypatch.setattr(fs, "_copy_file_in_kernel", lambda *args: False)
+
+    spec = Spec("a")
+    spec.prefix = str(tmp_path / "a")
+    spec._mark_concrete()
+    os.makedirs(os.path.join(spec.prefix, ".spack"))
+    os.makedirs(os.path.join(spec.prefix, "lib"))
+    data = os.urandom(2**20)
+    for i in range(4):
+        with open(os.path.join(spec.prefix, "lib", f"data-{i}"), "wb") as f:
+            f.write(data[i:])
+    os.chmod(os.path.join(spec.prefix, "lib", "data-0"), 0o755)
+
+    view_dir = str(tmp_path / "view")
+    os.mkdir(view_dir)
+    view = SimpleFilesystemView(view_dir, DirectoryLayout(view_dir), link=view_copy)
+    view.add_specs(spec)
+
+    for i in range(4):
+        path = os.path.join(view_dir, "lib", f"data-{i}")
+        assert not os.path.islink(path)
+        with open(path, "rb") as f:
+            assert f.read() == data[i:]
+    assert os.stat(os.path.join(view_dir, "lib", "data-0")).st_mode & 0o777 == 0o755
+
+
+@pytest.mark.maybeslow
+@pytest.mark.not_on_windows("Not supported on Windows (yet)")
+def test_copy_view_throughput(mock_packages, mutable_config, tmp_path, monkeypatch):
+    """Create copy views of a synthetic prefix, and report the throughput with reflinks or
+    copy_file_range, and with the copies of shutil they fall back to."""
+    spec = Spec("a")
+    spec.prefix = str(tmp_path / "a")
+    spec._mark_concrete()
+    os.makedirs(os.path.join(spec.prefix, ".spack"))
+    os.makedirs(os.path.join(spec.prefix, "lib"))
+    data = os.urandom(2**20)
+    for i in range(64):
+        with open(os.path.join(spec.prefix, "lib", f"data-{i}"), "wb") as f:
+            f.write(data)
+
+    throughput = {}
+    for fast_copy in (True, False):
+        if not fast_copy:
+            monkeypatch.setattr(fs, "_copy_file_in_kernel", lambda *args: False)
+        view_dir = str(tmp_path / f"view-{fast_copy}")
+        os.mkdir(view_dir)
+        view = SimpleFilesystemView(view_dir, DirectoryLayout(view_dir), link=view_copy)
+        start = time.perf_counter()
+        view.add_specs(spec)
+        throughput[fast_copy] = 64 / (time.perf_counter() - start)
+
+        with open(os.path.join(view_dir, "lib", "data-63"), "rb") as f:
+            assert f.read() == data
+
+    print(
+        f"copied 64 MiB to a view at {throughput[True]:.1f} MiB/s with kernel copies, "
+        f"{throughput[False]:.1f} MiB/s with shutil"
+    )
+
+
+def _fake_installed_spec(name, root, files):
+    spec = Spec(name)
+    spec.prefix = os.path.join(root, name)
+    spec._mark_concrete()
+    os.makedirs(os.path.join(spec.prefix, ".spack"))
+    with open(os.path.join(spec.prefix, ".spack", "spec.json"), "w") as f:
+        f.write(name)
+    for path in files:
+        fs.mkdirp(os.path.dirname(os.path.join(spec.prefix, path)))
+        with open(os.path.join(spec.prefix, path), "w") as f:
+            f.write(f"{name} {path}")
+    return spec
+
+
+@pytest.mark.not_on_windows("Not supported on Windows (yet)")
+def test_view_created_incrementally(mock_packages, tmp_path, monkeypatch):
+    """Tests that a view created from a previous one has the same files as one created from
+    scratch, and that only the prefixes of the new specs are traversed"""
+    a = _fake_installed_spec("a", str(tmp_path), ["bin/a", "share/common"])
+    b = _fake_installed_spec("b", str(tmp_path), ["bin/b", "share/common"])
+    c = _fake_installed_spec("c", str(tmp_path), ["lib/c"])
+
+    def make_view(name, *specs, previous_root=None):
+        root = str(tmp_path / name)
+        os.mkdir(root)
+        view = SimpleFilesystemView(root, DirectoryLayout(root), ignore_conflicts=True)
+        view.add_specs(*specs, previous_root=previous_root)
+        view.write_manifest()
+        return root
+
+    first = make_view("first", b, a)
+    assert os.readlink(os.path.join(first, "share", "common")) == os.path.join(
+        b.prefix, "share", "common"
+    )
+
+    visited = []
+
+    def visit_directory_tree(root, visitor):
+        visited.append(root)
+        fs.visit_directory_tree(root, visitor)
+
+    monkeypatch.setattr(spack.filesystem_view, "visit_directory_tree", visit_directory_tree)
+    second = make_view("second", a, c, previous_root=first)
+    assert a.prefix not in visited and c.prefix in visited
+
+    # Links of a are shared with the previous view, but the file that b owned is now a's
+    assert os.path.samestat(
+        os.lstat(os.path.join(first, "bin", "a")), os.lstat(os.path.join(second, "bin", "a"))
+    )
+    assert os.readlink(os.path.join(second, "share", "common")) == os.path.join(
+        a.prefix, "share", "common"
+    )
+    assert not os.path.lexists(os.path.join(second, "bin", "b"))
+    assert os.path.exists(os.path.join(second, "lib", "c"))
+    assert os.path.exists(os.path.join(second, ".spack", "a", "spec.json"))
+
+    # Reinstalled prefixes are traversed again
+    visited.clear()
+    with open(os.path.join(a.prefix, "bin", "a2"), "w") as f:
+        f.write("a bin/a2")
+    os.utime(os.path.join(a.prefix, ".spack"), ns=(0, 0))
+    third = make_view("third", a, c, previous_root=second)
+    assert a.prefix in visited and c.prefix not in visited
+    assert os.path.exists(os.path.join(third, "bin", "a2"))
+
+    def view_contents(root):
+        return sorted(
+            (
+                os.path.relpath(os.path.join(dirpath, f), root),
+                os.path.realpath(os.path.join(dirpath, f)),
+            )
+            for dirpath, _, files in os.walk(root)
+            for f in files
+            if f != spack.filesystem_view.VIEW_MANIFEST
+        )
+
+    assert view_contents(third) == view_contents(make_view("scratch", a, c))
+
+    # Prefixes with files added to any of their directories are traversed again
+    visited.clear()
+    with open(os.path.join(c.prefix, "lib", "c.pyc"), "w") as f:
+        f.write("c lib/c.pyc")
+    mtime = os.stat(os.path.join(third, ".spack", spack.filesystem_view.VIEW_MANIFEST)).st_mtime
+    os.utime(os.path.join(c.prefix, "lib"), (mtime + 1, mtime + 1))
+    fourth = make_view("fourth", a, c, previous_root=third)
+    assert a.prefix not in visited and c.prefix in visited
+    assert os.path.exists(os.path.join(fourth, "lib", "c.pyc"))
+
+
+@pytest.mark.not_on_windows("Not supported on Windows (yet)")
+def test_view_traversal_threads(mock_packages, mutable_config, tmp_path):
+    """Tests that views are identical whether prefixes are traversed serially or not"""
+    specs = [
+        _fake_installed_spec(name, str(tmp_path), [f"bin/{name}", "share/common", "lib/x/y"])
+        for name in ("a", "b", "c", "e")
+    ]
+    os.symlink("y", os.path.join(specs[1].prefix, "lib", "x", "z"))
+
+    def make_view(threads):
+        spack.config.set("config:view_traversal_threads", threads)
+        root = str(tmp_path / f"view-{threads}")
+        os.mkdir(root)
+        view = SimpleFilesystemView(root, DirectoryLayout(root), ignore_conflicts=True)
+        view.add_specs(*specs)
+        return view._records, sorted(
+            (
+                os.path.relpath(os.path.join(dirpath, f), root),
+                os.readlink(os.path.join(dirpath, f)),
+            )
+            for dirpath, _, files in os.walk(root)
+            for f in files
+        )
+
+    assert make_view(1) == make_view(4)
+
+
+@pytest.mark.not_on_windows("Not supported on Windows (yet)")
+def test_view_lists_prefixes_from_install_manifest(mock_packages, tmp_path, monkeypatch):
+    """Tests that prefixes with an up to date install manifest are not traversed"""
+    a = _fake_installed_spec("a", str(tmp_path), ["bin/a", "lib/liba.so"])
+    os.symlink("liba.so", os.path.join(a.prefix, "lib", "liba.so.1"))
+    spack.verify.write_manifest(a)
+
+    visited = []
+
+    def visit_directory_tree(root, visitor, *args):
+        visited.append(root)
+        fs.visit_directory_tree(root, visitor, *args)
+
+    monkeypatch.setattr(spack.filesystem_view, "visit_directory_tree", visit_directory_tree)
+    root = str(tmp_path / "view")
+    os.mkdir(root)
+    SimpleFilesystemView(root, DirectoryLayout(root)).add_specs(a)
+
+    assert a.prefix not in visited
+    assert os.path.realpath(os.path.join(root, "lib", "liba.so.1")) == os.path.join(
+        a.prefix, "lib", "liba.so"
+    )
+    assert os.path.exists(os.path.join(root, "bin", "a"))
+    assert os.path.exists(os.path.join(root, ".spack", "a", "install_manifest.json"))
@@ -0,0 +1,113 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Content-addressed pool of files, used to share the storage of identical files installed
+in different prefixes.
+
+Files of the pool are named after the sha256 of their contents and their permissions, and
+the files they deduplicate are hardlinks to them. The number of links of a file in the pool
+is its reference count: when it drops to one, no prefix uses the file anymore, and it is
+removed by :meth:`BlobPool.prune`.
+
+Files must not be modified in place once they are in the pool, since that would change
+every copy of them.
+"""
+import hashlib
+import os
+import stat
+from typing import Iterable, List, Tuple
+
+import spack.util.crypto
+
+
+class BlobPool:
+    """Pool of files in a directory, which must be on the same filesystem as the files it
+    deduplicates.
+
+    Args:
+        root: directory of the pool
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, digest: str, mode: int) -> str:
+        """Path of the file of the pool with the given sha256 and permissions"""
+        return os.path.join(self.root, digest[:2], f"{digest[2:]}-{stat.S_IMODE(mode):o}")
+
+    def add(self, path: str) -> bool:
+        """Replace a regular file with a link to the file of the pool with the same contents,
+        owner and permissions, or add it to the pool if there is none. Return True if the file
+        was replaced.
+        """
+        st = os.lstat(path)
+        blob = self.path(spack.util.crypto.checksum(hashlib.sha256, path), st.st_mode)
+        try:
+            blob_st = os.lstat(blob)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(path, blob)
+                return False
+            except FileExistsError:
+                # Added concurrently by another process
+                blob_st = os.lstat(blob)
+            except OSError:
+                # The pool is on another filesystem, or the file has too many links
+                return False
+
+        if (blob_st.st_mode, blob_st.st_uid, blob_st.st_gid) != (st.st_mode, st.st_uid, st.st_gid):
+            return False
+
+        # The link is first created next to the file, so that the file is replaced atomically
+        tmp = f"{path}.spack-blob-{os.getpid()}"
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            # The blob was pruned concurrently, or it has too many links
+            return False
+        os.replace(tmp, path)
+        return True
+
+    def deduplicate(self, prefix: str, exclude: Iterable[str] = ()) -> Tuple[List[str], int]:
+        """Add all the regular files under ``prefix`` to the pool, except those that already
+        have more than one link. Return the files that were replaced by links, and their total
+        size.
+
+        Args:
+            prefix: directory with the files to be deduplicated
+            exclude: names of the subdirectories of ``prefix`` that are skipped
+        """
+        files: List[str] = []
+        size = 0
+        for root, dirs, names in os.walk(prefix):
+            if root == prefix:
+                dirs[:] = [d for d in dirs if d not in exclude]
+            for name in names:
+                path = os.path.join(root, name)
+                st = os.lstat(path)
+                if not stat.S_ISREG(st.st_mode) or st.st_nlink > 1 or st.st_size == 0:
+                    continue
+                if self.add(path):
+                    files.append(path)
+                    size += st.st_size
+        return files, size
+
+    def prune(self) -> Tuple[int, int]:
+        """Remove the files of the pool that are not linked from anywhere else. Return the
+        number of files removed, and their total size.
+        """
+        files, size = 0, 0
+        if not os.path.isdir(self.root):
+            return files, size
+        for entry in os.scandir(self.root):
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            for blob in os.scandir(entry.path):
+                st = blob.stat(follow_symlinks=False)
+                if st.st_nlink == 1:
+                    os.unlink(blob.path)
+                    files += 1
+                    size += st.st_size
+        return files, size
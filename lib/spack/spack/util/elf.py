@@ -608,32 +608,40 @@ def substitute_rpath_and_pt_interp_in_place_or_raise(
     Raises ElfCStringUpdatesFailed if the ELF file cannot be updated in-place. This exception
     contains a list of actions to perform with other tools. The file is left untouched in this
     case."""
+    with open(path, "rb+") as f:
+        return substitute_rpath_and_pt_interp_in_file_or_raise(f, substitutions)
+
+
+def substitute_rpath_and_pt_interp_in_file_or_raise(
+    f: BinaryIO, substitutions: Dict[bytes, bytes]
+) -> bool:
+    """Same as :func:`substitute_rpath_and_pt_interp_in_place_or_raise`, for an ELF file
+    opened in ``rb+`` mode, or held in memory, e.g. in a ``BytesIO`` object."""
     regex = re.compile(b"|".join(re.escape(p) for p in substitutions.keys()))
 
     try:
-        with open(path, "rb+") as f:
-            elf = parse_elf(f, interpreter=True, dynamic_section=True)
+        elf = parse_elf(f, interpreter=True, dynamic_section=True)
 
-            # Get the actions to perform.
-            rpath = _get_rpath_substitution(elf, regex, substitutions)
-            pt_interp = _get_pt_interp_substitution(elf, regex, substitutions)
+        # Get the actions to perform.
+        rpath = _get_rpath_substitution(elf, regex, substitutions)
+        pt_interp = _get_pt_interp_substitution(elf, regex, substitutions)
 
-            # Nothing to do.
-            if not rpath and not pt_interp:
-                return False
+        # Nothing to do.
+        if not rpath and not pt_interp:
+            return False
 
-            # If we can't update in-place, leave it to other tools, don't do partial updates.
-            if rpath and not rpath.inplace or pt_interp and not pt_interp.inplace:
-                raise ElfCStringUpdatesFailed(rpath, pt_interp)
+        # If we can't update in-place, leave it to other tools, don't do partial updates.
+        if rpath and not rpath.inplace or pt_interp and not pt_interp.inplace:
+            raise ElfCStringUpdatesFailed(rpath, pt_interp)
 
-            # Otherwise, apply the updates.
-            if rpath:
-                rpath.apply(f)
+        # Otherwise, apply the updates.
+        if rpath:
+            rpath.apply(f)
 
-            if pt_interp:
-                pt_interp.apply(f)
+        if pt_interp:
+            pt_interp.apply(f)
 
-            return True
+        return True
 
     except ElfParsingError:
         # This just means the file wasn't an elf file, so there's no point
@@ -0,0 +1,116 @@
+# Copyright 2013-2024 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Implementation of the POSIX jobserver protocol of GNU make, used to share a single budget
+of parallel jobs among the packages that Spack builds at the same time.
+
+The jobserver is a named pipe holding one token (a single byte) for each job slot but the
+first one. Every client implicitly owns one slot, and must read a token from the pipe
+before using any other slot, then write it back when done. GNU make does that on its own
+when it finds ``--jobserver-auth=R,W`` in ``MAKEFLAGS``; tools that don't speak the protocol
+(e.g. ``ninja``) are handed a number of tokens by Spack before they are run.
+"""
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+#: Byte written to the pipe for each free job slot
+TOKEN = b"+"
+
+
+class JobServer:
+    """Jobserver owned by the installer, with a budget of ``jobs`` parallel jobs.
+
+    The file descriptor used by the jobserver itself is non-blocking, so that
+    :meth:`acquire` never waits, and can be passed to ``select`` to wait for a token.
+    """
+
+    def __init__(self, jobs: int) -> None:
+        self.jobs = jobs
+        self._tmpdir = tempfile.mkdtemp(prefix="spack-jobserver-")
+        #: Path to the named pipe, which clients open with :func:`connect`
+        self.path = os.path.join(self._tmpdir, "fifo")
+        os.mkfifo(self.path, 0o600)
+        self._read_fd = os.open(self.path, os.O_RDONLY | os.O_NONBLOCK)
+        self._write_fd = os.open(self.path, os.O_WRONLY)
+        os.write(self._write_fd, TOKEN * (jobs - 1))
+
+    def fileno(self) -> int:
+        """File descriptor that is ready for reading when a token is available"""
+        return self._read_fd
+
+    def acquire(self) -> bool:
+        """Take a token from the jobserver without blocking, and return whether it
+        succeeded.
+        """
+        try:
+            return bool(os.read(self._read_fd, 1))
+        except BlockingIOError:
+            return False
+
+    def release(self) -> None:
+        """Give back a token previously taken with :meth:`acquire`"""
+        os.write(self._write_fd, TOKEN)
+
+    def close(self) -> None:
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+class Client:
+    """Connection of a build process to the jobserver of the installer.
+
+    Args:
+        path: path to the named pipe of the jobserver
+    """
+
+    def __init__(self, path: str) -> None:
+        # Descriptors used by make. GNU make expects blocking reads, so they must not
+        # share their file description with the non-blocking one used by Spack.
+        self.read_fd = os.open(path, os.O_RDONLY)
+        self.write_fd = os.open(path, os.O_WRONLY)
+        os.set_inheritable(self.read_fd, True)
+        os.set_inheritable(self.write_fd, True)
+        self._nonblocking_fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+    def makeflags(self, jobs: int) -> str:
+        """Flags to be added to ``MAKEFLAGS``, so that make uses this jobserver"""
+        return f"-j{jobs} --jobserver-auth={self.read_fd},{self.write_fd}"
+
+    def acquire(self, tokens: int) -> int:
+        """Take up to ``tokens`` tokens from the jobserver without blocking, and return
+        how many were taken.
+        """
+        if tokens <= 0:
+            return 0
+        try:
+            return len(os.read(self._nonblocking_fd, tokens))
+        except BlockingIOError:
+            return 0
+
+    def release(self, tokens: int) -> None:
+        """Give back tokens previously taken with :meth:`acquire`"""
+        if tokens > 0:
+            os.write(self.write_fd, TOKEN * tokens)
+
+
+#: Connection to the jobserver of the installer, in a build process
+CLIENT: Optional[Client] = None
+
+
+def connect(path: str, jobs: int) -> Client:
+    """Connect the current process to a jobserver, and export it to make through
+    ``MAKEFLAGS``.
+
+    Args:
+        path: path to the named pipe of the jobserver
+        jobs: total number of jobs of the jobserver
+    """
+    global CLIENT
+    CLIENT = Client(path)
+    makeflags = os.environ.get("MAKEFLAGS", "")
+    os.environ["MAKEFLAGS"] = f"{makeflags} {CLIENT.makeflags(jobs)}".strip()
+    return CLIENT
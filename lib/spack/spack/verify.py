@@ -6,15 +6,18 @@
 import hashlib
 import os
 import stat
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import llnl.util.tty as tty
 
 import spack.filesystem_view
 import spack.store
 import spack.util.file_permissions as fp
+import spack.util.parallel
 import spack.util.spack_json as sjson
-from spack.package_base import spack_times_log
+
+#: Number of files whose contents are hashed by a single task, when verifying in parallel
+FILES_PER_HASH_TASK = 64
 
 
 def compute_hash(path: str, block_size: int = 1048576) -> str:
@@ -44,19 +47,34 @@ def create_manifest_entry(path: str) -> Dict[str, Any]:
         data["hash"] = compute_hash(path)
         data["time"] = s.st_mtime
         data["size"] = s.st_size
+        data["inode"] = s.st_ino
 
     return data
 
 
-def write_manifest(spec):
-    manifest_file = os.path.join(
+def _manifest_path(spec) -> str:
+    return os.path.join(
         spec.prefix,
         spack.store.STORE.layout.metadata_dir,
         spack.store.STORE.layout.manifest_file_name,
     )
 
-    if not os.path.exists(manifest_file):
-        tty.debug("Writing manifest file: No manifest from binary")
+
+def _read_manifest(manifest_file: str) -> Dict[str, Any]:
+    try:
+        with open(manifest_file, "r") as f:
+            return sjson.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(spec):
+    manifest_file = _manifest_path(spec)
+
+    # Binaries come with the manifest of the prefix they were built in, which is kept
+    # unless they were relocated to another prefix
+    if spec.prefix not in _read_manifest(manifest_file):
+        tty.debug(f"Writing manifest file {manifest_file}")
 
         manifest = {}
         for root, dirs, files in os.walk(spec.prefix):
@@ -71,7 +89,90 @@ def write_manifest(spec):
         fp.set_permissions_by_spec(manifest_file, spec)
 
 
-def check_entry(path, data):
+def update_manifest(spec, paths: List[str]) -> None:
+    """Update the entries of the manifest of a spec for files that were replaced after it was
+    written, e.g. by links to identical files with another inode and mtime."""
+    manifest_file = _manifest_path(spec)
+    manifest = _read_manifest(manifest_file)
+    if not manifest:
+        return
+    for path in paths:
+        if path in manifest:
+            manifest[path] = create_manifest_entry(path)
+    with open(manifest_file, "w") as f:
+        sjson.dump(manifest, f)
+
+
+def prefix_listing(spec) -> Optional[Dict[str, List[Tuple[str, str]]]]:
+    """Return the listing of the directories of the prefix of an installed spec made from its
+    manifest, as used by :py:func:`llnl.util.filesystem.visit_directory_listing`, or None if
+    the manifest is missing, or older than any of the directories it lists. The metadata dir
+    is not listed, since it changes after the manifest is written.
+
+    Prefixes are not supposed to change after they are installed, so the manifest saves
+    traversing them again.
+    """
+    prefix = str(spec.prefix)
+    manifest_file = _manifest_path(spec)
+    try:
+        manifest_mtime = os.stat(manifest_file).st_mtime
+        if manifest_mtime < os.stat(prefix).st_mtime:
+            return None
+    except OSError:
+        return None
+
+    manifest = _read_manifest(manifest_file)
+    if prefix not in manifest:
+        return None
+
+    metadata_dir = os.path.join(prefix, spack.store.STORE.layout.metadata_dir)
+    listing: Dict[str, List[Tuple[str, str]]] = {prefix: []}
+    for path, data in manifest.items():
+        if path == prefix or not data:
+            continue
+        parent, name = os.path.split(path)
+        if parent == metadata_dir or parent.startswith(metadata_dir + os.sep):
+            continue
+        if stat.S_ISDIR(data["mode"]):
+            kind = "dir"
+            if path != metadata_dir:
+                listing.setdefault(path, [])
+        elif stat.S_ISLNK(data["mode"]):
+            kind = "symlink"
+        else:
+            kind = "file"
+        listing.setdefault(parent, []).append((name, kind))
+
+    # Files added to, or removed from, any directory after the manifest was written, e.g.
+    # bytecode compiled on first import, change its modification time
+    for directory, entries in listing.items():
+        try:
+            if manifest_mtime < os.stat(directory).st_mtime:
+                return None
+        except OSError:
+            return None
+        entries.sort()
+    return listing
+
+
+def _unchanged(s: os.stat_result, data: Dict[str, Any]) -> bool:
+    """Whether a regular file still has the size, mtime and inode of its manifest entry, in
+    which case its contents are assumed to be unchanged. Entries of older manifests have no
+    inode, and always need to be hashed.
+    """
+    return (s.st_size, s.st_mtime, s.st_ino) == (data["size"], data["time"], data.get("inode"))
+
+
+def check_entry(path, data, incremental=False, pending_hashes=None):
+    """Check a file against its manifest entry.
+
+    Args:
+        path: path of the file
+        data: manifest entry of the file
+        incremental: if True, do not hash files whose size, mtime and inode are unchanged
+        pending_hashes: if not None, the contents of regular files are not hashed, and
+            their path and expected hash are appended to this list instead
+    """
     res = VerificationResults()
 
     if not data:
@@ -99,7 +200,11 @@ def check_entry(path, data):
             res.add_error(path, "size")
         if s.st_mtime != data["time"]:
             res.add_error(path, "mtime")
-        if compute_hash(path) != data.get("hash"):
+        if incremental and _unchanged(s, data):
+            pass
+        elif pending_hashes is not None:
+            pending_hashes.append((path, data.get("hash")))
+        elif compute_hash(path) != data.get("hash"):
             res.add_error(path, "hash")
 
     return res
@@ -137,7 +242,9 @@ def check_file_manifest(filename):
     return results
 
 
-def check_spec_manifest(spec):
+def _check_prefix(spec, incremental, pending_hashes) -> "VerificationResults":
+    import spack.package_base  # avoid circular imports
+
     prefix = spec.prefix
 
     results = VerificationResults()
@@ -165,13 +272,13 @@ def check_spec_manifest(spec):
                 continue
 
             # Do not check the install times log file.
-            if entry == spack_times_log:
+            if entry == spack.package_base.spack_times_log:
                 continue
 
             data = manifest.pop(path, {})
-            results += check_entry(path, data)
+            results += check_entry(path, data, incremental, pending_hashes)
 
-    results += check_entry(prefix, manifest.pop(prefix, {}))
+    results += check_entry(prefix, manifest.pop(prefix, {}), incremental, pending_hashes)
 
     for path in manifest:
         results.add_error(path, "deleted")
@@ -179,6 +286,56 @@ def check_spec_manifest(spec):
     return results
 
 
+def _mismatched_hashes(entries: List[Tuple[str, Optional[str]]]) -> List[str]:
+    """Return the paths of the files whose contents do not match their expected hash"""
+    return [path for path, expected in entries if compute_hash(path) != expected]
+
+
+def check_spec_manifests(specs, incremental=False, jobs=1) -> List["VerificationResults"]:
+    """Check the prefixes of installed specs against their manifest, and return the results
+    for each spec, in the same order.
+
+    The contents of the files of all the prefixes are hashed together, by a pool of up to
+    ``jobs`` processes.
+
+    Args:
+        specs: installed specs to be verified
+        incremental: if True, do not hash files whose size, mtime and inode are the same as
+            when the manifest was written
+        jobs: maximum number of processes hashing files
+    """
+    all_results: List["VerificationResults"] = []
+    pending_hashes: List[Tuple[str, Optional[str]]] = []
+    owner: Dict[str, "VerificationResults"] = {}
+    for spec in specs:
+        start = len(pending_hashes)
+        results = _check_prefix(spec, incremental, pending_hashes)
+        owner.update((path, results) for path, _ in pending_hashes[start:])
+        all_results.append(results)
+
+    tasks = [
+        pending_hashes[i : i + FILES_PER_HASH_TASK]
+        for i in range(0, len(pending_hashes), FILES_PER_HASH_TASK)
+    ]
+    mismatches: Iterable[List[str]]
+    if jobs > 1 and len(tasks) > 1:
+        mismatches = spack.util.parallel.imap_unordered(
+            _mismatched_hashes, tasks, processes=min(jobs, len(tasks)), debug=tty.is_debug()
+        )
+    else:
+        mismatches = map(_mismatched_hashes, tasks)
+
+    for paths in mismatches:
+        for path in paths:
+            owner[path].add_error(path, "hash")
+
+    return all_results
+
+
+def check_spec_manifest(spec, incremental=False, jobs=1):
+    return check_spec_manifests([spec], incremental=incremental, jobs=jobs)[0]
+
+
 class VerificationResults:
     def __init__(self):
         self.errors = {}
@@ -37,6 +37,13 @@ def main(argv=None):
     if "ruamel" in sys.modules:
         del sys.modules["ruamel"]
 
+    # run read-only commands in the spack daemon, if one is running
+    import spack.daemon  # noqa: E402
+
+    returncode = spack.daemon.forward(sys.argv[1:] if argv is None else argv)
+    if returncode is not None:
+        sys.exit(returncode)
+
     import spack.main  # noqa: E402
 
     sys.exit(spack.main.main(argv))
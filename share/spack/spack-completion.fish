@@ -347,7 +347,7 @@ complete -c spack --erase
 # Everything below here is auto-generated.
 
 # spack
-set -g __fish_spack_optspecs_spack h/help H/all-help color= c/config= C/config-scope= d/debug timestamp pdb e/env= D/env-dir= E/no-env use-env-repo k/insecure l/enable-locks L/disable-locks m/mock b/bootstrap p/profile sorted-profile= lines= v/verbose stacktrace backtrace V/version print-shell-vars=
+set -g __fish_spack_optspecs_spack h/help H/all-help color= c/config= C/config-scope= d/debug timestamp pdb e/env= D/env-dir= E/no-env use-env-repo k/insecure l/enable-locks L/disable-locks m/mock b/bootstrap p/profile sorted-profile= profile-imports lines= v/verbose stacktrace backtrace V/version print-shell-vars=
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a add -d 'add a spec to an environment'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a arch -d 'print architecture information about this machine'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a audit -d 'audit configuration files, packages, etc.'
@@ -370,6 +370,7 @@ complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a config -d 'get an
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a containerize -d 'creates recipes to build images for different container runtimes'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a containerise -d 'creates recipes to build images for different container runtimes'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a create -d 'create a new package file'
+complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a daemon -d 'keep spack in memory to run read-only commands faster'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a debug -d 'debugging commands for troubleshooting Spack'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a deconcretize -d 'remove specs from the concretized lockfile of an environment'
 complete -c spack -n '__fish_spack_using_command_pos 0 ' -f -a dependencies -d 'show dependencies of a package'
@@ -467,6 +468,8 @@ complete -c spack -n '__fish_spack_using_command ' -s p -l profile -f -a spack_p
 complete -c spack -n '__fish_spack_using_command ' -s p -l profile -d 'profile execution using cProfile'
 complete -c spack -n '__fish_spack_using_command ' -l sorted-profile -r -f -a sorted_profile
 complete -c spack -n '__fish_spack_using_command ' -l sorted-profile -r -d 'profile and sort'
+complete -c spack -n '__fish_spack_using_command ' -l profile-imports -f -a profile_imports
+complete -c spack -n '__fish_spack_using_command ' -l profile-imports -d 'report the modules that are slowest to import, using python -X importtime'
 complete -c spack -n '__fish_spack_using_command ' -l lines -r -f -a lines
 complete -c spack -n '__fish_spack_using_command ' -l lines -r -d 'lines of profile output or \'all\' (default: 20)'
 complete -c spack -n '__fish_spack_using_command ' -s v -l verbose -f -a verbose
@@ -1299,6 +1302,33 @@ complete -c spack -n '__fish_spack_using_command create' -l skip-editor -d 'skip
 complete -c spack -n '__fish_spack_using_command create' -s b -l batch -f -a batch
 complete -c spack -n '__fish_spack_using_command create' -s b -l batch -d 'don\'t ask which versions to checksum'
 
+# spack daemon
+set -g __fish_spack_optspecs_spack_daemon h/help
+complete -c spack -n '__fish_spack_using_command_pos 0 daemon' -f -a start -d 'start a daemon for this spack instance'
+complete -c spack -n '__fish_spack_using_command_pos 0 daemon' -f -a stop -d 'stop the daemon of this spack instance'
+complete -c spack -n '__fish_spack_using_command_pos 0 daemon' -f -a status -d 'show whether a daemon is running, and its statistics'
+complete -c spack -n '__fish_spack_using_command daemon' -s h -l help -f -a help
+complete -c spack -n '__fish_spack_using_command daemon' -s h -l help -d 'show this help message and exit'
+
+# spack daemon start
+set -g __fish_spack_optspecs_spack_daemon_start h/help f/foreground idle-timeout=
+complete -c spack -n '__fish_spack_using_command daemon start' -s h -l help -f -a help
+complete -c spack -n '__fish_spack_using_command daemon start' -s h -l help -d 'show this help message and exit'
+complete -c spack -n '__fish_spack_using_command daemon start' -s f -l foreground -f -a foreground
+complete -c spack -n '__fish_spack_using_command daemon start' -s f -l foreground -d 'do not detach from the terminal'
+complete -c spack -n '__fish_spack_using_command daemon start' -l idle-timeout -r -f -a idle_timeout
+complete -c spack -n '__fish_spack_using_command daemon start' -l idle-timeout -r -d 'exit after this many seconds without requests'
+
+# spack daemon stop
+set -g __fish_spack_optspecs_spack_daemon_stop h/help
+complete -c spack -n '__fish_spack_using_command daemon stop' -s h -l help -f -a help
+complete -c spack -n '__fish_spack_using_command daemon stop' -s h -l help -d 'show this help message and exit'
+
+# spack daemon status
+set -g __fish_spack_optspecs_spack_daemon_status h/help
+complete -c spack -n '__fish_spack_using_command daemon status' -s h -l help -f -a help
+complete -c spack -n '__fish_spack_using_command daemon status' -s h -l help -d 'show this help message and exit'
+
 # spack debug
 set -g __fish_spack_optspecs_spack_debug h/help
 complete -c spack -n '__fish_spack_using_command_pos 0 debug' -f -a create-db-tarball -d 'create a tarball of Spack\'s installation metadata'
@@ -1943,7 +1973,7 @@ complete -c spack -n '__fish_spack_using_command info' -l variants-by-name -f -a
 complete -c spack -n '__fish_spack_using_command info' -l variants-by-name -d 'list variants in strict name order; don\'t group by condition'
 
 # spack install
-set -g __fish_spack_optspecs_spack_install h/help only= u/until= j/jobs= overwrite fail-fast keep-prefix keep-stage dont-restage use-cache no-cache cache-only use-buildcache= include-build-deps no-check-signature show-log-on-error source n/no-checksum v/verbose fake only-concrete add no-add f/file= clean dirty test= log-format= log-file= help-cdash cdash-upload-url= cdash-build= cdash-site= cdash-track= cdash-buildstamp= y/yes-to-all U/fresh reuse reuse-deps deprecated
+set -g __fish_spack_optspecs_spack_install h/help only= u/until= j/jobs= p/concurrent-packages= overwrite fail-fast keep-prefix keep-stage dont-restage use-cache no-cache cache-only use-buildcache= concurrent-fetches= include-build-deps no-check-signature show-log-on-error source n/no-checksum v/verbose fake only-concrete add no-add f/file= clean dirty test= log-format= log-file= help-cdash cdash-upload-url= cdash-build= cdash-site= cdash-track= cdash-buildstamp= y/yes-to-all U/fresh reuse reuse-deps deprecated
 complete -c spack -n '__fish_spack_using_command_pos_remainder 0 install' -f -k -a '(__fish_spack_specs)'
 complete -c spack -n '__fish_spack_using_command install' -s h -l help -f -a help
 complete -c spack -n '__fish_spack_using_command install' -s h -l help -d 'show this help message and exit'
@@ -1953,6 +1983,8 @@ complete -c spack -n '__fish_spack_using_command install' -s u -l until -r -f -a
 complete -c spack -n '__fish_spack_using_command install' -s u -l until -r -d 'phase to stop after when installing (default None)'
 complete -c spack -n '__fish_spack_using_command install' -s j -l jobs -r -f -a jobs
 complete -c spack -n '__fish_spack_using_command install' -s j -l jobs -r -d 'explicitly set number of parallel jobs'
+complete -c spack -n '__fish_spack_using_command install' -s p -l concurrent-packages -r -f -a concurrent_packages
+complete -c spack -n '__fish_spack_using_command install' -s p -l concurrent-packages -r -d 'build up to N packages at the same time, sharing the parallel jobs among them'
 complete -c spack -n '__fish_spack_using_command install' -l overwrite -f -a overwrite
 complete -c spack -n '__fish_spack_using_command install' -l overwrite -d 'reinstall an existing spec, even if it has dependents'
 complete -c spack -n '__fish_spack_using_command install' -l fail-fast -f -a fail_fast
@@ -1971,6 +2003,8 @@ complete -c spack -n '__fish_spack_using_command install' -l cache-only -f -a ca
 complete -c spack -n '__fish_spack_using_command install' -l cache-only -d 'only install package from binary mirrors'
 complete -c spack -n '__fish_spack_using_command install' -l use-buildcache -r -f -a use_buildcache
 complete -c spack -n '__fish_spack_using_command install' -l use-buildcache -r -d 'select the mode of buildcache for the \'package\' and \'dependencies\''
+complete -c spack -n '__fish_spack_using_command install' -l concurrent-fetches -r -f -a concurrent_fetches
+complete -c spack -n '__fish_spack_using_command install' -l concurrent-fetches -r -d 'download up to N binary packages at the same time, ahead of their installation'
 complete -c spack -n '__fish_spack_using_command install' -l include-build-deps -f -a include_build_deps
 complete -c spack -n '__fish_spack_using_command install' -l include-build-deps -d 'include build deps when installing from cache, useful for CI pipeline troubleshooting'
 complete -c spack -n '__fish_spack_using_command install' -l no-check-signature -f -a unsigned
@@ -3044,7 +3078,7 @@ complete -c spack -n '__fish_spack_using_command url stats' -l show-issues -f -a
 complete -c spack -n '__fish_spack_using_command url stats' -l show-issues -d 'show packages with issues (md5 hashes, http urls)'
 
 # spack verify
-set -g __fish_spack_optspecs_spack_verify h/help l/local j/json a/all s/specs f/files
+set -g __fish_spack_optspecs_spack_verify h/help l/local j/json a/all jobs= incremental report= s/specs f/files
 complete -c spack -n '__fish_spack_using_command_pos_remainder 0 verify' $__fish_spack_force_files -a '(__fish_spack_installed_specs)'
 complete -c spack -n '__fish_spack_using_command verify' -s h -l help -f -a help
 complete -c spack -n '__fish_spack_using_command verify' -s h -l help -d 'show this help message and exit'
@@ -3054,6 +3088,12 @@ complete -c spack -n '__fish_spack_using_command verify' -s j -l json -f -a json
 complete -c spack -n '__fish_spack_using_command verify' -s j -l json -d 'ouptut json-formatted errors'
 complete -c spack -n '__fish_spack_using_command verify' -s a -l all -f -a all
 complete -c spack -n '__fish_spack_using_command verify' -s a -l all -d 'verify all packages'
+complete -c spack -n '__fish_spack_using_command verify' -l jobs -r -f -a jobs
+complete -c spack -n '__fish_spack_using_command verify' -l jobs -r -d 'number of processes hashing files (default: number of build jobs)'
+complete -c spack -n '__fish_spack_using_command verify' -l incremental -f -a incremental
+complete -c spack -n '__fish_spack_using_command verify' -l incremental -d 'do not hash files whose size, mtime and inode are unchanged since installation'
+complete -c spack -n '__fish_spack_using_command verify' -l report -r -f -a report
+complete -c spack -n '__fish_spack_using_command verify' -l report -r -d 'write a json report of all the verified entries to FILE'
 complete -c spack -n '__fish_spack_using_command verify' -s s -l specs -f -a type
 complete -c spack -n '__fish_spack_using_command verify' -s s -l specs -d 'treat entries as specs (default)'
 complete -c spack -n '__fish_spack_using_command verify' -s f -l files -f -a type